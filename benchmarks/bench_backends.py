@@ -0,0 +1,54 @@
+"""
+Compares the parse backends of JsonBuilder, TomlBuilder and YamlBuilder on large generated documents.
+Run from the repository root: python -m benchmarks.bench_backends [services]
+"""
+import json
+import sys
+import time
+import toml
+import yaml
+from deployment_tools import backends
+
+
+def generate(services: int) -> dict:
+    return {
+        f"service-{idx}": {
+            "image": f"registry.local/app-{idx}:1.{idx}.0",
+            "replicas": idx % 5 + 1,
+            "enabled": idx % 2 == 0,
+            "ports": [8000 + idx, 9000 + idx],
+            "env": {f"VAR_{key}": f"value {key}" for key in range(10)},
+        }
+        for idx in range(services)
+    }
+
+
+def bench(format_: str, text: str, safe: bool = False, repeat: int = 3) -> dict[str, float]:
+    timings = {}
+    for name in backends.available_backends(format_):
+        loader = backends._LOADERS[format_][name]
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            loader(text, safe)
+            spent = time.perf_counter() - start
+            best = spent if best is None else min(best, spent)
+        timings[name] = best
+    return timings
+
+
+if __name__ == '__main__':
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    data = generate(services)
+    documents = {
+        backends.JSON: json.dumps(data, indent=4),
+        backends.TOML: toml.dumps(data),
+        backends.YAML: yaml.dump(data, indent=2, Dumper=backends.yaml_dumper()),
+    }
+    for format_, text in documents.items():
+        print(f"{format_} ({len(text) / 2 ** 20:.1f} MB), selected: {backends.selected_backend(format_)}")
+        for safe in ((False, True) if format_ == backends.YAML else (False,)):
+            timings = bench(format_, text, safe)
+            slowest = max(timings.values())
+            for name, spent in sorted(timings.items(), key=lambda item: item[1]):
+                print(f"  {name + (' (safe)' if safe else ''):<16} {spent:.3f}s  {slowest / spent:.1f}x")
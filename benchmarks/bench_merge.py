@@ -0,0 +1,69 @@
+"""
+Compares merging overlays with the copy-on-write engine (+ and merge_all) against deepcopy per operation.
+Run from the repository root: python -m benchmarks.bench_merge [services] [overlays]
+"""
+import sys
+import time
+from copy import deepcopy
+from deployment_tools.files import JsonBuilder
+
+
+def deepcopy_merge(base: dict, other: dict):
+    """
+    The previous merge - operand deep-copied before every merge;
+    """
+    for key, value in deepcopy(other).items():
+        if key in base and isinstance(base[key], dict) and isinstance(value, dict):
+            deepcopy_merge(base[key], value)
+        else:
+            base[key] = value
+
+
+def generate(services: int, seed: int) -> dict:
+    return {
+        f"service-{idx}": {
+            "image": {"repository": f"registry.local/app-{idx}", "tag": f"1.{seed}.0"},
+            "resources": {"limits": {"cpu": seed % 4 + 1, "memory": f"{seed}Gi"}},
+            "env": {f"VAR_{key}": f"value {key} {seed}" for key in range(10)},
+            "ports": [8000 + idx, 9000 + seed],
+        }
+        for idx in range(services)
+    }
+
+
+def builder(base: dict) -> JsonBuilder:
+    instance = JsonBuilder('/nonexistent/values.json')
+    instance.replace_all_data(base)
+    return instance
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    base, overlays = generate(services, 0), [generate(services, seed) for seed in range(1, count + 1)]
+    reference, sequential, merged = deepcopy(base), builder(base), builder(base)
+
+    def run_deepcopy():
+        for overlay in overlays:
+            deepcopy_merge(reference, overlay)
+
+    def run_sequential():
+        for overlay in overlays:
+            sequential + overlay
+
+    timings = {
+        "deepcopy per +": timed(run_deepcopy),
+        "copy-on-write +": timed(run_sequential),
+        "merge_all": timed(lambda: merged.merge_all(overlays)),
+    }
+    assert reference == sequential.base_data == merged.base_data
+    print(f"{services} services, {count} overlays")
+    slowest = max(timings.values())
+    for name, spent in timings.items():
+        print(f"  {name:<16} {spent:.3f}s  {slowest / spent:.1f}x")
@@ -0,0 +1,34 @@
+"""
+Compares a persistent ShellSession against spawning a new shell per Command.
+Run from the repository root: python -m benchmarks.bench_session [count]
+"""
+import sys
+import time
+from deployment_tools import Command
+from deployment_tools.session import ShellSession
+
+COMMANDS = [['test -f README.md'], ['echo probe'], ['true']]
+
+
+def bench_spawn(count: int) -> float:
+    start = time.perf_counter()
+    for idx in range(count):
+        Command(COMMANDS[idx % len(COMMANDS)], verbose=False, logger=lambda _: None)
+    return time.perf_counter() - start
+
+
+def bench_session(count: int) -> float:
+    start = time.perf_counter()
+    with ShellSession(verbose=False, logger=lambda _: None) as session:
+        for idx in range(count):
+            session.run(COMMANDS[idx % len(COMMANDS)])
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    spawn, session = bench_spawn(count), bench_session(count)
+    print(f"{count} commands")
+    print(f"Command per spawn: {spawn:.3f}s ({spawn / count * 1e3:.3f} ms/cmd)")
+    print(f"ShellSession:      {session:.3f}s ({session / count * 1e3:.3f} ms/cmd)")
+    print(f"speedup: {spawn / session:.1f}x")
@@ -1,3 +1,16 @@
 from .pyshell import Command, ShellCommandError
-from .files import create_file_builder
+from .matchers import Matcher
+from .cache import CommandCache
+from .metrics import CommandMetrics, TraceRecorder, recorder
+from .group import CommandGroup, run_parallel
+from .async_pyshell import AsyncCommand
+from .pipeline import Pipeline, Step
+from .session import ShellSession
+from .files import create_file_builder, save_all, enable_parse_cache, disable_parse_cache
+from .patch import JsonPatchError
+from .templates import Template
+from .bulk import BulkEdit, bulk_edit
+from .walker import Walker
+from .handle import DirectoryHandle
+from .store import ContentStore
 from .directory import WorkingDirectory
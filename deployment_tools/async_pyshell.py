@@ -0,0 +1,124 @@
+from __future__ import annotations
+import asyncio
+import subprocess
+import time
+from typing import AsyncIterator, Callable
+from sys import platform as PLATFORM
+from .pyshell import _BaseCommand, STDOUT, STDERR
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class AsyncCommand(_BaseCommand):
+    """
+    asyncio version of Command, the command starts when awaited or iterated.
+    Example:
+    cmd = await AsyncCommand(["python3", "-m", "unittest", "test_file.py"]).set_failure("FAILED (failures=")
+    cmd.raise_on_failure()
+    async for stream, line in AsyncCommand(["make", "build"]): ...
+    Cancelling the awaiting task terminates the process group of the command.
+    The event loop reaps the child, so self.metrics has no cpu times/peak rss.
+    """
+
+    def __init__(
+        self,
+        args: list[str],
+        verbose: bool = True,
+        shell: bool = True,
+        buffer_size: int = 1000,
+        fail_fast: bool = False,
+        timeout: float | None = None,
+        idle_timeout: float | None = None,
+        kill_grace: float = 5,
+        logger: Callable[[str], None] = print,
+        env: dict[str, str] | None = None,
+        encoding: str | None = None,
+        cwd: str | None = None
+    ) -> None:
+        super().__init__(
+            args, verbose, shell, buffer_size, fail_fast, timeout, idle_timeout, kill_grace, logger, env, encoding, cwd
+        )
+
+    def __await__(self):
+        return self.run().__await__()
+
+    def __aiter__(self) -> AsyncIterator[tuple[str, str]]:
+        return self.iter_lines()
+
+    async def run(self) -> AsyncCommand:
+        async for _ in self.iter_lines():
+            pass
+        self.log_errors()
+        return self
+
+    async def iter_lines(self) -> AsyncIterator[tuple[str, str]]:
+        """
+        Starts the command and yields (STDOUT | STDERR, line) as soon as lines are produced;
+        """
+        self._start_metrics()
+        self._process = await self._spawn()
+        pending = asyncio.Queue(maxsize=self.buffer_size)
+        readers = [
+            asyncio.ensure_future(self._read_pipe(name, pipe, pending))
+            for name, pipe in ((STDOUT, self._process.stdout), (STDERR, self._process.stderr))
+        ]
+        self._start_streams()
+        started = last_output = time.monotonic()
+        open_pipes = 2
+        try:
+            while open_pipes:
+                try:
+                    name, raw_line = await asyncio.wait_for(pending.get(), self._time_left(started, last_output))
+                except asyncio.TimeoutError:
+                    raise self._timeout_error(started) from None
+                last_output = time.monotonic()
+                if raw_line is None:
+                    open_pipes -= 1
+                    continue
+                yield name, self._handle_line(name, raw_line)
+            try:
+                await asyncio.wait_for(self._process.wait(), self._time_left(started, last_output))
+            except asyncio.TimeoutError:
+                raise self._timeout_error(started) from None
+        finally:
+            for reader in readers:
+                reader.cancel()
+            await self._terminate()
+            self.returncode = self._process.returncode
+            self._finish_metrics()
+        self._finish_streams()
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        pipes = {
+            "stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.PIPE, "env": self.env, "cwd": self.cwd,
+            **self._session_kwargs()
+        }
+        if not self.shell:
+            return await asyncio.create_subprocess_exec(*self.args, **pipes)
+        if PLATFORM == 'win32':
+            return await asyncio.create_subprocess_shell(subprocess.list2cmdline(self.args), **pipes)
+        # same as subprocess with shell=True: first item is the script, the rest are its positional args
+        return await asyncio.create_subprocess_exec('/bin/sh', '-c', *self.args, **pipes)
+
+    async def _terminate(self):
+        """
+        Terminates the whole process group, SIGTERM first and SIGKILL after kill_grace seconds;
+        """
+        if self._process.returncode is not None:
+            return
+        self._signal_group(force=False)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._process.wait()), self.kill_grace)
+        except asyncio.TimeoutError:
+            self._signal_group(force=True)
+            await self._process.wait()
+
+    @staticmethod
+    async def _read_pipe(name: str, pipe: asyncio.StreamReader, pending: asyncio.Queue):
+        partial = b''
+        while chunk := await pipe.read(_CHUNK_SIZE):
+            *lines, partial = (partial + chunk).split(b'\n')
+            for line in lines:
+                await pending.put((name, line + b'\n'))
+        partial and await pending.put((name, partial))
+        await pending.put((name, None))
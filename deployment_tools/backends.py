@@ -0,0 +1,98 @@
+from __future__ import annotations
+import json
+from typing import Any, Callable
+import toml
+import yaml
+
+JSON = "json"
+TOML = "toml"
+YAML = "yaml"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+LIBYAML = yaml.__with_libyaml__
+# reference backends, also used as fallback when a fast backend rejects a document
+_REFERENCE = {JSON: "json", TOML: "toml", YAML: "pyyaml"}
+
+
+def _orjson_load(text: str, safe: bool) -> Any:
+    return orjson.loads(text)
+
+
+def _tomllib_load(text: str, safe: bool) -> Any:
+    return tomllib.loads(text)
+
+
+def _libyaml_load(text: str, safe: bool) -> Any:
+    return yaml.load(text, yaml.CSafeLoader if safe else yaml.CLoader)
+
+
+def _pyyaml_load(text: str, safe: bool) -> Any:
+    return yaml.load(text, yaml.SafeLoader if safe else yaml.Loader)
+
+
+_LOADERS: dict[str, dict[str, Callable[[str, bool], Any]]] = {
+    JSON: {"json": lambda text, safe: json.loads(text)},
+    TOML: {"toml": lambda text, safe: toml.loads(text)},
+    YAML: {"pyyaml": _pyyaml_load},
+}
+orjson is not None and _LOADERS[JSON].update(orjson=_orjson_load)
+tomllib is not None and _LOADERS[TOML].update(tomllib=_tomllib_load)
+LIBYAML and _LOADERS[YAML].update(libyaml=_libyaml_load)
+
+_PREFERENCE = {JSON: ["orjson", "json"], TOML: ["tomllib", "toml"], YAML: ["libyaml", "pyyaml"]}
+_selected = {format_: next(name for name in names if name in _LOADERS[format_]) for format_, names in _PREFERENCE.items()}
+
+
+def available_backends(format_: str) -> list[str]:
+    return list(_LOADERS[format_])
+
+
+def selected_backend(format_: str) -> str:
+    return _selected[format_]
+
+
+def register_backend(format_: str, name: str, loader: Callable[[str, bool], Any], select: bool = True):
+    """
+    Adds a loader(text, safe) for a format (json, toml, yaml), optionally selecting it;
+    """
+    _LOADERS[format_][name] = loader
+    select and use_backend(format_, name)
+
+
+def use_backend(format_: str, name: str):
+    if name not in _LOADERS[format_]:
+        raise ValueError(f"Backend {name} is not available for {format_}, available: {available_backends(format_)}!")
+    _selected[format_] = name
+
+
+def load(format_: str, text: str, safe: bool = False) -> Any:
+    """
+    Parses text with the selected backend, falls back to the reference backend if a fast one rejects the document
+    (e.g. orjson with NaN or big integers, tomllib with documents only the toml package accepts);
+    """
+    name = _selected[format_]
+    try:
+        return _LOADERS[format_][name](text, safe)
+    except Exception:
+        if name == _REFERENCE[format_]:
+            raise
+    return _LOADERS[format_][_REFERENCE[format_]](text, safe)
+
+
+def yaml_loader(safe: bool = False) -> type:
+    return (yaml.CSafeLoader if safe else yaml.CLoader) if LIBYAML else (yaml.SafeLoader if safe else yaml.Loader)
+
+
+def yaml_dumper(safe: bool = False) -> type:
+    if LIBYAML and _selected[YAML] == "libyaml":
+        return yaml.CSafeDumper if safe else yaml.CDumper
+    return yaml.SafeDumper if safe else yaml.Dumper
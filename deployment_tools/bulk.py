@@ -0,0 +1,106 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
+from typing import Callable
+from . import files
+
+
+class EditResult:
+    """
+    Outcome of one file of a BulkEdit - written is False for unchanged files, error holds "Type: message" if the edit failed;
+    """
+
+    def __init__(self, path: str, written: bool = False, error: str | None = None) -> None:
+        self.path = path
+        self.written = written
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{self.path}: {self.error or ('written' if self.written else 'unchanged')}>"
+
+
+def _edit_file(path: str, edit: Callable | None, patch: list[dict] | None, builder_kwargs: dict) -> EditResult:
+    try:
+        builder = files.create_file_builder(path, **builder_kwargs)
+        edit is not None and edit(builder)
+        patch is not None and builder.apply_patch(patch)
+        return EditResult(path, builder.save())
+    except Exception as error:
+        return EditResult(path, error=f"{type(error).__name__}: {error}")
+
+
+class BulkEdit:
+    """
+    Loads, edits and saves many files in a process pool sized to the cores, every file gets its own result and errors
+    do not stop the batch; files are saved only if their content changed, so untouched files keep their mtime.
+    Example:
+    def bump(builder):
+        builder + {"tool": {"poetry": {"version": "1.2.0"}}}
+    BulkEdit("services/**/pyproject.toml", edit=bump).raise_on_failure()
+    BulkEdit(["values-dev.yaml", "values-prod.yaml"], patch=[{"op": "replace", "path": "/image/tag", "value": "1.2"}])
+    paths is a glob (recursive ** supported) or a list of paths, edit(builder) has to be a module level function
+    (it is pickled to the workers), builder_kwargs go to create_file_builder (type_, safe, preserve...).
+    """
+
+    def __init__(
+        self,
+        paths: str | list[str],
+        edit: Callable | None = None,
+        patch: list[dict] | None = None,
+        max_workers: int | None = None,
+        **builder_kwargs
+    ) -> None:
+        paths = sorted(glob.glob(paths, recursive=True)) if isinstance(paths, str) else list(paths)
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.edit = edit
+        self.patch = patch
+        self.max_workers = max_workers
+        self.builder_kwargs = builder_kwargs
+        self.results: list[EditResult] = []
+        self.run()
+
+    def run(self) -> BulkEdit:
+        arguments = (self.edit, self.patch, self.builder_kwargs)
+        if self.max_workers == 1 or len(self.paths) < 2:
+            self.results = [_edit_file(path, *arguments) for path in self.paths]
+            return self
+        workers = self.max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as executor:
+            self.results = list(executor.map(
+                _edit_file, self.paths, *([argument] * len(self.paths) for argument in arguments),
+                chunksize=max(1, len(self.paths) // (4 * workers))
+            ))
+        for result in self.results:
+            result.written and files._parse_cache is not None and files._parse_cache.invalidate(result.path)
+        return self
+
+    @property
+    def written(self) -> list[str]:
+        return [result.path for result in self.results if result.written]
+
+    def failed(self) -> list[EditResult]:
+        return [result for result in self.results if not result.ok]
+
+    def raise_on_failure(self):
+        """
+        raises one exception listing every file that failed;
+        """
+        failed = self.failed()
+        if failed:
+            raise files.FileTransformationError(
+                f"{len(failed)} of {len(self.results)} files failed:\n" + '\n'.join(f"{result.path} => {result.error}" for result in failed)
+            )
+
+
+def bulk_edit(
+    paths: str | list[str], edit: Callable | None = None, patch: list[dict] | None = None, max_workers: int | None = None, **builder_kwargs
+) -> BulkEdit:
+    """
+    Edits all files and returns the BulkEdit holding the per file results;
+    """
+    return BulkEdit(paths, edit, patch, max_workers, **builder_kwargs)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+_CHUNK_SIZE = 1024 * 1024
+_META = "meta.json"
+_FILES = "files"
+_STDOUT = "stdout"
+_STDERR = "stderr"
+
+
+def hash_path(path: str) -> str:
+    """
+    Content hash of a file or of a whole directory (relative paths and file contents), missing paths hash as such;
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(hash_path(file_path).encode())
+    elif os.path.isfile(path):
+        with open(path, 'rb') as file_object:
+            while chunk := file_object.read(_CHUNK_SIZE):
+                digest.update(chunk)
+    else:
+        digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+class CommandCache:
+    """
+    On-disk store of Command results (outputs, exit status and declared output files), bounded by max_bytes with LRU eviction.
+    Example:
+    cache = CommandCache(".deploy_cache")
+    Command(["npm", "run", "build"], cache=cache, inputs=["src", "package.json"], outputs=["dist"]).raise_on_failure()
+    The key covers args, shell mode, working directory, environment (only env_keys if given) and the content of inputs.
+    """
+
+    def __init__(self, root: str = ".command_cache", max_bytes: int = 1024 ** 3, env_keys: list[str] | None = None) -> None:
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.env_keys = env_keys
+        os.makedirs(self.root, exist_ok=True)
+
+    def key(self, args: list[str], shell: bool, env: dict[str, str] | None, inputs: list[str], cwd: str | None = None) -> str:
+        env = dict(os.environ if env is None else env)
+        if self.env_keys is not None:
+            env = {name: env.get(name) for name in self.env_keys}
+        payload = {
+            "args": list(args),
+            "shell": shell,
+            "cwd": os.getcwd() if cwd is None else os.path.abspath(cwd),
+            "env": sorted(env.items()),
+            "inputs": [(path, hash_path(path)) for path in inputs],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def load(self, key: str) -> dict | None:
+        """
+        Returns stored result ({"args", "returncode", "stdout", "stderr", "outputs"}) and marks it as recently used;
+        """
+        meta_path = os.path.join(self._entry(key), _META)
+        try:
+            with open(meta_path, 'r') as file_object:
+                result = json.load(file_object)
+            for stream in (_STDOUT, _STDERR):
+                with open(os.path.join(self._entry(key), stream), 'rb') as file_object:
+                    result[stream] = file_object.read()
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def restore_outputs(self, key: str, outputs: list[str]):
+        """
+        Replaces every stored output, a directory is removed first so files the cached run did not produce do not stay;
+        """
+        for idx, path in enumerate(outputs):
+            stored = os.path.join(self._entry(key), _FILES, str(idx))
+            os.path.exists(stored) and _remove(path)
+            if os.path.isdir(stored):
+                shutil.copytree(stored, path)
+            elif os.path.isfile(stored):
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                shutil.copy2(stored, path)
+
+    def store(self, key: str, args: list[str], returncode: int | None, stdout: bytes, stderr: bytes, outputs: list[str]):
+        temp = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(os.path.join(temp, _FILES))
+        for idx, path in enumerate(outputs):
+            stored = os.path.join(temp, _FILES, str(idx))
+            if os.path.isdir(path):
+                shutil.copytree(path, stored)
+            elif os.path.isfile(path):
+                shutil.copy2(path, stored)
+        for stream, data in ((_STDOUT, stdout), (_STDERR, stderr)):
+            with open(os.path.join(temp, stream), 'wb') as file_object:
+                file_object.write(data)
+        meta = {"args": list(args), "returncode": returncode, "outputs": outputs}
+        with open(os.path.join(temp, _META), 'w') as file_object:
+            json.dump(meta, file_object)
+        self.invalidate(key)
+        try:
+            os.replace(temp, self._entry(key))
+        except OSError:
+            shutil.rmtree(temp, ignore_errors=True)
+        self.evict()
+
+    @staticmethod
+    def _size(entry: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(entry) for name in files
+        )
+
+    def evict(self):
+        """
+        Drops least recently used entries until the store fits in max_bytes;
+        """
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                try:
+                    last_used = os.stat(os.path.join(entry.path, _META)).st_mtime
+                except OSError:
+                    last_used = 0
+                entries.append((last_used, entry.name, self._size(entry.path)))
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.invalidate(key)
+            total -= size
+
+    def invalidate(self, key: str | None = None, args: list[str] | None = None):
+        """
+        Removes the entry with key, or every entry stored for args;
+        """
+        if key is not None:
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+        if args is not None:
+            for entry in os.scandir(self.root):
+                result = self.load(entry.name) if entry.is_dir() else None
+                if result is not None and result["args"] == list(args):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self._entry(key), _META))
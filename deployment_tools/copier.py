@@ -0,0 +1,238 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CLONE = "clone"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+READ_WRITE = "read_write"
+MKFIFO = "mkfifo"
+
+_FICLONE = 0x40049409
+_CHUNK_SIZE = 1024 * 1024
+_MAX_RANGE = 1 << 30
+_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EBADF, errno.EPERM}
+# (source device, destination device) pairs where a method already failed as unsupported
+_no_clone: set[tuple[int, int]] = set()
+_no_copy_file_range: set[tuple[int, int]] = set()
+_no_sendfile: set[tuple[int, int]] = set()
+
+
+class CopyStats:
+    """
+    Progress of a ParallelCopier run, passed to the progress callback and returned by run();
+    """
+
+    def __init__(self, total_files: int, total_bytes: int) -> None:
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.methods: dict[str, int] = {}
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        bytes per second;
+        """
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}<{self.files}/{self.total_files} files, {self.bytes / 2 ** 20:.1f} MB, "
+            f"{self.throughput / 2 ** 20:.1f} MB/s>"
+        )
+
+
+def _unsupported(error: OSError, devices: tuple[int, int], disabled: set) -> bool:
+    if error.errno in _UNSUPPORTED:
+        disabled.add(devices)
+        return True
+    return False
+
+
+def _copy_range(src_fd: int, dst_fd: int, size: int, devices: tuple[int, int]) -> str:
+    """
+    Copies the content in the kernel (reflink, copy_file_range, sendfile) falling back to read/write;
+    """
+    if fcntl is not None and devices not in _no_clone:
+        try:
+            fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+            return CLONE
+        except OSError as error:
+            if not _unsupported(error, devices, _no_clone):
+                raise
+    copied = 0
+    if hasattr(os, 'copy_file_range') and devices not in _no_copy_file_range:
+        try:
+            while copied < size and (sent := os.copy_file_range(src_fd, dst_fd, min(size - copied, _MAX_RANGE))):
+                copied += sent
+            if copied >= size:
+                return COPY_FILE_RANGE
+        except OSError as error:
+            if copied or not _unsupported(error, devices, _no_copy_file_range):
+                raise
+    if hasattr(os, 'sendfile') and devices not in _no_sendfile:
+        try:
+            while copied < size and (sent := os.sendfile(dst_fd, src_fd, copied, min(size - copied, _MAX_RANGE))):
+                copied += sent
+            if copied >= size:
+                return SENDFILE
+        except OSError as error:
+            if copied or not _unsupported(error, devices, _no_sendfile):
+                raise
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    while chunk := os.read(src_fd, _CHUNK_SIZE):
+        os.write(dst_fd, chunk)
+    return READ_WRITE
+
+
+def _temp_path(dst: str) -> str:
+    return os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{uuid.uuid4().hex}.tmp")
+
+
+def _copy_special(src: str, dst: str, src_stat: os.stat_result, preserve_metadata: bool) -> str:
+    """
+    Recreates a named pipe at dst (as cp -r does), other special files (sockets, devices) raise SpecialFileError like shutil;
+    """
+    if not stat.S_ISFIFO(src_stat.st_mode):
+        raise shutil.SpecialFileError(f"`{src}` is not a regular file or a named pipe")
+    temp_path = _temp_path(dst)
+    os.mkfifo(temp_path)
+    try:
+        shutil.copystat(src, temp_path) if preserve_metadata else os.chmod(temp_path, stat.S_IMODE(src_stat.st_mode))
+        os.replace(temp_path, dst)
+    except BaseException:
+        os.path.lexists(temp_path) and os.remove(temp_path)
+        raise
+    return MKFIFO
+
+
+def copy_file(src: str, dst: str, preserve_metadata: bool = False) -> str:
+    """
+    Copies one file (content and mode, with preserve_metadata also times/flags like shutil.copy2), returns the method used;
+    the copy is written to a temp file next to dst and replaces it, an existing dst (maybe a hardlink) is never written in place.
+    Named pipes are recreated, never opened (that would block until a writer comes).
+    """
+    src_stat = os.stat(src)
+    if not stat.S_ISREG(src_stat.st_mode):
+        return _copy_special(src, dst, src_stat, preserve_metadata)
+    temp_path = _temp_path(dst)
+    # O_NONBLOCK - src replaced by a named pipe meanwhile does not block the open
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0))
+    try:
+        src_stat = os.fstat(src_fd)
+        if not stat.S_ISREG(src_stat.st_mode):
+            raise shutil.SpecialFileError(f"`{src}` is not a regular file anymore")
+        dst_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            method = _copy_range(src_fd, dst_fd, src_stat.st_size, (src_stat.st_dev, os.fstat(dst_fd).st_dev)) \
+                if src_stat.st_size else READ_WRITE
+        finally:
+            os.close(dst_fd)
+        shutil.copystat(src, temp_path) if preserve_metadata else os.chmod(temp_path, stat.S_IMODE(src_stat.st_mode))
+        os.replace(temp_path, dst)
+    except BaseException:
+        os.path.lexists(temp_path) and os.remove(temp_path)
+        raise
+    finally:
+        os.close(src_fd)
+    return method
+
+
+class ParallelCopier:
+    """
+    Copies files and directory trees with a bounded thread pool over a pre-scanned file list.
+    Content is copied in the kernel - reflink (FICLONE) where the filesystem supports it, then copy_file_range, sendfile
+    and read/write as the last resort; methods found unsupported for a pair of devices are not tried again.
+    Example:
+    copier = ParallelCopier(max_workers=16, preserve_metadata=True, progress=print)
+    copier.add("release", "/srv/app/release")
+    stats = copier.run()  # CopyStats with files, bytes, throughput and the count of every method used
+    Symlinks are followed like shutil.copytree does by default; progress(stats) is called every progress_every files and at the end.
+    Named pipes in the trees are recreated, sockets and devices are skipped.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        preserve_metadata: bool = False,
+        progress: Callable[[CopyStats], None] | None = None,
+        progress_every: int = 1000
+    ) -> None:
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.preserve_metadata = preserve_metadata
+        self.progress = progress
+        self.progress_every = progress_every
+        self.directories: list[tuple[str, str, bool]] = []
+        self.files: list[tuple[str, str, int, bool]] = []
+        self._lock = threading.Lock()
+
+    def add(self, src: str, dst: str, preserve_metadata: bool | None = None, size: int | None = None) -> ParallelCopier:
+        """
+        Adds a file or a whole directory tree (scanned right away), preserve_metadata overrides the copier's setting;
+        a known size (e.g. from a DirEntry stat) marks src as a file and skips its stat.
+        """
+        preserve_metadata = self.preserve_metadata if preserve_metadata is None else preserve_metadata
+        if size is not None:
+            self.files.append((src, dst, size, preserve_metadata))
+        elif os.path.isdir(src):
+            self._scan(src, dst, preserve_metadata)
+        else:
+            self.files.append((src, dst, os.stat(src).st_size, preserve_metadata))
+        return self
+
+    def _scan(self, src: str, dst: str, preserve_metadata: bool):
+        self.directories.append((src, dst, preserve_metadata))
+        with os.scandir(src) as entries:
+            for entry in entries:
+                target = os.path.join(dst, entry.name)
+                if entry.is_dir():
+                    self._scan(entry.path, target, preserve_metadata)
+                    continue
+                entry_stat = entry.stat()
+                if stat.S_ISREG(entry_stat.st_mode) or stat.S_ISFIFO(entry_stat.st_mode):
+                    self.files.append((entry.path, target, entry_stat.st_size, preserve_metadata))
+
+    def _copy(self, stats: CopyStats, src: str, dst: str, size: int, preserve_metadata: bool):
+        method = copy_file(src, dst, preserve_metadata)
+        with self._lock:
+            stats.files += 1
+            stats.bytes += size
+            stats.methods[method] = stats.methods.get(method, 0) + 1
+            if self.progress is not None and stats.files % self.progress_every == 0:
+                stats.elapsed = time.perf_counter() - stats.start
+                self.progress(stats)
+
+    def run(self) -> CopyStats:
+        stats = CopyStats(len(self.files), sum(size for _, _, size, _ in self.files))
+        for _, dst, _ in self.directories:
+            os.makedirs(dst, exist_ok=True)
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for _ in executor.map(lambda item: self._copy(stats, *item), self.files):
+                pass
+        for src, dst, preserve_metadata in reversed(self.directories):
+            preserve_metadata and shutil.copystat(src, dst)
+        stats.elapsed = time.perf_counter() - stats.start
+        self.progress is not None and self.progress(stats)
+        return stats
+
+
+def copy_tree(src: str, dst: str, max_workers: int | None = None, preserve_metadata: bool = False,
+              progress: Callable[[CopyStats], None] | None = None) -> CopyStats:
+    return ParallelCopier(max_workers, preserve_metadata, progress).add(src, dst).run()
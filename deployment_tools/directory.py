@@ -1,7 +1,14 @@
 from __future__ import annotations
+import errno
 import os
 import shutil
+from typing import Callable, Iterator
+from .copier import CopyStats, ParallelCopier
 from .files import create_file_builder
+from .handle import DirectoryHandle
+from .store import CheckoutResult, ContentStore
+from .sync import SyncResult, sync_tree
+from .walker import Walker, is_within, resolved_parts
 ALL = "__all__"
 
 
@@ -21,10 +28,20 @@ class WorkingDirectory:
     def cwd(self):
         return os.getcwd()
 
-    def get_all_files_or_dirs(self, ignore_dot_files=True):
-        if ignore_dot_files:
-            return [file_or_dir for file_or_dir in os.listdir(self.cwd) if file_or_dir[0] != "."]
-        return os.listdir(self.cwd)
+    def get_all_files_or_dirs(self, ignore_dot_files=True, recursive=False, include: list[str] | None = None,
+                              exclude: list[str] | None = None, gitignore=False) -> list[str]:
+        "Entries of the current dir (relative paths of the whole tree with recursive), see Walker for include/exclude/gitignore."
+        return Walker('.', recursive, include, exclude, gitignore, ignore_dot_files).names()
+
+    @staticmethod
+    def handle(path: str = '.', create=False) -> DirectoryHandle:
+        "DirectoryHandle of path (relative to the current dir) - its operations do not depend on later go_to/back calls."
+        return DirectoryHandle(path, create)
+
+    @staticmethod
+    def walk(root: str = '.', **walker_kwargs) -> Walker:
+        "os.scandir walker with .gitignore style include/exclude rules, can be passed as files_or_dirs to move_files/copy_files."
+        return Walker(root, **walker_kwargs)
 
     @staticmethod
     def _build_path_if_not_exist(path: str):
@@ -33,7 +50,41 @@ class WorkingDirectory:
 
     @staticmethod
     def _not_move_in_self(destination, file_or_dir):
-        return os.path.abspath(file_or_dir) not in os.path.abspath(destination)
+        return not is_within(destination, file_or_dir)
+
+    @staticmethod
+    def _outside(destination: str, files_or_dirs: list[str]) -> list[str]:
+        """
+        Drops the entries that are destination or contain it, destination is resolved only once;
+        """
+        destination_parts = resolved_parts(destination)
+        kept = []
+        for file_or_dir in files_or_dirs:
+            parts = resolved_parts(file_or_dir)
+            parts != destination_parts[:len(parts)] and kept.append(file_or_dir)
+        return kept
+
+    @staticmethod
+    def _walked(new_path: str, walker: Walker) -> Iterator[tuple[str, str, os.DirEntry]]:
+        """
+        (source, target, entry) of every file of walker, targets keep the path relative to the walker root;
+        if new_path is inside the walked tree it is not walked, if it is the root there is nothing to do.
+        """
+        prune = ()
+        if is_within(new_path, walker.root):
+            prune = (os.path.relpath(os.path.realpath(new_path), os.path.realpath(walker.root)).replace(os.sep, '/'),)
+            if prune == ('.',):
+                return
+        parents = set()
+        for relative, entry in walker.walk(prune):
+            if entry.is_dir(follow_symlinks=walker.follow_symlinks):
+                continue
+            target = os.path.join(new_path, relative)
+            parent = os.path.dirname(target)
+            if parent not in parents:
+                os.makedirs(parent, exist_ok=True)
+                parents.add(parent)
+            yield entry.path, target, entry
 
     def go_to(self, path: str):
         if os.path.isfile(path):
@@ -49,48 +100,159 @@ class WorkingDirectory:
         self.go_to(self.previous_dirs[0])
         self.previous_dirs = []
 
-    def transfer_with_files(self, new_path: str, files: list[str] or str = ALL):
-        self.move_files(new_path, files)
+    def transfer_with_files(self, new_path: str, files: list[str] or str = ALL, **move_kwargs):
+        self.move_files(new_path, files, **move_kwargs)
         self.go_to(new_path)
 
-    def transfer_and_copy_files(self, new_path: str, files: list[str] or str = ALL):
-        self.copy_files(new_path, files)
+    def transfer_and_copy_files(self, new_path: str, files: list[str] or str = ALL, sync=False, store: ContentStore | None = None,
+                                **copy_kwargs):
+        """
+        With sync=True only new or changed files are copied (see self.sync), copy_kwargs go to copy_files or sync.
+        With a store the files are hardlinked from the ContentStore instead of copied (see self.checkout).
+        """
+        if store is not None:
+            files = self.get_all_files_or_dirs() if files == ALL else files
+            store.checkout('.', new_path, self._outside(new_path, files))
+        elif sync:
+            files = self.get_all_files_or_dirs() if files == ALL else files
+            self.sync('.', new_path, self._outside(new_path, files), **copy_kwargs)
+        else:
+            self.copy_files(new_path, files, **copy_kwargs)
         self.go_to(new_path)
 
-    def move_file(self, new_path: str, file_or_dir_name: str, replace_if_exists=True):
-        "Used to move file or dir."
+    @staticmethod
+    def content_store(root: str = ".content_store", max_workers: int | None = None) -> ContentStore:
+        "Content addressed store for releases, see ContentStore."
+        return ContentStore(root, max_workers)
+
+    @staticmethod
+    def checkout(store: ContentStore, src: str, dst: str, entries: list[str] | None = None) -> CheckoutResult:
+        "Materializes the files of src in dst as hardlinks (reflinks/copies across filesystems) of the blobs in store."
+        return store.checkout(src, dst, entries)
+
+    @staticmethod
+    def collect_garbage(store: ContentStore) -> list[str]:
+        "Deletes the blobs of store no existing release references, returns them."
+        return store.gc()
+
+    @staticmethod
+    def sync(src: str, dst: str, entries: list[str] | None = None, delete=False, checksum=False, max_workers: int | None = None,
+             progress: Callable[[CopyStats], None] | None = None) -> SyncResult:
+        "Copies only new or changed files from src into dst, compared by size and mtime (or content with checksum) against the manifest in dst."
+        return sync_tree(src, dst, entries, delete, checksum, max_workers, progress)
+
+    def _move_destination(self, new_path: str, file_or_dir_name: str, replace_if_exists: bool) -> str | None:
         self._build_path_if_not_exist(new_path)
         new_path = os.path.join(new_path, file_or_dir_name)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
         if os.path.abspath(file_or_dir_name) == os.path.abspath(new_path):
             return
         if replace_if_exists and os.path.isfile(new_path) or os.path.isdir(new_path):
             self.remove(new_path)
-        shutil.move(file_or_dir_name, new_path)
         return new_path
 
-    def move_files(self, new_path: str, files_or_dirs: list[str] or str = ALL, ignore_dot_files=True) -> list[str]:
-        "Used to move files or dirs. If no files are specified will move everything from current dir."
+    @staticmethod
+    def _rename_or_add(file_or_dir_name: str, new_path: str, copier: ParallelCopier) -> bool:
+        """
+        Renames in place, if new_path is on another filesystem adds the source to copier, returns if it was added;
+        """
+        if os.path.islink(file_or_dir_name):
+            shutil.move(file_or_dir_name, new_path)
+            return False
+        try:
+            os.rename(file_or_dir_name, new_path)
+            return False
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+        copier.add(file_or_dir_name, new_path, preserve_metadata=True)
+        return True
+
+    def _move(self, new_path: str, files_or_dirs: list[str], replace_if_exists: bool, copier: ParallelCopier) -> list[str]:
+        moved, copied = [], []
+        for file_or_dir in files_or_dirs:
+            destination = self._move_destination(new_path, file_or_dir, replace_if_exists)
+            destination is not None and self._rename_or_add(file_or_dir, destination, copier) and copied.append(file_or_dir)
+            moved.append(destination)
+        copied and copier.run()
+        for file_or_dir in copied:
+            self.remove(file_or_dir)
+        return moved
+
+    def move_file(self, new_path: str, file_or_dir_name: str, replace_if_exists=True, max_workers: int | None = None,
+                  progress: Callable[[CopyStats], None] | None = None):
+        "Used to move file or dir. Across filesystems it is copied with the parallel copier (keeping metadata) and removed."
+        return self._move(new_path, [file_or_dir_name], replace_if_exists, ParallelCopier(max_workers, progress=progress))[0]
+
+    def move_files(self, new_path: str, files_or_dirs: list[str] or str or Walker = ALL, ignore_dot_files=True,
+                   max_workers: int | None = None, progress: Callable[[CopyStats], None] | None = None) -> list[str]:
+        """
+        Used to move files or dirs. If no files are specified will move everything from current dir.
+        With a Walker its files are moved keeping their path relative to its root (emptied directories stay).
+        """
+        copier = ParallelCopier(max_workers, progress=progress)
+        if isinstance(files_or_dirs, Walker):
+            self._build_path_if_not_exist(new_path)
+            moved, copied = [], []
+            for source, target, _ in self._walked(new_path, files_or_dirs):
+                self._rename_or_add(source, target, copier) and copied.append(source)
+                moved.append(target)
+            copied and copier.run()
+            for source in copied:
+                os.remove(source)
+            return moved
         if files_or_dirs == ALL:
             files_or_dirs = self.get_all_files_or_dirs(ignore_dot_files)
-        return [self.move_file(new_path, file_or_dir) for file_or_dir in files_or_dirs if self._not_move_in_self(new_path, file_or_dir)]
+        return self._move(new_path, self._outside(new_path, files_or_dirs), True, copier)
 
-    def copy_file(self, new_path: str, file_or_dir_name: str, replace_if_exists=True) -> str:
-        "Used to copy file or dir."
+    def _add_copy(self, new_path: str, file_or_dir_name: str, replace_if_exists: bool, copier: ParallelCopier,
+                  preserve_metadata: bool | None) -> str | None:
         self._build_path_if_not_exist(new_path)
         new_path = os.path.join(new_path, file_or_dir_name)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
         if not replace_if_exists and os.path.isfile(new_path) or os.path.isdir(new_path):
             raise FileExistsError(f"{new_path} is present!")
         if os.path.abspath(file_or_dir_name) == os.path.abspath(new_path):
             return
-        shutil.copytree(file_or_dir_name, new_path) if os.path.isdir(file_or_dir_name) \
-            else shutil.copy(file_or_dir_name, new_path)
+        # by default trees keep their metadata (as shutil.copytree) and single files only the mode (as shutil.copy)
+        preserve_metadata = os.path.isdir(file_or_dir_name) if preserve_metadata is None else preserve_metadata
+        copier.add(file_or_dir_name, new_path, preserve_metadata)
+        return new_path
+
+    def copy_file(self, new_path: str, file_or_dir_name: str, replace_if_exists=True, max_workers: int | None = None,
+                  preserve_metadata: bool | None = None, progress: Callable[[CopyStats], None] | None = None) -> str:
+        "Used to copy file or dir, directory trees are copied in parallel with kernel side copies (see ParallelCopier)."
+        copier = ParallelCopier(max_workers, progress=progress)
+        new_path = self._add_copy(new_path, file_or_dir_name, replace_if_exists, copier, preserve_metadata)
+        copier.run()
         return new_path
 
-    def copy_files(self, new_path: str, files_or_dirs: list[str], ignore_dot_files=True, replace_if_exists=True) -> str:
-        "Used to move files or dirs. If no files are specified will move everything from current dir."
+    def copy_files(self, new_path: str, files_or_dirs: list[str] or str or Walker, ignore_dot_files=True, replace_if_exists=True,
+                   max_workers: int | None = None, preserve_metadata: bool | None = None,
+                   progress: Callable[[CopyStats], None] | None = None) -> list[str]:
+        """
+        Used to copy files or dirs. If no files are specified (ALL) will copy everything from current dir.
+        With a Walker its files are copied keeping their path relative to its root, sizes come from the walk.
+        """
+        copier = ParallelCopier(max_workers, progress=progress)
+        if isinstance(files_or_dirs, Walker):
+            self._build_path_if_not_exist(new_path)
+            copied = []
+            for source, target, entry in self._walked(new_path, files_or_dirs):
+                if not replace_if_exists and os.path.lexists(target):
+                    raise FileExistsError(f"{target} is present!")
+                copier.add(source, target, bool(preserve_metadata), entry.stat().st_size)
+                copied.append(target)
+            copier.run()
+            return copied
         if files_or_dirs == ALL:
             files_or_dirs = self.get_all_files_or_dirs(ignore_dot_files)
-        return [self.copy_file(new_path, file_or_dir, replace_if_exists) for file_or_dir in files_or_dirs if self._not_move_in_self(new_path, file_or_dir)]
+        copied = [
+            self._add_copy(new_path, file_or_dir, replace_if_exists, copier, preserve_metadata)
+            for file_or_dir in self._outside(new_path, files_or_dirs)
+        ]
+        copier.run()
+        return copied
 
     @staticmethod
     def remove(file_or_dir):
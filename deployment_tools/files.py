@@ -1,16 +1,254 @@
 from __future__ import annotations
-from io import TextIOWrapper
+from io import StringIO, TextIOWrapper
+from typing import BinaryIO, Callable, Iterable
 from copy import deepcopy
+from collections import OrderedDict
+import hashlib
 import json
+import locale
+import os
+import re
+import threading
+import uuid
 import toml
 import yaml
 from os import path, remove
+from . import backends, patch, preserve
+
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+_CHUNK_SIZE = 1024 * 1024
+# "= {" or "[{" / ", {" - a value that may be an inline table (a false hit in a string only costs the slower parser)
+_TOML_INLINE_TABLE = re.compile(r'[=\[,]\s*\{')
 
 
 class FileTransformationError(Exception):
     pass
 
 
+def _copy_data(data):
+    """
+    deepcopy specialized for parsed documents (dicts, lists and scalars), dict subclasses (toml inline tables) are kept;
+    """
+    if isinstance(data, dict):
+        copied = {key: value if isinstance(value, _IMMUTABLE) else _copy_data(value) for key, value in data.items()}
+        return copied if type(data) is dict else type(data)(copied)
+    if isinstance(data, list):
+        return [value if isinstance(value, _IMMUTABLE) else _copy_data(value) for value in data]
+    return data if isinstance(data, _IMMUTABLE) else deepcopy(data)
+
+
+def _merge_overlays(base: dict, overlays: list[dict]):
+    """
+    Merges the overlays into base in place - nested dicts are merged, any other value replaces the existing one.
+    Overlay values are linked into base instead of copied; a linked dict is copied (shallow) only when a later overlay
+    merges into it and whatever is still linked at the end is copied once, so the overlays are never modified or shared.
+    """
+    linked: set[int] = set()
+    links: list[tuple[dict, object, object]] = []
+
+    def link(parent: dict, key, value):
+        parent[key] = value
+        if not isinstance(value, _IMMUTABLE):
+            linked.add(id(value))
+            links.append((parent, key, value))
+
+    def merge(node: dict, overlay: dict):
+        for key, value in overlay.items():
+            current = node.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                if id(current) in linked:
+                    current = dict(current)
+                    node[key] = current
+                    for child_key, child in current.items():
+                        link(current, child_key, child)
+                merge(current, value)
+            else:
+                link(node, key, value)
+
+    for overlay in overlays:
+        merge(base, overlay)
+    for parent, key, value in links:
+        if parent.get(key) is value:
+            parent[key] = _copy_data(value)
+
+
+class _ParsedCache:
+    """
+    Process-wide LRU of parsed documents keyed by (absolute path, builder) and validated by (st_mtime_ns, st_size, st_ino).
+    Bounded by max_entries and max_bytes (sum of the source file sizes), every read returns a fresh copy.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple[str, type], tuple[tuple[int, int, int], int, list | dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def signature(stat: os.stat_result) -> tuple[int, int, int]:
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get(self, key: tuple[str, type], stat: os.stat_result) -> list | dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != self.signature(stat):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            data = entry[2]
+        return _copy_data(data)
+
+    def put(self, key: tuple[str, type], stat: os.stat_result, data: list | dict):
+        if stat.st_size > self.max_bytes:
+            return
+        data = _copy_data(data)
+        with self._lock:
+            key in self._entries and self._drop(key)
+            self._entries[key] = (self.signature(stat), stat.st_size, data)
+            self.size += stat.st_size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple[str, type]):
+        self.size -= self._entries.pop(key)[1]
+
+    def invalidate(self, file_path: str):
+        file_path = path.abspath(file_path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == file_path]:
+                self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_parse_cache: _ParsedCache | None = None
+
+
+def _same_content(file_path: str, data: bytes) -> bool:
+    """
+    Compares data with the file on disk (size first, then sha256 of the content);
+    """
+    try:
+        if path.getsize(file_path) != len(data):
+            return False
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file_object:
+            while chunk := file_object.read(_CHUNK_SIZE):
+                digest.update(chunk)
+    except OSError:
+        return False
+    return digest.digest() == hashlib.sha256(data).digest()
+
+
+def _write_temp(file_path: str, data: bytes | Callable[[BinaryIO], None]) -> str:
+    """
+    Writes and fsyncs data to a temporary file next to file_path (keeping its permissions and owner where permitted),
+    returns the temporary path; data can also be a callable writing into the binary temp file object;
+    a symlinked file_path is resolved, the temp file goes next to the real file (see _commit).
+    """
+    file_path = path.realpath(file_path)
+    directory, name = path.split(file_path)
+    temp_path = path.join(directory, f'.{name}.{uuid.uuid4().hex}.tmp')
+    # created with 0o666 so new files get the umask current at this call
+    descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(descriptor, 'wb') as file_object:
+            data(file_object) if callable(data) else file_object.write(data)
+            file_object.flush()
+            os.fsync(file_object.fileno())
+        path.exists(file_path) and _copy_owner_and_mode(os.stat(file_path), temp_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _copy_owner_and_mode(stat_result: os.stat_result, temp_path: str):
+    if hasattr(os, 'chown') and (stat_result.st_uid, stat_result.st_gid) != (os.getuid(), os.getgid()):
+        try:
+            os.chown(temp_path, stat_result.st_uid, stat_result.st_gid)
+        except PermissionError:
+            # only root can give files away, the group only to groups of the user
+            try:
+                os.chown(temp_path, -1, stat_result.st_gid)
+            except PermissionError:
+                pass
+    # after chown, which may clear setuid/setgid bits
+    os.chmod(temp_path, stat_result.st_mode & 0o7777)
+
+
+def _commit(temp_path: str, file_path: str) -> str:
+    """
+    Replaces the real file behind file_path (symlinks stay links) with temp_path, returns the directory to fsync;
+    """
+    file_path = path.realpath(file_path)
+    os.replace(temp_path, file_path)
+    return path.dirname(file_path)
+
+
+def _fsync_directory(directory: str):
+    if os.name == 'nt':
+        return
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _alternation(patterns: dict[str, str]) -> re.Pattern:
+    """
+    One regex matching any of the literal patterns, longer patterns first so they win on the same position;
+    """
+    if not patterns or '' in patterns:
+        raise ValueError("Patterns have to be non empty strings!")
+    return re.compile('|'.join(re.escape(pattern) for pattern in sorted(patterns, key=len, reverse=True)))
+
+
+def _line_replacer(replace_lines: dict[str, str]) -> Callable[[str], tuple[str, list[str]] | None]:
+    """
+    replace_line(pattern, new_line) for every pattern in order as one search of the line, the returned function gives
+    (new line, patterns that replaced it) or None; the first pattern in the line decides, the rest depends only on its new line.
+    """
+    order = {pattern: idx for idx, pattern in enumerate(replace_lines)}
+    any_pattern = _alternation(replace_lines)
+    # the longest pattern at every position, the shorter ones in the line are substrings of the found ones
+    at_positions = re.compile(f"(?=({any_pattern.pattern}))")
+    first = {found: min((pattern for pattern in order if pattern in found), key=order.get) for found in order}
+    chains = {}
+    for pattern, idx in order.items():
+        line, replaced_by = replace_lines[pattern], [pattern]
+        for later in list(order)[idx + 1:]:
+            if later in line:
+                line, replaced_by = replace_lines[later], replaced_by + [later]
+        chains[pattern] = (line, replaced_by)
+
+    def replace(line: str) -> tuple[str, list[str]] | None:
+        found = any_pattern.search(line)
+        if found is None:
+            return None
+        return chains[min(map(first.get, at_positions.findall(line, found.start())), key=order.get)]
+    return replace
+
+
+def enable_parse_cache(max_entries: int = 128, max_bytes: int = 256 * 1024 ** 2) -> _ParsedCache:
+    """
+    Opt-in cache of parsed files for all builders (and WorkingDirectory()[file] reads);
+    """
+    global _parse_cache
+    _parse_cache = _ParsedCache(max_entries, max_bytes)
+    return _parse_cache
+
+
+def disable_parse_cache():
+    global _parse_cache
+    _parse_cache = None
+
+
 class _BaseBuilder:
     _default = dict
 
@@ -21,15 +259,32 @@ class _BaseBuilder:
     def _read(self, blanked: bool) -> dict | list | None:
         if not path.isfile(self.path) or blanked:
             return self._default()
-        with open(self.path, 'r') as file_object:
-            return self._load(file_object)
+        cache = _parse_cache
+        if cache is None:
+            with open(self.path, 'r') as file_object:
+                return self._load(file_object)
+        key, stat = (path.abspath(self.path), type(self)), os.stat(self.path)
+        data = cache.get(key, stat)
+        if data is None:
+            with open(self.path, 'r') as file_object:
+                data = self._load(file_object)
+            cache.put(key, stat, data)
+        return data
 
     def _load(self, file_object: TextIOWrapper) -> dict | list:
         NotImplementedError()
 
-    def _write(self):
-        with open(self.path, 'w') as file_object:
-            return self._dump(self.base_data, file_object)
+    def _serialize(self) -> bytes:
+        """
+        Content as it would be written by open(path, 'w') - locale encoding and platform new lines;
+        """
+        buffer = StringIO()
+        self._dump(self.base_data, buffer)
+        return self._encode(buffer.getvalue())
+
+    @staticmethod
+    def _encode(text: str) -> bytes:
+        return text.replace('\n', os.linesep).encode(locale.getpreferredencoding(False))
 
     def _dump(self, new_data: dict | list, file_object: TextIOWrapper):
         NotImplementedError()
@@ -44,7 +299,23 @@ class _BaseBuilder:
         self.base_data[key] = value
 
     def __add__(self, other) -> _BaseBuilder:
-        self._handle_addition(self.base_data, deepcopy(other))
+        self._handle_addition(self.base_data, other)
+        return self
+
+    def merge_all(self, overlays: Iterable) -> _BaseBuilder:
+        """
+        Same as adding the overlays one by one, but dict overlays are merged in one traversal copying only the final values;
+        """
+        overlays = list(overlays)
+        start = 0
+        while start < len(overlays) and not (isinstance(self.base_data, dict) and self.base_data):
+            self + overlays[start]
+            start += 1
+        if start < len(overlays):
+            for overlay in overlays[start:]:
+                if not isinstance(overlay, dict):
+                    raise TypeError(f"Unsupported operand ('+') for type: {type(overlay)}!")
+            _merge_overlays(self.base_data, overlays[start:])
         return self
 
     def _handle_addition(self, base, other):
@@ -53,21 +324,13 @@ class _BaseBuilder:
             return
         match base:
             case dict(base):
-                if isinstance(other, dict):
-                    for key, value in other.items():
-                        if key in base:
-                            if isinstance(value, dict):
-                                self._handle_addition(base[key], value)
-                            else:
-                                base[key] = value
-                        else:
-                            base[key] = value
-                else:
+                if not isinstance(other, dict):
                     raise TypeError(f"Unsupported operand ('+') for type: {type(other)}!")
-            case list(base): base.extend(other) if isinstance(other, list) else base.append(other)
+                _merge_overlays(base, [other])
+            case list(base): base.extend(_copy_data(other)) if isinstance(other, list) else base.append(_copy_data(other))
 
     def __sub__(self, other) -> _BaseBuilder:
-        self._handle_subtraction(self.base_data, deepcopy(other))
+        self._handle_subtraction(self.base_data, other)
         return self
 
     def _handle_subtraction(self, base, other):
@@ -81,35 +344,80 @@ class _BaseBuilder:
             case list(base):
                 match other:
                     case int(idx): del base[idx]
-                    case str(pattern): self.replace_all_data([line for line in base if pattern not in line])
+                    case str(pattern): self.base_data = [line for line in base if pattern not in line]
                     case _: raise TypeError(f"Unsupported operand ('-') for type: {type(other)}!")
 
     def replace_all_data(self, value: list | dict):
-        self.base_data = deepcopy(value)
+        self.base_data = _copy_data(value)
+
+    def diff(self, other: _BaseBuilder | dict | list) -> list[dict]:
+        """
+        RFC 6902 JSON Patch operations turning this builder's data into other's (a builder or the data itself);
+        """
+        return patch.diff(self.base_data, other.base_data if isinstance(other, _BaseBuilder) else other)
+
+    def apply_patch(self, operations: list[dict]) -> _BaseBuilder:
+        """
+        Applies RFC 6902 JSON Patch operations to base_data in place, raises JsonPatchError and keeps the data on failure;
+        """
+        self.base_data = patch.apply_patch(self.base_data, _copy_data(operations))
+        return self
 
-    def save(self):
+    def _prepare_save(self) -> bytes | None:
+        """
+        Post processes and serializes the data, returns None if the file already holds the same content;
+        """
         self.base_data = self._post_processing(self.base_data)
-        self._write()
+        data = self._serialize()
+        return None if _same_content(self.path, data) else data
+
+    def _stage(self) -> str | None:
+        """
+        Writes the new content to a temp file next to the file, returns its path or None if the content did not change;
+        """
+        data = self._prepare_save()
+        return None if data is None else _write_temp(self.path, data)
+
+    def _committed(self):
+        _parse_cache is not None and _parse_cache.invalidate(self.path)
+
+    def save(self) -> bool:
+        """
+        Writes the file atomically (temp file, fsync, os.replace) only if the content changed, returns if it was written;
+        """
+        temp_path = self._stage()
+        if temp_path is None:
+            return False
+        _fsync_directory(_commit(temp_path, self.path))
+        self._committed()
+        return True
 
     def delete(self):
         if path.isfile(self.path):
             remove(self.path)
+        _parse_cache is not None and _parse_cache.invalidate(self.path)
 
 
 class JsonBuilder(_BaseBuilder):
     def _load(self, file_object: TextIOWrapper):
-        return json.load(file_object)
+        return backends.load(backends.JSON, file_object.read())
 
     def _dump(self, new_data: dict | list, file_object: TextIOWrapper):
         return json.dump(new_data, file_object, indent=4)
 
 
 class TomlBuilder(_BaseBuilder):
+    """
+    Inline tables are written back inline - documents having them are parsed by toml (which marks them) instead of the
+    fast backend, so a save does not turn them into [table] sections (arrays of tables are still written as [[table]]);
+    """
+
     def _load(self, file_object: TextIOWrapper):
-        return toml.load(file_object)
+        text = file_object.read()
+        return toml.loads(text) if _TOML_INLINE_TABLE.search(text) else backends.load(backends.TOML, text)
 
     def _dump(self, new_data: dict | list, file_object: TextIOWrapper):
-        return toml.dump(new_data, file_object)
+        return toml.dump(new_data, file_object, encoder=toml.TomlPreserveInlineDictEncoder())
 
     def _post_processing(self, base_data) -> list | dict:
         if not isinstance(base_data, dict):
@@ -118,11 +426,80 @@ class TomlBuilder(_BaseBuilder):
 
 
 class YamlBuilder(_BaseBuilder):
+    safe = False
+
     def _load(self, file_object: TextIOWrapper):
-        return yaml.load(file_object, yaml.Loader)
+        return backends.load(backends.YAML, file_object.read(), self.safe)
 
     def _dump(self, new_data: dict | list, file_object: TextIOWrapper):
-        return yaml.dump(new_data, file_object, indent=2, Dumper=yaml.Dumper)
+        return yaml.dump(new_data, file_object, indent=2, Dumper=backends.yaml_dumper(self.safe))
+
+
+class SafeYamlBuilder(YamlBuilder):
+    """
+    Loads only standard yaml tags (no python objects), created with create_file_builder(path, safe=True);
+    """
+    safe = True
+
+
+class PreservingYamlBuilder(YamlBuilder):
+    """
+    Keeps the source text, save() rewrites only the entries that changed so comments and formatting of the rest stay.
+    Created with create_file_builder(path, preserve=True), changes that can not be placed as entry edits
+    (top level that is not a block mapping, anchors/aliases, merge keys...) fall back to dumping the whole document.
+    """
+
+    def _read(self, blanked: bool) -> dict | list | None:
+        self._document = self._pending = None
+        if not path.isfile(self.path) or blanked:
+            return self._default()
+        with open(self.path, 'r') as file_object:
+            self._document = self._new_document(file_object.read())
+        return _copy_data(self._document.load())
+
+    def _new_document(self, text: str) -> preserve.YamlDocument:
+        return preserve.YamlDocument(text, backends.yaml_loader(self.safe), backends.yaml_dumper(self.safe))
+
+    def _serialize(self) -> bytes:
+        text = None if self._document is None else self._document.edit(self.base_data)
+        if text is None:
+            buffer = StringIO()
+            self._dump(self.base_data, buffer)
+            text = buffer.getvalue()
+        self._pending = text
+        return self._encode(text)
+
+    def _committed(self):
+        super()._committed()
+        # composed again only if the builder is edited and saved once more
+        self._document = self._new_document(self._pending)
+
+
+class SafePreservingYamlBuilder(PreservingYamlBuilder):
+    safe = True
+
+
+class PreservingTomlBuilder(TomlBuilder):
+    """
+    With tomlkit installed keeps the parsed tomlkit document and applies only the changed keys to it before dumping,
+    so comments and formatting stay; created with create_file_builder(path, preserve=True), without tomlkit same as TomlBuilder;
+    """
+
+    def _read(self, blanked: bool) -> dict | list | None:
+        self._document = None
+        if preserve.tomlkit is None or not path.isfile(self.path) or blanked:
+            return super()._read(blanked)
+        with open(self.path, 'r') as file_object:
+            self._document = preserve.tomlkit.parse(file_object.read())
+        self._original = self._document.unwrap()
+        return _copy_data(self._original)
+
+    def _serialize(self) -> bytes:
+        if self._document is None:
+            return super()._serialize()
+        preserve.apply_toml(self._document, self._original, self.base_data)
+        self._original = _copy_data(self.base_data)
+        return self._encode(preserve.tomlkit.dumps(self._document))
 
 
 class TxtBuilder(_BaseBuilder):
@@ -150,11 +527,42 @@ class TxtBuilder(_BaseBuilder):
                 replaces += 1
         return replaces
 
+    def replace_many(self, replacements: dict[str, str]) -> dict[str, int]:
+        """
+        Replaces all old strings with their new ones in a single pass, returns the replaced occurrences per old string;
+        Matches never overlap - the leftmost one wins and on the same position the longest old string wins.
+        """
+        if not replacements:
+            return {}
+        pattern, counts = _alternation(replacements), dict.fromkeys(replacements, 0)
+
+        def substitute(found: re.Match) -> str:
+            counts[found.group()] += 1
+            return replacements[found.group()]
+
+        for idx, line in enumerate(self.base_data):
+            pattern.search(line) and self.base_data.__setitem__(idx, pattern.sub(substitute, line))
+        return counts
+
+    def replace_lines_many(self, replace_lines: dict[str, str]) -> dict[str, int]:
+        """
+        Same as replace_line(pattern, new_line) for every pattern in order (so the first pattern in the line wins
+        and a later pattern can replace the new line again) in a single pass, returns the replaced lines per pattern;
+        """
+        if not replace_lines:
+            return {}
+        replace, counts = _line_replacer(replace_lines), dict.fromkeys(replace_lines, 0)
+        for idx, line in enumerate(self.base_data):
+            if (replaced := replace(line)) is not None:
+                self.base_data[idx] = replaced[0]
+                for pattern in replaced[1]:
+                    counts[pattern] += 1
+        return counts
+
     def _handle_addition(self, base: list[str], other):
         match other:
             case dict(replace_lines):
-                for pat, new_line in replace_lines.items():
-                    self.replace_line(pat, new_line)
+                self.replace_lines_many(replace_lines)
             case list(new_lines):
                 base.extend(new_lines)
             case _:
@@ -164,11 +572,167 @@ class TxtBuilder(_BaseBuilder):
         return [line if line.endswith('\n') else f'{line}\n' for line in base_data]
 
 
-def create_file_builder(path: str, type_: str | None = None, blanked=False) -> JsonBuilder | TomlBuilder | YamlBuilder | TxtBuilder:
+REPLACE_LINE = "replace_line"
+REPLACE_STRING = "replace_string"
+REPLACE_MANY = "replace_many"
+REPLACE_LINES_MANY = "replace_lines_many"
+DELETE_PATTERN = "delete_pattern"
+DELETE_INDEX = "delete_index"
+APPEND = "append"
+
+
+class StreamingTxtBuilder(TxtBuilder):
+    """
+    TxtBuilder for very large files, created with create_file_builder(path, streaming=True).
+    The file is never loaded - replace_line(s_many), replace_string_in_lines, replace_many, [-] pattern/index and [+] are recorded
+    and applied by save() in one pass from the file into the temp file, so memory does not depend on the file size.
+    Operations apply in the recorded order (appended lines go through the operations recorded after them),
+    base_data stays empty and the edit methods return None as the counts are known only while saving.
+    """
+
+    def __init__(self, path: str, blanked=False) -> None:
+        self._blanked = blanked
+        self.operations: list[tuple[str, object, object]] = []
+        super().__init__(path, blanked)
+
+    def _read(self, blanked: bool) -> list:
+        return []
+
+    def replace_line(self, pattern: str, new_line: str) -> None:
+        self.operations.append((REPLACE_LINE, pattern, new_line))
+
+    def replace_string_in_lines(self, old: str, new: str) -> None:
+        self.operations.append((REPLACE_STRING, old, new))
+
+    def replace_many(self, replacements: dict[str, str]) -> None:
+        replacements and self.operations.append((REPLACE_MANY, _alternation(replacements), dict(replacements)))
+
+    def replace_lines_many(self, replace_lines: dict[str, str]) -> None:
+        replace_lines and self.operations.append((REPLACE_LINES_MANY, _line_replacer(replace_lines), None))
+
+    def _handle_addition(self, base: list[str], other):
+        match other:
+            case dict(replace_lines):
+                self.replace_lines_many(replace_lines)
+            case list(new_lines):
+                self.operations.append((APPEND, list(new_lines), None))
+            case _:
+                self.operations.append((APPEND, [other], None))
+
+    def _handle_subtraction(self, base: list[str], other):
+        match other:
+            case int(idx) if idx >= 0: self.operations.append((DELETE_INDEX, idx, None))
+            case int(): raise ValueError("Negative indexes are not supported while streaming, the line count is unknown!")
+            case str(pattern): self.operations.append((DELETE_PATTERN, pattern, None))
+            case _: raise TypeError(f"Unsupported operand ('-') for type: {type(other)}!")
+
+    def replace_all_data(self, value: list):
+        self._blanked = True
+        self.operations = []
+        self._handle_addition(self.base_data, value)
+
+    def _apply(self, line: str, start: int, counters: list[int]) -> str | None:
+        """
+        Runs one line through the operations from start, returns the line to write or None if it was deleted;
+        """
+        for idx in range(start, len(self.operations)):
+            kind, first, second = self.operations[idx]
+            if kind == REPLACE_LINE:
+                line = second if first in line else line
+            elif kind == REPLACE_STRING:
+                line = line.replace(first, second)
+            elif kind == REPLACE_MANY:
+                line = first.sub(lambda found: second[found.group()], line) if first.search(line) else line
+            elif kind == REPLACE_LINES_MANY:
+                line = replaced[0] if (replaced := first(line)) is not None else line
+            elif kind == DELETE_PATTERN:
+                if first in line:
+                    return None
+            elif kind == DELETE_INDEX:
+                counters[idx] += 1
+                if counters[idx] - 1 == first:
+                    return None
+        return line if line.endswith('\n') else f'{line}\n'
+
+    def _stream(self, source: TextIOWrapper | None, output: TextIOWrapper) -> bool:
+        """
+        Writes the edited lines of source and the appended lines to output, returns if anything changed;
+        """
+        counters = [0] * len(self.operations)
+        changed = False
+        for line in source if source is not None else ():
+            new_line = self._apply(line, 0, counters)
+            new_line is not None and output.write(new_line)
+            changed = changed or new_line != line
+        for idx, (kind, lines, _) in enumerate(self.operations):
+            if kind == APPEND:
+                for line in lines:
+                    new_line = self._apply(line, idx + 1, counters)
+                    new_line is not None and output.write(new_line)
+                    changed = changed or new_line is not None
+        newlines = source.newlines if source is not None else None
+        return changed or newlines not in (None, os.linesep)
+
+    def _stage(self) -> str | None:
+        exists = path.isfile(self.path)
+        changed = not exists or self._blanked and path.getsize(self.path) > 0
+
+        def write(file_object: BinaryIO):
+            nonlocal changed
+            output = TextIOWrapper(file_object, encoding=locale.getpreferredencoding(False))
+            if exists and not self._blanked:
+                with open(self.path, 'r') as source:
+                    changed = self._stream(source, output) or changed
+            else:
+                changed = self._stream(None, output) or changed
+            output.flush()
+            output.detach()
+
+        temp_path = _write_temp(self.path, write)
+        if not changed:
+            os.remove(temp_path)
+            return None
+        return temp_path
+
+    def _committed(self):
+        super()._committed()
+        self._blanked = False
+        self.operations = []
+
+
+def save_all(*builders: _BaseBuilder) -> list[bool]:
+    """
+    Saves many builders together - all are serialized and written to temp files first, then all replaced at once;
+    Nothing is replaced if any builder fails before the commit. Returns for each builder if it was written.
+    """
+    temp_paths = []
+    try:
+        for builder in builders:
+            temp_paths.append(builder._stage())
+    except BaseException:
+        for temp_path in temp_paths:
+            temp_path is not None and os.remove(temp_path)
+        raise
+    directories = set()
+    for builder, temp_path in zip(builders, temp_paths):
+        if temp_path is not None:
+            directories.add(_commit(temp_path, builder.path))
+            builder._committed()
+    for directory in directories:
+        _fsync_directory(directory)
+    return [temp_path is not None for temp_path in temp_paths]
+
+
+def create_file_builder(
+    path: str, type_: str | None = None, blanked=False, safe=False, streaming=False, preserve=False
+) -> JsonBuilder | TomlBuilder | YamlBuilder | TxtBuilder:
     type_ = path.split('.')[-1].lower() if type_ is None else type_
+    yaml_builder = SafeYamlBuilder if safe else YamlBuilder
+    if preserve:
+        yaml_builder = SafePreservingYamlBuilder if safe else PreservingYamlBuilder
     return {
         "json": JsonBuilder,
-        "toml": TomlBuilder,
-        "yml": YamlBuilder,
-        "yaml": YamlBuilder
-    }.get(type_, TxtBuilder)(path, blanked)
+        "toml": PreservingTomlBuilder if preserve else TomlBuilder,
+        "yml": yaml_builder,
+        "yaml": yaml_builder
+    }.get(type_, StreamingTxtBuilder if streaming else TxtBuilder)(path, blanked)
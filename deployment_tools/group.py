@@ -0,0 +1,85 @@
+from __future__ import annotations
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .pyshell import Command, ShellCommandError
+
+
+class CommandGroup:
+    """
+    Runs independent commands concurrently (at most max_workers at a time), logs of every command are printed as one block.
+    Example:
+    CommandGroup([["docker", "pull", image] for image in images], max_workers=8).raise_on_failure()
+    Commands with conditions can be passed as Command(args, autorun=False).set_failure(...) instances,
+    their loggers collect the block only during run() and are restored afterwards, non verbose commands print nothing.
+    """
+
+    def __init__(self, commands: list[list[str] | Command], max_workers: int | None = None, verbose: bool = True, **command_kwargs) -> None:
+        self.commands = [
+            cmd if isinstance(cmd, Command) else Command(cmd, verbose=verbose, autorun=False, **command_kwargs)
+            for cmd in commands
+        ]
+        self.max_workers = max_workers
+        self.errors: dict[int, Exception] = {}
+        self.logs: dict[int, list[str]] = {idx: [] for idx in range(len(self.commands))}
+        self._print_lock = threading.Lock()
+        self.run()
+
+    def run(self) -> CommandGroup:
+        loggers = [cmd.logger for cmd in self.commands]
+        for idx, cmd in enumerate(self.commands):
+            cmd.logger = self.logs[idx].append
+        try:
+            with ThreadPoolExecutor(self.max_workers) as executor:
+                futures = {executor.submit(cmd.run): idx for idx, cmd in enumerate(self.commands)}
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    if future.exception() is not None:
+                        self.errors[idx] = future.exception()
+                    self._log_block(idx)
+        finally:
+            for cmd, logger in zip(self.commands, loggers):
+                cmd.logger = logger
+        return self
+
+    def _log_block(self, idx: int):
+        if not self.commands[idx].verbose:
+            return
+        with self._print_lock:
+            print(f"[{idx}] {' '.join(self.commands[idx].args)}:")
+            for line in self.logs[idx]:
+                print(line)
+            idx in self.errors and print(self.errors[idx])
+
+    def failed(self) -> list[Command]:
+        """
+        Returns commands that raised or do not meet their success/failure conditions;
+        """
+        return [
+            cmd for idx, cmd in enumerate(self.commands)
+            if idx in self.errors or not cmd.is_success() or cmd.is_failure()
+        ]
+
+    def raise_on_failure(self):
+        """
+        raises one exception listing every failed command;
+        """
+        failed = self.failed()
+        if not failed:
+            return
+        reports = []
+        for idx, cmd in enumerate(self.commands):
+            if cmd in failed:
+                reason = self.errors.get(idx) or (
+                    f'not found in outputs: "{cmd._success_cond}"' if not cmd.is_success()
+                    else '\n'.join(line for line in cmd.error if line)
+                )
+                reports.append(f"{' '.join(cmd.args)} => {reason}")
+        print("SCRIPT INTERRUPTED!!!")
+        raise ShellCommandError(f"{len(failed)} of {len(self.commands)} commands failed:\n" + '\n'.join(reports))
+
+
+def run_parallel(commands: list[list[str] | Command], max_workers: int | None = None, verbose: bool = True, **command_kwargs) -> CommandGroup:
+    """
+    Runs commands concurrently and returns the CommandGroup holding the results;
+    """
+    return CommandGroup(commands, max_workers, verbose, **command_kwargs)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import os
+import shutil
+import stat
+import sys
+from typing import Callable
+from .async_pyshell import AsyncCommand
+from .copier import CopyStats, ParallelCopier
+from .files import _BaseBuilder, create_file_builder
+from .pyshell import Command
+from .walker import is_within
+
+ALL = "__all__"
+_DIRECTORY_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_CLOEXEC', 0)
+# shutil.rmtree takes dir_fd since python 3.11
+_RMTREE_DIR_FD = sys.version_info >= (3, 11)
+
+
+class DirectoryHandle:
+    """
+    Directory bound to an open file descriptor, nothing calls os.chdir, so many handles can be used at once
+    from threads or asyncio tasks (one per deployment target) without touching the cwd of the process.
+    Example:
+    with DirectoryHandle("releases/1.2.0", create=True) as release:
+        release["config.json"] = {"debug": False}
+        with release / "static" as static:
+            static.copy_files(".", ["/srv/build/app.js"])
+        release.command(["make", "install"]).raise_on_failure()
+    File operations resolve names against the descriptor (dir_fd / *at syscalls where the platform supports them),
+    builders, copies and commands (cwd=) get paths joined to the directory resolved when the handle was opened.
+    """
+
+    def __init__(self, path: str = '.', create: bool = False, parent: DirectoryHandle | None = None) -> None:
+        if create:
+            parent.makedirs(path) if parent is not None else os.makedirs(path, exist_ok=True)
+        self.path = os.path.realpath(parent.join(path) if parent is not None else path)
+        self.fd: int | None = parent.open(path, _DIRECTORY_FLAGS) if parent is not None else os.open(path, _DIRECTORY_FLAGS)
+
+    def _at(self, name: str, func: Callable) -> tuple[str, dict]:
+        """
+        (name, {"dir_fd": fd}) if func supports dir_fd, else (joined path, {});
+        """
+        if self.fd is None:
+            raise ValueError(f"{self} is closed!")
+        if func in os.supports_dir_fd:
+            return name, {"dir_fd": self.fd}
+        return self.join(name), {}
+
+    def join(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def open(self, name: str, flags: int = os.O_RDONLY, mode: int = 0o777) -> int:
+        name, kwargs = self._at(name, os.open)
+        return os.open(name, flags, mode, **kwargs)
+
+    def stat(self, name: str, follow_symlinks: bool = True) -> os.stat_result:
+        name, kwargs = self._at(name, os.stat)
+        return os.stat(name, follow_symlinks=follow_symlinks, **kwargs)
+
+    def _mode(self, name: str) -> int | None:
+        try:
+            return self.stat(name).st_mode
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def exists(self, name: str) -> bool:
+        return self._mode(name) is not None
+
+    def isfile(self, name: str) -> bool:
+        mode = self._mode(name)
+        return mode is not None and stat.S_ISREG(mode)
+
+    def isdir(self, name: str) -> bool:
+        mode = self._mode(name)
+        return mode is not None and stat.S_ISDIR(mode)
+
+    def get_all_files_or_dirs(self, ignore_dot_files=True) -> list[str]:
+        with os.scandir(self.fd if os.scandir in os.supports_fd else self.path) as entries:
+            return [entry.name for entry in entries if not ignore_dot_files or entry.name[0] != '.']
+
+    def mkdir(self, name: str, mode: int = 0o777):
+        name, kwargs = self._at(name, os.mkdir)
+        os.mkdir(name, mode, **kwargs)
+
+    def makedirs(self, name: str):
+        "Creates name with its missing parents, relative to the handle;"
+        current = ''
+        for part in os.path.normpath(name).split(os.sep):
+            current = os.path.join(current, part) if current else part or os.sep
+            self.isdir(current) or self.mkdir(current)
+
+    def subdirectory(self, name: str, create: bool = False) -> DirectoryHandle:
+        "Handle of a directory relative to this one (opened through this descriptor), close it or use it as context manager;"
+        return DirectoryHandle(name, create, parent=self)
+
+    def remove(self, name: str):
+        if stat.S_ISDIR(self.stat(name, follow_symlinks=False).st_mode):
+            name, kwargs = self._at(name, os.rmdir) if _RMTREE_DIR_FD else (self.join(name), {})
+            shutil.rmtree(name, **kwargs)
+        else:
+            name, kwargs = self._at(name, os.unlink)
+            os.unlink(name, **kwargs)
+
+    def rename(self, name: str, new_name: str, target: DirectoryHandle | None = None):
+        "Renames name (relative to self) to new_name (relative to target, by default self) with renameat;"
+        target = target or self
+        if os.rename in os.supports_dir_fd:
+            os.replace(name, new_name, src_dir_fd=self.fd, dst_dir_fd=target.fd)
+        else:
+            os.replace(self.join(name), target.join(new_name))
+
+    def read_bytes(self, name: str) -> bytes:
+        with os.fdopen(self.open(name), 'rb') as file_object:
+            return file_object.read()
+
+    def read_text(self, name: str) -> str:
+        return self.read_bytes(name).decode()
+
+    def builder(self, name: str, **builder_kwargs) -> _BaseBuilder:
+        "create_file_builder for a file of the directory;"
+        return create_file_builder(self.join(name), **builder_kwargs)
+
+    def command(self, args: list[str], **command_kwargs) -> Command:
+        "Command running in the directory (cwd=);"
+        return Command(args, cwd=self.path, **command_kwargs)
+
+    def async_command(self, args: list[str], **command_kwargs) -> AsyncCommand:
+        return AsyncCommand(args, cwd=self.path, **command_kwargs)
+
+    def copy_files(self, new_path: str, files_or_dirs: list[str] or str = ALL, ignore_dot_files=True, max_workers: int | None = None,
+                   preserve_metadata: bool | None = None, progress: Callable[[CopyStats], None] | None = None) -> list[str]:
+        """
+        Copies entries of the directory (ALL - everything) into new_path, both relative to the handle (absolute paths work as well);
+        """
+        if files_or_dirs == ALL:
+            files_or_dirs = self.get_all_files_or_dirs(ignore_dot_files)
+        self.makedirs(new_path)
+        destination = self.join(new_path)
+        copier, copied = ParallelCopier(max_workers, progress=progress), []
+        for file_or_dir in files_or_dirs:
+            source = self.join(file_or_dir)
+            if is_within(destination, source):
+                continue
+            target = os.path.join(destination, os.path.basename(os.path.normpath(file_or_dir)))
+            os.path.isdir(target) and shutil.rmtree(target)
+            copier.add(source, target, os.path.isdir(source) if preserve_metadata is None else preserve_metadata)
+            copied.append(target)
+        copier.run()
+        return copied
+
+    def move_files(self, new_path: str, files_or_dirs: list[str] or str = ALL, ignore_dot_files=True) -> list[str]:
+        """
+        Moves entries of the directory (ALL - everything) into new_path (relative to the handle) with renameat;
+        """
+        if files_or_dirs == ALL:
+            files_or_dirs = self.get_all_files_or_dirs(ignore_dot_files)
+        self.makedirs(new_path)
+        moved = []
+        with self.subdirectory(new_path) as destination:
+            for file_or_dir in files_or_dirs:
+                if is_within(destination.path, self.join(file_or_dir)):
+                    continue
+                name = os.path.basename(os.path.normpath(file_or_dir))
+                destination.isdir(name) and destination.remove(name)
+                self.rename(file_or_dir, name, destination)
+                moved.append(destination.join(name))
+        return moved
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self) -> DirectoryHandle:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __truediv__(self, other) -> DirectoryHandle:
+        return self.subdirectory(str(other), create=True)
+
+    def __setitem__(self, key: str, item):
+        file_builder = self.builder(key)
+        file_builder + item
+        file_builder.save()
+
+    def __getitem__(self, key: str):
+        return self.builder(key).base_data
+
+    def __str__(self):
+        return f"{self.__class__.__name__}<{self.path}>"
+
+    def __repr__(self) -> str:
+        return str(self)
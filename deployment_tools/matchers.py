@@ -0,0 +1,244 @@
+from __future__ import annotations
+import re
+from collections.abc import Sequence
+from typing import Callable
+from .output import OutputLines
+
+ANY = "any"
+ALL = "all"
+LITERAL = "literal"
+REGEX = "regex"
+ON_LINE = "on_line"
+# inline global flags, group references by number or name and conditionals break a regex inside the alternation
+_ALONE = re.compile(r'\(\?[aiLmsux]+\)|\\[1-9]|\(\?P=|\(\?\(')
+_SCOPED_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'), (re.ASCII, 'a'))
+
+
+class Condition:
+    """
+    Single check of a Matcher - literal (substring of a line), regex (searched in a line) or literal expected on a specific line.
+    """
+
+    def __init__(self, kind: str, pattern: str, line: int | None = None, flags: int = 0) -> None:
+        self.kind = kind
+        self.pattern = pattern
+        self.line = line
+        self._regex = re.compile(pattern, flags) if kind == REGEX else None
+        self._branch = self._as_branch()
+
+    def _as_branch(self) -> str | None:
+        """
+        The condition as a branch of the combined alternation with its flags scoped to it,
+        None if the regex has to be searched on its own (see _ALONE, named groups);
+        """
+        if self._regex is None:
+            return re.escape(self.pattern)
+        if self._regex.groupindex or _ALONE.search(self.pattern):
+            return None
+        flags = ''.join(letter for flag, letter in _SCOPED_FLAGS if self._regex.flags & flag)
+        # a verbose pattern may end with a comment
+        return f"(?{flags}:{self.pattern}\n)" if self._regex.flags & re.VERBOSE else f"(?{flags}:{self.pattern})"
+
+    def matches(self, line: str) -> bool:
+        return bool(self._regex.search(line)) if self._regex is not None else self.pattern in line
+
+    def __str__(self) -> str:
+        if self.kind == REGEX:
+            return f"/{self.pattern}/"
+        if self.kind == ON_LINE:
+            return f"{self.pattern} (on line {self.line})"
+        return self.pattern
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{self}>"
+
+
+class MatchResult:
+    """
+    Outcome of a Matcher over an output, hits maps every condition to the (line number, line) pairs where it matched.
+    """
+
+    def __init__(self, matcher: Matcher, hits: dict[Condition, list[tuple[int, str]]]) -> None:
+        self.matcher = matcher
+        self.hits = hits
+
+    @property
+    def matched(self) -> bool:
+        found = [bool(self.hits[condition]) for condition in self.matcher.conditions]
+        return all(found) if self.matcher.mode == ALL else any(found)
+
+    @property
+    def lines(self) -> dict[str, list[int]]:
+        return {str(condition): [number for number, _ in hits] for condition, hits in self.hits.items()}
+
+    def first_hit(self) -> tuple[int, str] | None:
+        return min((hit for hits in self.hits.values() for hit in hits), default=None)
+
+    def __bool__(self) -> bool:
+        return self.matched
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{self.matched}: {self.lines}>"
+
+
+class MatchState:
+    """
+    Incremental evaluation of a Matcher while lines are streamed, see Matcher.start();
+    """
+
+    def __init__(self, matcher: Matcher) -> None:
+        self.matcher = matcher
+        self.hits: dict[Condition, list[tuple[int, str]]] = {condition: [] for condition in matcher.conditions}
+
+    def feed(self, line_number: int, line: str) -> bool:
+        """
+        Checks one line, returns True if any condition matched it;
+        """
+        matched = False
+        for condition in self.matcher._positional:
+            if condition.line == line_number and condition.matches(line):
+                self.hits[condition].append((line_number, line))
+                matched = True
+        combined = self.matcher._combined()
+        if combined is not None and combined.search(line):
+            matched = self.matcher._check_line(line_number, line, self.hits, self.matcher._alternated) or matched
+        return self.matcher._check_line(line_number, line, self.hits, self.matcher._alone) or matched
+
+    def satisfied(self) -> bool:
+        return MatchResult(self.matcher, self.hits).matched
+
+
+class Matcher:
+    """
+    Any number of literal, regex and line anchored conditions evaluated together with any/all semantics.
+    All non positional conditions are compiled into one alternation, so the output is scanned only once
+    (regexes with inline global flags, named groups or group references are searched separately).
+    Example:
+    Command(["make"]).set_failure(Matcher("error:", "FATAL").regex(r"exit code [1-9]")).raise_on_failure()
+    Matcher(mode=ALL).on_line(0, "Ready").contains("migrations applied")
+    """
+
+    def __init__(self, *literals: str, mode: str = ANY) -> None:
+        if mode not in (ANY, ALL):
+            raise ValueError(f"Unsupported matcher mode: {mode}!")
+        self.mode = mode
+        self.conditions: list[Condition] = []
+        self._positional: list[Condition] = []
+        self._alternated: list[Condition] = []
+        self._alone: list[Condition] = []
+        self._compiled: re.Pattern | None = None
+        self._compiled_bytes: re.Pattern | None = None
+        self.contains(*literals)
+
+    def _add(self, condition: Condition) -> Matcher:
+        self.conditions.append(condition)
+        if condition.kind == ON_LINE:
+            self._positional.append(condition)
+        else:
+            (self._alternated if condition._branch is not None else self._alone).append(condition)
+        self._compiled = self._compiled_bytes = None
+        return self
+
+    def contains(self, *literals: str) -> Matcher:
+        for literal in literals:
+            self._add(Condition(LITERAL, literal))
+        return self
+
+    def regex(self, *patterns: str, flags: int = 0) -> Matcher:
+        for pattern in patterns:
+            self._add(Condition(REGEX, pattern, flags=flags))
+        return self
+
+    def on_line(self, line: int, expected: str) -> Matcher:
+        """
+        expected has to be in the line with the number line (normal python indexing applies);
+        """
+        return self._add(Condition(ON_LINE, expected, line))
+
+    def _scanned(self) -> list[Condition]:
+        return [condition for condition in self.conditions if condition.kind != ON_LINE]
+
+    def _combined(self) -> re.Pattern | None:
+        if self._compiled is None and self._alternated:
+            self._compiled = re.compile('|'.join(condition._branch for condition in self._alternated), re.MULTILINE)
+        return self._compiled
+
+    def _combined_bytes(self, encoding: str) -> re.Pattern | None:
+        """
+        Bytes version of the alternation, only for literal conditions in an ascii compatible encoding;
+        """
+        if any(condition.kind == REGEX for condition in self.conditions) or '\n'.encode(encoding) != b'\n':
+            return None
+        if self._compiled_bytes is None and self._alternated:
+            self._compiled_bytes = re.compile(b'|'.join(
+                re.escape(condition.pattern.encode(encoding)) for condition in self._alternated
+            ))
+        return self._compiled_bytes
+
+    def _check_line(self, line_number: int, line: str, hits: dict[Condition, list[tuple[int, str]]], conditions: list[Condition]) -> bool:
+        matched = False
+        for condition in conditions:
+            if condition.matches(line):
+                hits[condition].append((line_number, line))
+                matched = True
+        return matched
+
+    def start(self) -> MatchState:
+        return MatchState(self)
+
+    def search(self, lines: Sequence[str], state: MatchState | None = None, total: int | None = None) -> MatchResult:
+        """
+        Evaluates the conditions over lines in a single pass;
+        :param: state - streamed evaluation of all lines (only positional conditions from the end are resolved);
+        :param: total - number of lines produced if lines holds only the last of them;
+        """
+        total = len(lines) if total is None else total
+        dropped = total - len(lines)
+        hits = {condition: list(state.hits.get(condition, [])) for condition in self.conditions} if state is not None \
+            else {condition: [] for condition in self.conditions}
+        for condition in self._positional:
+            number = condition.line if condition.line >= 0 else total + condition.line
+            if hits[condition] or not dropped <= number < total:
+                continue
+            condition.matches(lines[number - dropped]) and hits[condition].append((number, lines[number - dropped]))
+        if state is None and self._scanned():
+            self._scan(lines, dropped, hits)
+        return MatchResult(self, hits)
+
+    def _scan(self, lines: Sequence[str], first_line: int, hits: dict[Condition, list[tuple[int, str]]]):
+        combined = self._combined()
+        if not isinstance(lines, OutputLines):
+            for number, line in enumerate(lines, first_line):
+                combined is not None and combined.search(line) and self._check_line(number, line, hits, self._alternated)
+                self._check_line(number, line, hits, self._alone)
+            return
+        combined_bytes = self._combined_bytes(lines.encoding)
+        if combined_bytes is not None:
+            decode = lambda line: str(line, lines.encoding, lines.errors)
+            self._scan_buffer(lines.raw, combined_bytes, b'\n', decode, hits, self._alternated)
+            return
+        text = str(lines.raw, lines.encoding, lines.errors)
+        combined is not None and self._scan_buffer(text, combined, '\n', str, hits, self._alternated)
+        for condition in self._alone:
+            regex = re.compile(condition.pattern, condition._regex.flags | re.MULTILINE)
+            self._scan_buffer(text, regex, '\n', str, hits, [condition])
+
+    def _scan_buffer(self, buffer: bytes | str, combined: re.Pattern, new_line, decode: Callable, hits: dict, conditions: list[Condition]):
+        """
+        One pass of the combined pattern over the whole output, only lines with a hit are split out and checked;
+        """
+        position = counted_to = line_number = 0
+        while position <= len(buffer) and (found := combined.search(buffer, position)) is not None:
+            start = buffer.rfind(new_line, 0, found.start()) + 1
+            end = buffer.find(new_line, found.start())
+            end = len(buffer) if end == -1 else end
+            line_number += buffer.count(new_line, counted_to, start)
+            counted_to = start
+            self._check_line(line_number, decode(buffer[start:end]), hits, conditions)
+            position = end + 1
+
+    def __str__(self) -> str:
+        return f" {'|' if self.mode == ANY else '&'} ".join(str(condition) for condition in self.conditions)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{self.mode}: {self}>"
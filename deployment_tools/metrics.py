@@ -0,0 +1,108 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from collections import deque
+from sys import platform as PLATFORM
+
+
+class CommandMetrics:
+    """
+    Resources used by one command run, cpu times and peak rss are None where the platform can not provide them per child.
+    """
+
+    def __init__(self, args: list[str], start: float) -> None:
+        self.args = args
+        self.start = start
+        self.wall: float = 0
+        self.user_cpu: float | None = None
+        self.sys_cpu: float | None = None
+        self.max_rss: int | None = None
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.returncode: int | None = None
+        self.cached = False
+        self.thread = threading.get_ident()
+
+    def set_usage(self, usage):
+        """
+        Takes resource.struct_rusage of the child (os.wait4), ru_maxrss is normalized to bytes;
+        """
+        self.user_cpu = usage.ru_utime
+        self.sys_cpu = usage.ru_stime
+        self.max_rss = usage.ru_maxrss if PLATFORM == 'darwin' else usage.ru_maxrss * 1024
+
+    def as_dict(self) -> dict:
+        return {
+            "args": self.args,
+            "start": self.start,
+            "wall": self.wall,
+            "user_cpu": self.user_cpu,
+            "sys_cpu": self.sys_cpu,
+            "max_rss": self.max_rss,
+            "stdout_bytes": self.stdout_bytes,
+            "stderr_bytes": self.stderr_bytes,
+            "returncode": self.returncode,
+            "cached": self.cached,
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{' '.join(self.args)}: {self.wall:.3f}s, rc={self.returncode}>"
+
+
+class TraceRecorder:
+    """
+    Collects CommandMetrics of every finished command, can export them as JSON lines or Chrome trace events.
+    Only the last max_records runs are kept (None - all of them), so a long lived process does not grow without bound.
+    Example:
+    recorder.clear()
+    ... deployment ...
+    recorder.to_chrome_trace("deploy_trace.json")  # open in chrome://tracing or ui.perfetto.dev
+    """
+
+    def __init__(self, enabled: bool = True, max_records: int | None = 10000) -> None:
+        self.enabled = enabled
+        self.records: deque[CommandMetrics] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def record(self, metrics: CommandMetrics):
+        if self.enabled:
+            with self._lock:
+                self.records.append(metrics)
+
+    def clear(self):
+        with self._lock:
+            self.records = deque(maxlen=self.records.maxlen)
+
+    def snapshot(self) -> list[CommandMetrics]:
+        "Copy of the records, safe while other threads finish commands;"
+        with self._lock:
+            return list(self.records)
+
+    def to_jsonl(self, path: str):
+        with open(path, 'w') as file_object:
+            for metrics in self.snapshot():
+                file_object.write(json.dumps(metrics.as_dict()) + '\n')
+
+    def chrome_trace_events(self) -> list[dict]:
+        pid = os.getpid()
+        return [
+            {
+                "name": ' '.join(metrics.args),
+                "cat": "command",
+                "ph": "X",
+                "ts": metrics.start * 1e6,
+                "dur": metrics.wall * 1e6,
+                "pid": pid,
+                "tid": metrics.thread,
+                "args": metrics.as_dict(),
+            }
+            for metrics in self.snapshot()
+        ]
+
+    def to_chrome_trace(self, path: str):
+        with open(path, 'w') as file_object:
+            json.dump({"traceEvents": self.chrome_trace_events(), "displayTimeUnit": "ms"}, file_object)
+
+
+recorder = TraceRecorder()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from typing import Iterator
+
+NEW_LINE = b'\n'
+
+
+class OutputLines(Sequence):
+    """
+    Lines of a command output kept as the raw bytes, split on b'\\n' the same way list(output.split('\\n')) would.
+    Lines are decoded only when accessed, the line offset index is built on first random access.
+    raw - the whole output, line_view(idx) - zero-copy memoryview of one line, find_lines(pattern) - search on bytes.
+    """
+
+    def __init__(self, raw: bytes, encoding: str = 'utf-8', errors: str = 'replace') -> None:
+        self.raw = raw
+        self.encoding = encoding
+        self.errors = errors
+        self._view = memoryview(raw)
+        self._offsets: array | None = None
+
+    def _index(self) -> array:
+        if self._offsets is None:
+            offsets = array('Q', [0])
+            find = self.raw.find
+            position = find(NEW_LINE)
+            while position != -1:
+                offsets.append(position + 1)
+                position = find(NEW_LINE, position + 1)
+            self._offsets = offsets
+        return self._offsets
+
+    def _bounds(self, idx: int) -> tuple[int, int]:
+        offsets = self._index()
+        if idx < 0:
+            idx += len(offsets)
+        if not 0 <= idx < len(offsets):
+            raise IndexError("output line index out of range")
+        end = offsets[idx + 1] - 1 if idx + 1 < len(offsets) else len(self.raw)
+        return offsets[idx], end
+
+    def line_view(self, idx: int) -> memoryview:
+        start, end = self._bounds(idx)
+        return self._view[start:end]
+
+    def _decode(self, view: memoryview) -> str:
+        return str(view, self.encoding, self.errors)
+
+    def __getitem__(self, idx: int | slice) -> str | list[str]:
+        if isinstance(idx, slice):
+            return [self[line] for line in range(*idx.indices(len(self)))]
+        return self._decode(self.line_view(idx))
+
+    def __len__(self) -> int:
+        if self._offsets is not None:
+            return len(self._offsets)
+        return self.raw.count(NEW_LINE) + 1
+
+    def __iter__(self) -> Iterator[str]:
+        start, find = 0, self.raw.find
+        while (end := find(NEW_LINE, start)) != -1:
+            yield self._decode(self._view[start:end])
+            start = end + 1
+        yield self._decode(self._view[start:])
+
+    def line_number(self, position: int) -> int:
+        """
+        Line number holding the byte at position;
+        """
+        return bisect_right(self._index(), position) - 1
+
+    def find_lines(self, pattern: str | bytes) -> list[int]:
+        """
+        Numbers of the lines containing pattern, searched on the raw bytes (every line contains an empty pattern);
+        """
+        pattern = pattern.encode(self.encoding) if isinstance(pattern, str) else pattern
+        if NEW_LINE in pattern:
+            return []
+        if not pattern:
+            return list(range(len(self)))
+        found, find = [], self.raw.find
+        position = find(pattern)
+        while position != -1:
+            line = self.line_number(position)
+            found.append(line)
+            next_line = self._offsets[line + 1] if line + 1 < len(self._offsets) else len(self.raw)
+            position = find(pattern, next_line)
+        return found
+
+    def any_line_contains(self, pattern: str | bytes) -> bool:
+        """
+        Same as any(pattern in line for line in self) without decoding or splitting;
+        """
+        pattern = pattern.encode(self.encoding) if isinstance(pattern, str) else pattern
+        return NEW_LINE not in pattern and pattern in self.raw
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, OutputLines):
+            return self.raw == other.raw
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(line == expected for line, expected in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other: object) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{len(self.raw)} bytes>"
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+ADD = "add"
+REMOVE = "remove"
+REPLACE = "replace"
+MOVE = "move"
+COPY = "copy"
+TEST = "test"
+
+_MISSING = object()
+
+
+class JsonPatchError(Exception):
+    pass
+
+
+def escape(token) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _pointer(path: str) -> list[str]:
+    if path == '':
+        return []
+    if not path.startswith('/'):
+        raise JsonPatchError(f"Invalid JSON pointer: {path}!")
+    return [unescape(token) for token in path[1:].split('/')]
+
+
+def diff(old, new, path: str = '') -> list[dict]:
+    """
+    RFC 6902 operations turning old into new, values in the operations are references to new (not copied);
+    Subtrees that are the same object are skipped, equal ones (== holds and the types match) are walked once
+    at the top most level they are found and not diffed further, lists are compared after
+    trimming the common start and end, containers of the same type are diffed recursively, anything else is replaced.
+    """
+    operations = []
+    _diff(old, new, path, operations)
+    return operations
+
+
+def _same(old, new) -> bool:
+    """
+    JSON equality - as == but types have to match at every level, so 1, 1.0 and True differ;
+    == decides in C, only values it finds equal are walked to compare the types.
+    """
+    return old is new or old == new and _same_types(old, new)
+
+
+def _same_types(old, new) -> bool:
+    """
+    If the types of two equal (==) values match at every level;
+    """
+    if old is new:
+        return True
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        return all(_same_types(value, new[key]) for key, value in old.items())
+    if isinstance(old, list):
+        return all(map(_same_types, old, new))
+    return True
+
+
+def _diff(old, new, path: str, operations: list[dict]):
+    if _same(old, new):
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            key not in new and operations.append({"op": REMOVE, "path": f"{path}/{escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, f"{path}/{escape(key)}", operations)
+            else:
+                operations.append({"op": ADD, "path": f"{path}/{escape(key)}", "value": value})
+    elif isinstance(old, list) and isinstance(new, list):
+        _diff_lists(old, new, path, operations)
+    else:
+        operations.append({"op": REPLACE, "path": path, "value": new})
+
+
+def _diff_lists(old: list, new: list, path: str, operations: list[dict]):
+    start, limit = 0, min(len(old), len(new))
+    while start < limit and _same(old[start], new[start]):
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and _same(old[old_end - 1], new[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+    common = min(old_end, new_end) - start
+    for idx in range(start, start + common):
+        _diff(old[idx], new[idx], f"{path}/{idx}", operations)
+    for idx in range(old_end - 1, start + common - 1, -1):
+        operations.append({"op": REMOVE, "path": f"{path}/{idx}"})
+    for idx in range(start + common, new_end):
+        operations.append({"op": ADD, "path": f"{path}/{idx}", "value": new[idx]})
+
+
+def _index(container: list, token: str, adding: bool = False) -> int:
+    if adding and token == '-':
+        return len(container)
+    if not token.isdigit() or token != '0' and token.startswith('0'):
+        raise JsonPatchError(f"Invalid list index: {token}!")
+    idx = int(token)
+    if idx > len(container) or idx == len(container) and not adding:
+        raise JsonPatchError(f"List index out of range: {token}!")
+    return idx
+
+
+def _key(container: dict, token: str):
+    """
+    Key of container matching the token, non string keys (e.g. yaml integers) match their str();
+    """
+    if token in container:
+        return token
+    return next((key for key in container if not isinstance(key, str) and str(key) == token), token)
+
+
+def _resolve(document, tokens: list[str]):
+    for token in tokens:
+        if isinstance(document, dict):
+            token = _key(document, token)
+            if token not in document:
+                raise JsonPatchError(f"Missing key: {token}!")
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_index(document, token)]
+        else:
+            raise JsonPatchError(f"Can not resolve {token} in {type(document)}!")
+    return document
+
+
+class _Patcher:
+    """
+    Applies operations in place and keeps an undo log, so a failing patch leaves the document as it was;
+    """
+
+    def __init__(self, document) -> None:
+        self.document = document
+        self.undo: list[tuple] = []
+
+    def add(self, tokens: list[str], value, replace: bool = False):
+        if not tokens:
+            self.undo.append((REPLACE, None, None, self.document))
+            self.document = value
+            return
+        parent, token = _resolve(self.document, tokens[:-1]), tokens[-1]
+        if isinstance(parent, dict):
+            token = _key(parent, token)
+            self.undo.append((ADD, parent, token, parent.get(token, _MISSING)))
+            parent[token] = value
+        elif isinstance(parent, list) and replace:
+            idx = _index(parent, token)
+            self.undo.append((REPLACE, parent, idx, parent[idx]))
+            parent[idx] = value
+        elif isinstance(parent, list):
+            idx = _index(parent, token, adding=True)
+            parent.insert(idx, value)
+            self.undo.append((ADD, parent, idx, _MISSING))
+        else:
+            raise JsonPatchError(f"Can not add to {type(parent)}!")
+
+    def remove(self, tokens: list[str]):
+        if not tokens:
+            raise JsonPatchError("Can not remove the whole document!")
+        parent, token = _resolve(self.document, tokens[:-1]), tokens[-1]
+        if isinstance(parent, dict):
+            token = _key(parent, token)
+            if token not in parent:
+                raise JsonPatchError(f"Missing key: {token}!")
+            self.undo.append((REMOVE, parent, token, parent.pop(token)))
+        elif isinstance(parent, list):
+            idx = _index(parent, token)
+            self.undo.append((REMOVE, parent, idx, parent.pop(idx)))
+        else:
+            raise JsonPatchError(f"Can not remove from {type(parent)}!")
+        return self.undo[-1][3]
+
+    def apply(self, operation: dict):
+        match operation.get("op"), _pointer(operation.get("path", '')):
+            case "add", tokens: self.add(tokens, operation["value"])
+            case "remove", tokens: self.remove(tokens)
+            case "replace", tokens:
+                _resolve(self.document, tokens)
+                self.add(tokens, operation["value"], replace=True)
+            case "move", tokens:
+                source = _pointer(operation["from"])
+                if tokens[:len(source)] == source and tokens != source:
+                    raise JsonPatchError(f"Can not move {operation['from']} into itself!")
+                self.add(tokens, self.remove(source))
+            case "copy", tokens: self.add(tokens, _copy(_resolve(self.document, _pointer(operation["from"]))))
+            case "test", tokens:
+                if not _same(_resolve(self.document, tokens), operation["value"]):
+                    raise JsonPatchError(f"Test failed for {operation['path']}!")
+            case op, _: raise JsonPatchError(f"Unsupported operation: {op}!")
+
+    def rollback(self):
+        for kind, parent, key, value in reversed(self.undo):
+            if parent is None:
+                self.document = value
+            elif kind == REMOVE:
+                parent.insert(key, value) if isinstance(parent, list) else parent.__setitem__(key, value)
+            elif kind == REPLACE or value is not _MISSING:
+                parent[key] = value
+            else:
+                del parent[key]
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def apply_patch(document, operations: list[dict]):
+    """
+    Applies RFC 6902 operations to document in place and returns it (a new object only if the root was replaced);
+    Raises JsonPatchError and leaves the document unchanged if any operation fails.
+    """
+    patcher = _Patcher(document)
+    try:
+        for operation in operations:
+            patcher.apply(operation)
+    except JsonPatchError:
+        patcher.rollback()
+        raise
+    except (KeyError, TypeError) as error:
+        patcher.rollback()
+        raise JsonPatchError(f"Invalid operation: {error}!") from None
+    return patcher.document
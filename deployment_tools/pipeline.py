@@ -0,0 +1,192 @@
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+from .pyshell import Command, ShellCommandError
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Step:
+    """
+    Pipeline step - optional file edits (callables run first) followed by an optional command.
+    The step fails if an edit raises or the command does not pass raise_on_failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        args: list[str] | None = None,
+        depends_on: list[str] | tuple[str, ...] = (),
+        edits: list[Callable[[], None]] | tuple[Callable[[], None], ...] = (),
+        success: str | None = None,
+        failure: str | None = None,
+        **command_kwargs
+    ) -> None:
+        self.name = name
+        self.args = args
+        self.depends_on = list(depends_on)
+        self.edits = list(edits)
+        self.success = success
+        self.failure = failure
+        self.command_kwargs = command_kwargs
+        self.command: Command | None = None
+
+    def run(self, logger: Callable[[str], None] = print) -> Command | None:
+        for edit in self.edits:
+            edit()
+        if self.args is None:
+            return None
+        self.command = Command(self.args, autorun=False, logger=logger, **self.command_kwargs)
+        self.success is not None and self.command.set_success(self.success)
+        self.failure is not None and self.command.set_failure(self.failure)
+        self.command.run().raise_on_failure()
+        return self.command
+
+
+class Pipeline:
+    """
+    Runs steps as a dependency graph, ready steps run in parallel (at most max_workers at a time).
+    Steps depending (directly or not) on a failed step are skipped, independent branches keep running.
+    Example:
+    Pipeline(max_workers=4)\\
+        .add("lint", ["ruff", "check", "."])\\
+        .add("tests", ["pytest"], failure="FAILED")\\
+        .add("build", ["make", "assets"])\\
+        .add("deploy", ["./deploy.sh"], depends_on=["lint", "tests", "build"])\\
+        .run().raise_on_failure()
+    """
+
+    def __init__(self, steps: list[Step] | None = None, max_workers: int | None = None) -> None:
+        self.steps: dict[str, Step] = {}
+        self.max_workers = max_workers
+        self.status: dict[str, str] = {}
+        self.durations: dict[str, float] = {}
+        self.errors: dict[str, Exception] = {}
+        self.logs: dict[str, list[str]] = {}
+        self._print_lock = threading.Lock()
+        for step in steps or []:
+            self.add_step(step)
+
+    def add(self, name: str, args: list[str] | None = None, depends_on: list[str] | tuple[str, ...] = (), **step_kwargs) -> Pipeline:
+        return self.add_step(Step(name, args, depends_on, **step_kwargs))
+
+    def add_step(self, step: Step) -> Pipeline:
+        if step.name in self.steps:
+            raise ValueError(f"Step {step.name} is already defined!")
+        # a dependency listed twice would be counted twice by the topological order
+        step.depends_on = list(dict.fromkeys(step.depends_on))
+        self.steps[step.name] = step
+        return self
+
+    def _topological_order(self) -> list[str]:
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(f"Step {step.name} depends on unknown step {dependency}!")
+        remaining = {name: len(step.depends_on) for name, step in self.steps.items()}
+        order = [name for name, count in remaining.items() if not count]
+        for name in order:
+            for dependent in self._dependents(name):
+                remaining[dependent] -= 1
+                remaining[dependent] or order.append(dependent)
+        if len(order) != len(self.steps):
+            raise ValueError(f"Dependency cycle between steps: {[name for name in self.steps if name not in order]}")
+        return order
+
+    def _dependents(self, name: str) -> list[str]:
+        return [step.name for step in self.steps.values() if name in step.depends_on]
+
+    def _skip_downstream(self, name: str):
+        for dependent in self._dependents(name):
+            if dependent not in self.status:
+                self.status[dependent] = SKIPPED
+                self._skip_downstream(dependent)
+
+    def _run_step(self, name: str) -> None:
+        started = time.monotonic()
+        try:
+            self.steps[name].run(self.logs[name].append)
+        finally:
+            self.durations[name] = time.monotonic() - started
+
+    def run(self) -> Pipeline:
+        self._topological_order()
+        self.status, self.durations, self.errors = {}, {}, {}
+        self.logs = {name: [] for name in self.steps}
+        running = {}
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            while True:
+                for name, step in self.steps.items():
+                    if name not in self.status and name not in running.values() \
+                            and all(self.status.get(dependency) == OK for dependency in step.depends_on):
+                        running[executor.submit(self._run_step, name)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is None:
+                        self.status[name] = OK
+                    else:
+                        self.status[name] = FAILED
+                        self.errors[name] = future.exception()
+                        self._skip_downstream(name)
+                    self._log_block(name)
+        return self
+
+    def _log_block(self, name: str):
+        with self._print_lock:
+            print(f"[{name}] {self.status[name]} in {self.durations[name]:.2f}s")
+            for line in self.logs[name]:
+                print(line)
+            name in self.errors and print(self.errors[name])
+
+    def critical_path(self) -> tuple[list[str], float]:
+        """
+        Returns the chain of executed steps with the longest total duration and that duration;
+        """
+        finish: dict[str, float] = {}
+        previous: dict[str, str | None] = {}
+        for name in self._topological_order():
+            if name not in self.durations:
+                continue
+            timed = [dependency for dependency in self.steps[name].depends_on if dependency in finish]
+            slowest = max(timed, key=finish.get, default=None)
+            previous[name] = slowest
+            finish[name] = self.durations[name] + (finish[slowest] if slowest else 0)
+        if not finish:
+            return [], 0
+        name = max(finish, key=finish.get)
+        total, path = finish[name], []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], total
+
+    def report(self) -> str:
+        """
+        Per step status and duration followed by the critical path;
+        """
+        lines = [
+            f"{name}: {self.status.get(name, SKIPPED)} {self.durations[name]:.2f}s" if name in self.durations
+            else f"{name}: {self.status.get(name, SKIPPED)}"
+            for name in self._topological_order()
+        ]
+        path, total = self.critical_path()
+        lines.append(f"critical path ({total:.2f}s): {' -> '.join(path)}")
+        return '\n'.join(lines)
+
+    def raise_on_failure(self):
+        """
+        raises one exception listing every failed step and the skipped ones;
+        """
+        if not self.errors:
+            return
+        print("SCRIPT INTERRUPTED!!!")
+        failed = '\n'.join(f"{name} => {error}" for name, error in self.errors.items())
+        skipped = [name for name, status in self.status.items() if status == SKIPPED]
+        raise ShellCommandError(f"failed steps:\n{failed}" + (f"\nskipped steps: {', '.join(skipped)}" if skipped else ''))
@@ -0,0 +1,172 @@
+from __future__ import annotations
+from collections.abc import MutableMapping
+import yaml
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+try:
+    import tomlkit
+except ImportError:
+    tomlkit = None
+
+_MERGE_TAG = "tag:yaml.org,2002:merge"
+
+
+class _NotEditable(Exception):
+    pass
+
+
+def same_data(old, new) -> bool:
+    """
+    Equality that also compares types (so True/1/1.0 or '1'/1 are a change);
+    """
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        return old.keys() == new.keys() and all(same_data(value, new[key]) for key, value in old.items())
+    if isinstance(old, list):
+        return len(old) == len(new) and all(same_data(value, other) for value, other in zip(old, new))
+    return old == new
+
+
+class YamlDocument:
+    """
+    Source text of a yaml file with the positions of its block mapping entries.
+    edit(new) turns the changes from the loaded data to new into edits of only the changed entries,
+    comments, ordering and formatting of everything else stay as they are.
+    """
+
+    def __init__(self, text: str, loader: type, dumper: type) -> None:
+        self.text = text
+        self.data = None
+        self._loader = loader
+        self._dumper = dumper
+        self._root: Node | None = None
+        self._entries: dict[int, dict] = {}
+        self._editable = False
+        self._loaded = False
+
+    def load(self):
+        loader = self._loader(self.text)
+        try:
+            self._root = loader.get_single_node()
+            self.data = None if self._root is None else loader.construct_document(self._root)
+            self._entries = {}
+            try:
+                self._root is not None and self._index(self._root, loader, set())
+                self._editable = True
+            except (_NotEditable, TypeError):
+                self._editable = False
+        finally:
+            loader.dispose()
+        self._loaded = True
+        return self.data
+
+    def _index(self, node: Node, loader: yaml.BaseLoader, seen: set[int]):
+        """
+        Maps the constructed keys of every mapping to their (key node, value node), aliases and merge keys are not editable;
+        """
+        if id(node) in seen:
+            raise _NotEditable()
+        seen.add(id(node))
+        if isinstance(node, MappingNode):
+            entries = {}
+            for key_node, value_node in node.value:
+                if key_node.tag == _MERGE_TAG:
+                    raise _NotEditable()
+                entries[loader.construct_object(key_node, deep=True)] = (key_node, value_node)
+                self._index(value_node, loader, seen)
+            self._entries[id(node)] = entries
+        elif isinstance(node, SequenceNode):
+            for item in node.value:
+                self._index(item, loader, seen)
+
+    def edit(self, new) -> str | None:
+        """
+        Text with the changes to new applied as edits of entries, None if they can not be placed that way
+        (the text is loaded on the first edit if load() was not called);
+        """
+        self._loaded or self.load()
+        if not self._editable or not isinstance(self._root, MappingNode) or self._root.flow_style \
+                or not isinstance(self.data, dict) or not isinstance(new, dict) or not new:
+            return None
+        edits = []
+        try:
+            self._diff(self._root, self.data, new, edits)
+        except (_NotEditable, KeyError):
+            return None
+        pieces, position = [], 0
+        for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+            pieces.append(self.text[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(self.text[position:])
+        return ''.join(pieces)
+
+    def _diff(self, node: MappingNode, old: dict, new: dict, edits: list[tuple[int, int, str]]):
+        entries = self._entries[id(node)]
+        added = {key: value for key, value in new.items() if key not in old}
+        for key, value in new.items():
+            if key in added or same_data(old[key], value):
+                continue
+            key_node, value_node = entries[key]
+            if isinstance(old[key], dict) and isinstance(value, dict) and value \
+                    and isinstance(value_node, MappingNode) and not value_node.flow_style:
+                self._diff(value_node, old[key], value, edits)
+            else:
+                edits.append(self._rewrite(key_node, value_node, {key: value}))
+        for key in old:
+            key not in new and edits.append(self._remove(*entries[key]))
+        added and edits.append(self._insert(node, added))
+
+    def _end(self, node: Node) -> int:
+        """
+        Position after the last character of the node's content (without the trailing new lines of block collections);
+        """
+        while isinstance(node, (MappingNode, SequenceNode)) and not node.flow_style and node.value:
+            node = node.value[-1][1] if isinstance(node, MappingNode) else node.value[-1]
+        end = node.end_mark.index
+        while end > node.start_mark.index and self.text[end - 1] == '\n':
+            end -= 1
+        return end
+
+    def _line_end(self, position: int) -> int:
+        end = self.text.find('\n', position)
+        return len(self.text) if end == -1 else end + 1
+
+    def _dump(self, data: dict, column: int) -> str:
+        text = yaml.dump(data, indent=2, Dumper=self._dumper, default_flow_style=False).rstrip('\n')
+        return text.replace('\n', '\n' + ' ' * column)
+
+    def _rewrite(self, key_node: Node, value_node: Node, entry: dict) -> tuple[int, int, str]:
+        if not isinstance(key_node, ScalarNode):
+            raise _NotEditable()
+        return key_node.start_mark.index, self._end(value_node), self._dump(entry, key_node.start_mark.column)
+
+    def _remove(self, key_node: Node, value_node: Node) -> tuple[int, int, str]:
+        start = key_node.start_mark.index
+        line_start = self.text.rfind('\n', 0, start) + 1
+        if self.text[line_start:start].strip():
+            raise _NotEditable()
+        return line_start, self._line_end(self._end(value_node)), ''
+
+    def _insert(self, node: MappingNode, added: dict) -> tuple[int, int, str]:
+        column = node.value[0][0].start_mark.column
+        position = self._line_end(self._end(node.value[-1][1]))
+        text = ' ' * column + self._dump(added, column) + '\n'
+        return position, position, text if self.text[position - 1:position] in ('\n', '') else '\n' + text
+
+
+def apply_toml(container: MutableMapping, old: dict, new: dict):
+    """
+    Applies the changes from old to new on a tomlkit container, only the changed keys are touched;
+    """
+    for key in [key for key in old if key not in new]:
+        del container[key]
+    for key, value in new.items():
+        if key in old and same_data(old[key], value):
+            continue
+        if key in old and isinstance(old[key], dict) and isinstance(value, dict) \
+                and isinstance(container[key], MutableMapping):
+            apply_toml(container[key], old[key], value)
+        else:
+            container[key] = value
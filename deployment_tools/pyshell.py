@@ -1,68 +1,212 @@
 from __future__ import annotations
+import locale
+import os
+import queue
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
+from typing import IO, Callable, Iterator
 from sys import platform as PLATFORM
+from .cache import CommandCache
+from .metrics import CommandMetrics, recorder
+from .output import OutputLines
+from .matchers import Matcher, MatchResult, MatchState
+
+STDOUT = "stdout"
+STDERR = "stderr"
 
 
 class ShellCommandError(Exception):
     pass
 
 
-class Command:
+class _BaseCommand:
     """
-    Runs command and check output for success, can be used to raise exception in case the command failes.
-    Example:
-    Command(["python3", "-m", "unittest", "test_file.py"]).set_failure("FAILED (failures=").raise_on_failure()
-    If the tests run by the command fail exception with information will be raised, otherwise the code will proceed with execution.
+    Conditions, logging and line bookkeeping shared by Command and AsyncCommand.
     """
 
-    def __init__(self, args: list[str], verbose: bool = True, shell: bool = True) -> None:
+    def __init__(
+        self,
+        args: list[str],
+        verbose: bool = True,
+        shell: bool = True,
+        buffer_size: int = 1000,
+        fail_fast: bool = False,
+        timeout: float | None = None,
+        idle_timeout: float | None = None,
+        kill_grace: float = 5,
+        logger: Callable[[str], None] = print,
+        env: dict[str, str] | None = None,
+        encoding: str | None = None,
+        cwd: str | None = None
+    ) -> None:
         self.args = args
-        self._process = subprocess.run(
-            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=shell
+        self.cwd = cwd
+        self.verbose = verbose
+        self.shell = shell
+        self.env = env
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.buffer_size = buffer_size
+        self.fail_fast = fail_fast
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.kill_grace = kill_grace
+        self.logger = logger
+        self._process = None
+        self.returncode: int | None = None
+        self.metrics: CommandMetrics | None = None
+        self._failure_cond: Matcher | None = None
+        self._success_cond: Matcher | None = None
+        self.output: OutputLines | list[str] = []
+        self.error: OutputLines | list[str] = []
+        self._line_counts = {STDOUT: 0, STDERR: 0}
+        self._match_states: dict[str, MatchState | None] = {STDOUT: None, STDERR: None}
+
+    @staticmethod
+    def _session_kwargs() -> dict:
+        if PLATFORM == 'win32':
+            return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {"start_new_session": True}
+
+    def _start_metrics(self):
+        self.metrics = CommandMetrics(self.args, time.time())
+        self._started_at = time.monotonic()
+        self._usage = None
+
+    def _finish_metrics(self, usage=None):
+        """
+        Completes self.metrics (usage is the rusage of the child if collected) and hands them to the global recorder;
+        """
+        self.metrics.wall = time.monotonic() - self._started_at
+        self.metrics.returncode = self.returncode
+        usage is not None and self.metrics.set_usage(usage)
+        recorder.record(self.metrics)
+
+    def _start_streams(self):
+        self._buffers = {STDOUT: deque(maxlen=self.buffer_size), STDERR: deque(maxlen=self.buffer_size)}
+        self._ends_with_newline = {STDOUT: True, STDERR: True}
+        self._line_counts = {STDOUT: 0, STDERR: 0}
+        self._match_states = {
+            STDOUT: self._success_cond and self._success_cond.start(),
+            STDERR: self._failure_cond and self._failure_cond.start(),
+        }
+
+    def _handle_line(self, name: str, raw_line: bytes) -> str:
+        """
+        Decodes, buffers, logs and checks a streamed line, with fail_fast raises on failure match
+        (without a failure condition on any stderr line - the same default as is_failure());
+        """
+        if name == STDOUT:
+            self.metrics.stdout_bytes += len(raw_line)
+        else:
+            self.metrics.stderr_bytes += len(raw_line)
+        self._ends_with_newline[name] = raw_line.endswith(b'\n')
+        line = (raw_line[:-1] if self._ends_with_newline[name] else raw_line).decode(self.encoding, errors='replace')
+        matched = self._track_line(name, line, self._buffers[name])
+        self.verbose and name == STDOUT and self.logger(f'\t{line}')
+        failed = self._failure_cond is None or matched and self._match_states[STDERR].satisfied()
+        if self.fail_fast and name == STDERR and failed:
+            raise ShellCommandError(f"on command: {' '.join(self.args)} => failure found: {line}")
+        return line
+
+    def _finish_streams(self):
+        for name, ended in self._ends_with_newline.items():
+            ended and self._track_line(name, '', self._buffers[name])
+        self.output = list(self._buffers[STDOUT])
+        self.error = list(self._buffers[STDERR])
+
+    def _time_left(self, started: float, last_output: float) -> float | None:
+        limits = []
+        self.timeout is not None and limits.append(started + self.timeout)
+        self.idle_timeout is not None and limits.append(last_output + self.idle_timeout)
+        return max(min(limits) - time.monotonic(), 0) if limits else None
+
+    def _timeout_error(self, started: float) -> ShellCommandError:
+        if self.timeout is not None and time.monotonic() - started >= self.timeout:
+            reason = f"timed out after {self.timeout}s"
+        else:
+            reason = f"no output for {self.idle_timeout}s"
+        return ShellCommandError(f"on command: {' '.join(self.args)} => {reason}")
+
+    def _signal_group(self, force: bool):
+        if PLATFORM == 'win32':
+            self._process.kill() if force else self._process.terminate()
+            return
+        try:
+            os.killpg(self._process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _track_line(self, name: str, line: str, buffer: deque) -> bool:
+        line_number = self._line_counts[name]
+        self._line_counts[name] += 1
+        buffer.append(line)
+        state = self._match_states[name]
+        return state is not None and state.feed(line_number, line)
+
+    def _match_result(self, name: str) -> MatchResult | None:
+        matcher = self._success_cond if name == STDOUT else self._failure_cond
+        if matcher is None:
+            return None
+        state = self._match_states[name]
+        return matcher.search(
+            self.output if name == STDOUT else self.error,
+            state if state is not None and state.matcher is matcher else None,
+            self._line_counts[name]
         )
-        self._failure_cond = None
-        self._success_cond = None
-        self.output = self._normalize_output(self._process.stdout)
-        self.error = self._normalize_output(self._process.stderr)
-        verbose and self.log_output()
-        self.log_errors()
+
+    def success_matches(self) -> MatchResult | None:
+        """
+        Which success conditions matched and on which stdout lines;
+        """
+        return self._match_result(STDOUT)
+
+    def failure_matches(self) -> MatchResult | None:
+        """
+        Which failure conditions matched and on which stderr lines;
+        """
+        return self._match_result(STDERR)
+
+    @staticmethod
+    def _as_matcher(expect_line: str | Matcher, on_line: int | None) -> Matcher:
+        if isinstance(expect_line, Matcher):
+            return expect_line
+        return Matcher(expect_line) if on_line is None else Matcher().on_line(on_line, expect_line)
 
     def log_output(self):
         for line in self.output:
-            print(f'\t{line}')
+            self.logger(f'\t{line}')
 
     def log_errors(self):
         """
         logs infromation stored in stderr
         """
         if self.error != ['']:
-            print(f"STDERR logs on {' '.join(self.args)}:")
+            self.logger(f"STDERR logs on {' '.join(self.args)}:")
 
             for err in self.error:
-                print(err)
+                self.logger(err)
         else:
-            print("Status: OK")
-
-    @staticmethod
-    def _normalize_output(result: bytes) -> str:
-        return str(result)[2:-1].split("\\n")
+            self.logger("Status: OK")
 
-    def set_success(self, expect_line: str, on_line: int = None) -> Command:
+    def set_success(self, expect_line: str | Matcher, on_line: int = None) -> _BaseCommand:
         """
         Set success condition, where:
-        :param: expected_line[str] - specifies information expected in stdout of the command (checks if param is present in any line of the output);
+        :param: expected_line[str | Matcher] - specifies information expected in stdout of the command (checks if param is present in any line of the output), Matcher for many conditions;
         :param: on_line[int] = None - if specified it will look for the output at a specific line;
         """
-        self._success_cond = expect_line if on_line is None else (on_line, expect_line)
+        self._success_cond = self._as_matcher(expect_line, on_line)
         return self
 
-    def set_failure(self, expect_line: str, on_line: int = None) -> Command:
+    def set_failure(self, expect_line: str | Matcher, on_line: int = None) -> _BaseCommand:
         """
         Set success condition, where:
-        :param: expected_line[str] - specifies information expected in stderr of the command (checks if param is present in any line of the output);
+        :param: expected_line[str | Matcher] - specifies information expected in stderr of the command (checks if param is present in any line of the output), Matcher for many conditions;
         :param: on_line[int] = None - if specified it will look for the err at a specific line;
         """
-        self._failure_cond = expect_line if on_line is None else (on_line, expect_line)
+        self._failure_cond = self._as_matcher(expect_line, on_line)
         return self
 
     def is_success(self) -> bool:
@@ -71,27 +215,15 @@ class Command:
         """
         if self._success_cond is None:
             return True
-        if isinstance(self._success_cond, tuple):
-            return self._success_cond[1] in self.output[self._success_cond[0]]
-        if isinstance(self._success_cond, str):
-            for cmd_line in self.output:
-                if self._success_cond in cmd_line:
-                    return True
-        return False
+        return self._match_result(STDOUT).matched
 
     def is_failure(self) -> bool:
         """
         Check failure condition;
         """
-        if self._failure_cond is None and self.error != ['']:
-            return True
-        if isinstance(self._failure_cond, tuple):
-            return self._failure_cond[1] in self.error[self._failure_cond[0]]
-        if isinstance(self._failure_cond, str):
-            for cmd_line in self.error:
-                if self._failure_cond in cmd_line:
-                    return True
-        return False
+        if self._failure_cond is None:
+            return self.error != ['']
+        return self._match_result(STDERR).matched
 
     def raise_on_failure(self):
         """
@@ -99,9 +231,233 @@ class Command:
         """
         if self.is_success() and not self.is_failure():
             return
-        print("SCRIPT INTERRUPTED!!!")
-        self._failure_cond and print(f'\nFound in errors: "{self._failure_cond}"\n')
-        self._success_cond and print(f'\nNot found in outputs: "{self._success_cond}"\n')
+        self.logger("SCRIPT INTERRUPTED!!!")
+        self._failure_cond and self.logger(f'\nFound in errors: "{self._failure_cond}"\n')
+        self._success_cond and self.logger(f'\nNot found in outputs: "{self._success_cond}"\n')
         raise ShellCommandError(
             f"on command: {' '. join(self.args)}"
         )
+
+
+class Command(_BaseCommand):
+    """
+    Runs command and check output for success, can be used to raise exception in case the command failes.
+    Example:
+    Command(["python3", "-m", "unittest", "test_file.py"]).set_failure("FAILED (failures=").raise_on_failure()
+    If the tests run by the command fail exception with information will be raised, otherwise the code will proceed with execution.
+    Streaming (bounded memory, live logs):
+    Command(["make", "build"], stream=True, buffer_size=500, autorun=False).set_failure("Error").run().raise_on_failure()
+    Fail fast (terminates the process group on first match or on timeout and raises ShellCommandError,
+    without set_failure the first stderr line is the failure, as for is_failure()):
+    Command(["pytest"], fail_fast=True, timeout=1200, idle_timeout=300, autorun=False).set_failure("FAILED").run()
+    Cached (skips the process when args, env and inputs did not change, replays outputs and restores output files):
+    Command(["npm", "run", "build"], cache=CommandCache(), inputs=["src"], outputs=["dist"])
+    In streaming mode only the buffered tail of the outputs is cached.
+    """
+
+    def __init__(
+        self,
+        args: list[str],
+        verbose: bool = True,
+        shell: bool = True,
+        stream: bool = False,
+        buffer_size: int = 1000,
+        autorun: bool = True,
+        fail_fast: bool = False,
+        timeout: float | None = None,
+        idle_timeout: float | None = None,
+        kill_grace: float = 5,
+        logger: Callable[[str], None] = print,
+        env: dict[str, str] | None = None,
+        cache: CommandCache | None = None,
+        inputs: list[str] = (),
+        outputs: list[str] = (),
+        encoding: str | None = None,
+        cwd: str | None = None
+    ) -> None:
+        super().__init__(
+            args, verbose, shell, buffer_size, fail_fast, timeout, idle_timeout, kill_grace, logger, env, encoding, cwd
+        )
+        self.stream = stream or fail_fast or timeout is not None or idle_timeout is not None
+        self.cache = cache
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.cache_key: str | None = None
+        self.cached = False
+        autorun and self.run()
+
+    def run(self) -> Command:
+        """
+        Executes the command, in streaming mode outputs are logged live;
+        """
+        if self.cache is not None:
+            self.cache_key = self.cache.key(self.args, self.shell, self.env, self._in_cwd(self.inputs), self.cwd)
+            result = self.cache.load(self.cache_key)
+            if result is not None:
+                self._start_metrics()
+                self._replay(result)
+                self.metrics.cached = True
+                self._finish_metrics()
+                self.log_errors()
+                return self
+        if self.stream:
+            for _ in self.iter_lines():
+                pass
+        else:
+            self._start_metrics()
+            self._process = subprocess.Popen(
+                self.args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=self.shell, env=self.env, cwd=self.cwd
+            )
+            stdout, stderr = self._communicate()
+            self._complete(stdout, stderr, self._process.returncode, self._usage)
+        self.cache is not None and self._cacheable() and self.cache.store(
+            self.cache_key, self.args, self.returncode,
+            self._raw_output(self.output), self._raw_output(self.error), self._in_cwd(self.outputs)
+        )
+        self.log_errors()
+        return self
+
+    def _cacheable(self) -> bool:
+        """
+        Only successful runs are cached - exit status 0 and the success/failure conditions set before the run hold;
+        """
+        return self.returncode == 0 and self.is_success() and (self._failure_cond is None or not self.is_failure())
+
+    def _in_cwd(self, paths: list[str]) -> list[str]:
+        return paths if self.cwd is None else [os.path.join(self.cwd, path) for path in paths]
+
+    def _complete(self, stdout: bytes, stderr: bytes, returncode: int | None, usage=None):
+        """
+        Stores the outputs of a finished (non streamed) run, metrics have to be started before;
+        """
+        self.returncode = returncode
+        self.metrics.stdout_bytes, self.metrics.stderr_bytes = len(stdout), len(stderr)
+        self._finish_metrics(usage)
+        self.output = self._normalize_output(stdout)
+        self.error = self._normalize_output(stderr)
+        self._line_counts = {STDOUT: len(self.output), STDERR: len(self.error)}
+        self._match_states = {STDOUT: None, STDERR: None}
+        self.verbose and self.log_output()
+
+    def _replay(self, result: dict):
+        self.cached = True
+        self.returncode = result["returncode"]
+        self.output = self._normalize_output(result["stdout"])
+        self.error = self._normalize_output(result["stderr"])
+        self._line_counts = {STDOUT: len(self.output), STDERR: len(self.error)}
+        self._match_states = {STDOUT: None, STDERR: None}
+        self.cache.restore_outputs(self.cache_key, self._in_cwd(self.outputs))
+        self.verbose and self.log_output()
+
+    def iter_lines(self) -> Iterator[tuple[str, str]]:
+        """
+        Starts the command and yields (STDOUT | STDERR, line) as soon as lines are produced;
+        Only the last buffer_size lines of each stream are kept (plus lines matching the set conditions);
+        With fail_fast, timeout or idle_timeout the process group is terminated and ShellCommandError raised;
+        """
+        self._start_metrics()
+        self._process = subprocess.Popen(
+            self.args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=self.shell, env=self.env,
+            cwd=self.cwd, **self._session_kwargs()
+        )
+        pending = queue.Queue(maxsize=self.buffer_size)
+        stop_reading = threading.Event()
+        for name, pipe in ((STDOUT, self._process.stdout), (STDERR, self._process.stderr)):
+            threading.Thread(target=self._read_pipe, args=(name, pipe, pending, stop_reading), daemon=True).start()
+        self._start_streams()
+        started = last_output = time.monotonic()
+        open_pipes = 2
+        try:
+            while open_pipes:
+                try:
+                    name, raw_line = pending.get(timeout=self._time_left(started, last_output))
+                except queue.Empty:
+                    raise self._timeout_error(started) from None
+                last_output = time.monotonic()
+                if raw_line is None:
+                    open_pipes -= 1
+                    continue
+                yield name, self._handle_line(name, raw_line)
+            try:
+                self._wait(self._time_left(started, last_output))
+            except subprocess.TimeoutExpired:
+                raise self._timeout_error(started) from None
+        finally:
+            stop_reading.set()
+            self._terminate()
+            self.returncode = self._process.returncode
+            self._finish_metrics(self._usage)
+        self._finish_streams()
+
+    def _communicate(self) -> tuple[bytes, bytes]:
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(self._process.stderr.read()), daemon=True)
+        reader.start()
+        with self._process.stdout:
+            stdout = self._process.stdout.read()
+        reader.join()
+        self._process.stderr.close()
+        self._wait()
+        return stdout, stderr[0]
+
+    def _wait(self, timeout: float | None = None):
+        """
+        Reaps the child with os.wait4 (where available) to collect its resource usage in self._usage;
+        """
+        self._usage = None
+        if not hasattr(os, 'wait4'):
+            self._process.wait(timeout)
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.0005
+        while self._process.returncode is None:
+            try:
+                pid, status, usage = os.wait4(self._process.pid, 0 if deadline is None else os.WNOHANG)
+            except ChildProcessError:
+                self._process.wait(timeout)
+                return
+            if pid:
+                self._process.returncode = os.waitstatus_to_exitcode(status)
+                self._usage = usage
+                return
+            if time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _terminate(self):
+        """
+        Terminates the whole process group, SIGTERM first and SIGKILL after kill_grace seconds;
+        """
+        if self._process.poll() is not None:
+            return
+        self._signal_group(force=False)
+        try:
+            self._process.wait(self.kill_grace)
+        except subprocess.TimeoutExpired:
+            self._signal_group(force=True)
+            self._process.wait()
+
+    @staticmethod
+    def _read_pipe(name: str, pipe: IO[bytes], pending: queue.Queue, stop_reading: threading.Event):
+        with pipe:
+            for raw_line in iter(pipe.readline, b''):
+                if not Command._put_pending(pending, (name, raw_line), stop_reading):
+                    return
+        Command._put_pending(pending, (name, None), stop_reading)
+
+    @staticmethod
+    def _put_pending(pending: queue.Queue, item: tuple, stop_reading: threading.Event) -> bool:
+        while not stop_reading.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _normalize_output(self, result: bytes) -> OutputLines:
+        return OutputLines(result, self.encoding)
+
+    def _raw_output(self, lines: OutputLines | list[str]) -> bytes:
+        return lines.raw if isinstance(lines, OutputLines) else '\n'.join(lines).encode(self.encoding)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import queue
+import shlex
+import subprocess
+import threading
+import uuid
+from typing import Callable
+from .pyshell import Command, ShellCommandError
+
+
+class ShellSession:
+    """
+    Keeps one long-lived shell and runs commands in it, avoiding a fork/exec of a new shell per command.
+    Results are Command objects (conditions, raise_on_failure, metrics work as usual).
+    Example:
+    with ShellSession() as session:
+        session.run(["cd", "/srv/app"])
+        session.run(["git", "rev-parse", "HEAD"]).set_success("a1b2c3").raise_on_failure()
+    cd/export/variables persist between runs, unless run(..., isolate=True) which runs the command in a subshell.
+    Commands get /dev/null as stdin and args are joined with spaces into one shell line.
+    """
+
+    def __init__(
+        self,
+        shell: str = '/bin/sh',
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        verbose: bool = True,
+        logger: Callable[[str], None] = print
+    ) -> None:
+        self.verbose = verbose
+        self.logger = logger
+        self._marker = f"__deployment_tools_{uuid.uuid4().hex}__".encode()
+        self._lock = threading.Lock()
+        self._process = subprocess.Popen(
+            [shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env
+        )
+        self._errors = queue.Queue()
+        threading.Thread(target=self._read_errors, daemon=True).start()
+
+    def _read_errors(self):
+        for raw_line in iter(self._process.stderr.readline, b''):
+            self._errors.put(raw_line)
+        self._errors.put(b'')
+
+    def _script(self, args: list[str] | str, isolate: bool) -> bytes:
+        body = f"command eval {shlex.quote(args if isinstance(args, str) else ' '.join(args))}"
+        body = f"( {body} )" if isolate else f"{{ {body}\n}}"
+        marker = self._marker.decode()
+        return (
+            f"{body} </dev/null\n"
+            f"printf '\\n%s %d\\n' '{marker}' \"$?\"\n"
+            f"printf '\\n%s\\n' '{marker}' >&2\n"
+        ).encode()
+
+    def _collect(self, read_line: Callable[[], bytes]) -> tuple[bytes, bytes]:
+        """
+        Reads lines until the marker line, returns (output, marker line) without the newline added before the marker;
+        """
+        lines = []
+        while not (raw_line := read_line()).startswith(self._marker):
+            if not raw_line:
+                raise ShellCommandError("shell session ended unexpectedly!")
+            lines.append(raw_line)
+        return b''.join(lines)[:-1], raw_line
+
+    def run(self, args: list[str] | str, isolate: bool = False, verbose: bool | None = None) -> Command:
+        cmd = Command(
+            [args] if isinstance(args, str) else args, autorun=False,
+            verbose=self.verbose if verbose is None else verbose, logger=self.logger
+        )
+        with self._lock:
+            if self._process.poll() is not None:
+                raise ShellCommandError("shell session is closed!")
+            cmd._start_metrics()
+            try:
+                self._process.stdin.write(self._script(args, isolate))
+                self._process.stdin.flush()
+            except BrokenPipeError:
+                raise ShellCommandError("shell session ended unexpectedly!") from None
+            stdout, marker_line = self._collect(self._process.stdout.readline)
+            stderr, _ = self._collect(self._errors.get)
+        cmd._complete(stdout, stderr, int(marker_line.split()[-1]))
+        cmd.log_errors()
+        return cmd
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def __enter__(self) -> ShellSession:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
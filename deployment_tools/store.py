@@ -0,0 +1,236 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+import uuid
+from typing import Iterator
+from . import files
+from .copier import copy_file
+from .sync import _hash_file
+from .walker import Walker, is_within
+
+OBJECTS = "objects"
+RELEASES = "releases"
+HASH_CACHE = "hash_cache.json"
+_NO_LINK = {errno.EXDEV, errno.EMLINK, errno.EPERM, errno.EACCES, errno.ENOTSUP, errno.EOPNOTSUPP}
+# files changed this close to their hashing are not cached - a later write within the timestamp granularity
+# could leave mtime, ctime and size as they were (the racy git problem)
+_RACY_NS = 10 ** 9
+
+
+class CheckoutResult:
+    """
+    Outcome of a checkout - files linked/copied into the release, already in place, and blobs added to the store;
+    """
+
+    def __init__(self) -> None:
+        self.linked = 0
+        self.copied = 0
+        self.unchanged = 0
+        self.added = 0
+        self.added_bytes = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}<linked {self.linked}, copied {self.copied}, unchanged {self.unchanged}, "
+            f"added {self.added} ({self.added_bytes / 2 ** 20:.1f} MB)>"
+        )
+
+
+def _write_json(path: str, data: dict):
+    os.replace(files._write_temp(path, json.dumps(data).encode()), path)
+
+
+class ContentStore:
+    """
+    Content addressed store of files - blobs are keyed by sha256 (and mode) and materialized in release directories
+    as hardlinks (reflinks/copies where linking is not possible), so identical files of many releases share the disk space.
+    Example:
+    store = ContentStore("/srv/app/.store")
+    store.checkout("build", "/srv/app/releases/1.2.0")
+    shutil.rmtree("/srv/app/releases/1.0.0")
+    store.gc()  # drops blobs no release references anymore
+    Digests are cached in hash_cache.json by (device, inode, mtime, ctime, size), so unchanged files are not hashed again
+    (files modified less than a second before hashing are not cached);
+    the cache keeps only the files seen by the last store instance that saved it (usually the last checkout).
+    Linked files share the inode with the blob - the writers of this package (builders, copies, sync) replace files,
+    editing them in place with other tools would change every release sharing the blob.
+    """
+
+    def __init__(self, root: str = ".content_store", max_workers: int | None = None) -> None:
+        self.root = os.path.abspath(root)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        os.makedirs(os.path.join(self.root, OBJECTS), exist_ok=True)
+        os.makedirs(os.path.join(self.root, RELEASES), exist_ok=True)
+        self._hashes = self._load_hashes()
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _load_hashes(self) -> dict[str, list]:
+        try:
+            with open(os.path.join(self.root, HASH_CACHE), 'r') as file_object:
+                return json.load(file_object)
+        except (OSError, ValueError):
+            return {}
+
+    def save_hashes(self):
+        """
+        Writes the digests of the files hashed or looked up by this store, entries of files not seen anymore are dropped;
+        """
+        with self._lock:
+            self._hashes = {key: self._hashes[key] for key in self._seen}
+            _write_json(os.path.join(self.root, HASH_CACHE), self._hashes)
+
+    def digest(self, path: str, stat_result: os.stat_result | None = None) -> str:
+        """
+        sha256 of the file, taken from the hash cache while its inode, mtime, ctime and size did not change;
+        """
+        stat_result = stat_result or os.stat(path)
+        key = f"{stat_result.st_dev}:{stat_result.st_ino}"
+        state = [stat_result.st_mtime_ns, stat_result.st_ctime_ns, stat_result.st_size]
+        cached = self._hashes.get(key)
+        if cached is not None and cached[:3] == state:
+            with self._lock:
+                self._seen.add(key)
+            return cached[3]
+        hashed_at = time.time_ns()
+        digest = _hash_file(path)
+        if max(stat_result.st_mtime_ns, stat_result.st_ctime_ns) > hashed_at - _RACY_NS:
+            return digest
+        with self._lock:
+            self._hashes[key] = state + [digest]
+            self._seen.add(key)
+        return digest
+
+    def blob_path(self, digest: str, mode: int) -> str:
+        return os.path.join(self.root, OBJECTS, digest[:2], f"{digest[2:]}.{stat.S_IMODE(mode):o}")
+
+    def add(self, path: str, stat_result: os.stat_result | None = None) -> tuple[str, bool]:
+        """
+        Stores a copy of the file (if its content and mode are not stored yet), returns (blob path, if it was added);
+        """
+        stat_result = stat_result or os.stat(path)
+        blob = self.blob_path(self.digest(path, stat_result), stat_result.st_mode)
+        if os.path.exists(blob):
+            return blob, False
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        temp_path = f"{blob}.{uuid.uuid4().hex}.tmp"
+        copy_file(path, temp_path)
+        try:
+            # link, not replace - a blob stored meanwhile by another thread keeps its inode (and its links)
+            os.link(temp_path, blob)
+            added = True
+        except FileExistsError:
+            added = False
+        except OSError as error:
+            if error.errno not in _NO_LINK:
+                raise
+            # no hardlinks on this filesystem, so the releases hold copies and replacing the blob is harmless
+            os.replace(temp_path, blob)
+            return blob, True
+        os.remove(temp_path)
+        return blob, added
+
+    @staticmethod
+    def materialize(blob: str, dst: str) -> bool:
+        """
+        Places blob at dst (replaced atomically) as a hardlink, or as a reflink/copy if linking fails, returns if it was linked;
+        """
+        temp_path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(blob, temp_path)
+            linked = True
+        except OSError as error:
+            if error.errno not in _NO_LINK:
+                raise
+            copy_file(blob, temp_path, preserve_metadata=True)
+            linked = False
+        os.replace(temp_path, dst)
+        return linked
+
+    def _sources(self, src: str, dst: str, entries: list[str] | None) -> Iterator[tuple[str, str, os.stat_result]]:
+        """
+        (path relative to src, path, stat) of the regular files to check out (named pipes, sockets and devices are skipped),
+        dst and the store are not walked if they are inside src;
+        """
+        for entry in (entries if entries is not None else ['.']):
+            root = os.path.join(src, entry)
+            if not os.path.isdir(root):
+                stat_result = os.stat(root)
+                stat.S_ISREG(stat_result.st_mode) and (yield os.path.normpath(entry), root, stat_result)
+                continue
+            prune = {
+                os.path.relpath(os.path.realpath(path), os.path.realpath(root)).replace(os.sep, '/')
+                for path in (dst, self.root) if is_within(path, root)
+            }
+            for relative, dir_entry in Walker(root).walk(prune):
+                if dir_entry.is_file():
+                    yield os.path.normpath(os.path.join(entry, relative)), dir_entry.path, dir_entry.stat()
+
+    def _checkout_file(self, result: CheckoutResult, source: str, target: str, stat_result: os.stat_result) -> str:
+        blob, added = self.add(source, stat_result)
+        try:
+            in_place = os.path.samestat(os.stat(target), os.stat(blob))
+        except OSError:
+            in_place = False
+        linked = in_place or self.materialize(blob, target)
+        with self._lock:
+            result.added += added
+            result.added_bytes += stat_result.st_size if added else 0
+            result.unchanged += in_place
+            result.linked += linked and not in_place
+            result.copied += not linked
+        return os.path.relpath(blob, os.path.join(self.root, OBJECTS)).replace(os.sep, '/')
+
+    def checkout(self, src: str, dst: str, entries: list[str] | None = None) -> CheckoutResult:
+        """
+        Adds the files of src (or only the given top level entries) to the store and materializes them in dst,
+        records the blobs of dst as a release (kept by gc while dst exists) and saves the hash cache.
+        """
+        os.makedirs(dst, exist_ok=True)
+        result, jobs, parents = CheckoutResult(), [], set()
+        for relative, source, stat_result in self._sources(src, dst, entries):
+            target = os.path.join(dst, relative)
+            parent = os.path.dirname(target)
+            if parent not in parents:
+                os.makedirs(parent, exist_ok=True)
+                parents.add(parent)
+            jobs.append((source, target, stat_result))
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            blobs = list(executor.map(lambda job: self._checkout_file(result, *job), jobs))
+        release = os.path.realpath(dst)
+        release_path = os.path.join(self.root, RELEASES, f"{hashlib.sha256(release.encode()).hexdigest()[:32]}.json")
+        _write_json(release_path, {"path": release, "blobs": sorted(set(blobs))})
+        self.save_hashes()
+        return result
+
+    def gc(self) -> list[str]:
+        """
+        Forgets releases whose directory was removed and deletes the blobs none of the remaining ones references
+        (blobs still linked from elsewhere are kept), returns the deleted blobs relative to the objects directory.
+        """
+        referenced = set()
+        with os.scandir(os.path.join(self.root, RELEASES)) as releases:
+            for release in releases:
+                try:
+                    with open(release.path, 'r') as file_object:
+                        data = json.load(file_object)
+                except (OSError, ValueError):
+                    continue
+                if os.path.isdir(data["path"]):
+                    referenced.update(data["blobs"])
+                else:
+                    os.remove(release.path)
+        removed = []
+        for blob, dir_entry in Walker(os.path.join(self.root, OBJECTS)).walk():
+            if dir_entry.is_dir() or blob in referenced:
+                continue
+            if blob.endswith('.tmp') or dir_entry.stat(follow_symlinks=False).st_nlink == 1:
+                os.remove(dir_entry.path)
+                removed.append(blob)
+        return removed
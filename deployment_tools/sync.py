@@ -0,0 +1,165 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import stat
+from typing import Callable
+from . import files
+from .copier import CopyStats, ParallelCopier
+
+MANIFEST = ".sync_manifest.json"
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_object:
+        while chunk := file_object.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SyncResult:
+    """
+    Outcome of a sync - relative paths copied and deleted, number of unchanged files and the CopyStats of the copy;
+    """
+
+    def __init__(self, copied: list[str], deleted: list[str], unchanged: int, stats: CopyStats | None) -> None:
+        self.copied = copied
+        self.deleted = deleted
+        self.unchanged = unchanged
+        self.stats = stats
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<copied {len(self.copied)}, deleted {len(self.deleted)}, unchanged {self.unchanged}>"
+
+
+def _scan(root: str, entries: list[str] | None, skip: str | None = None, follow_symlinks: bool = True) -> dict[str, os.stat_result]:
+    """
+    Relative path => stat of every file under root (or under the given top level entries), symlinks are followed
+    unless follow_symlinks=False - then a symlink (also to a directory) is listed as an entry itself and never walked;
+    the directory skip (the destination when it is inside root) is not walked, its identity is compared by stat.
+    """
+    found = {}
+    skip_stat = os.stat(skip) if skip is not None and os.path.isdir(skip) else None
+
+    def walk(path: str, relative: str):
+        with os.scandir(path) as children:
+            for child in children:
+                child_relative = os.path.join(relative, child.name) if relative else child.name
+                if child.is_dir(follow_symlinks=follow_symlinks):
+                    if not _skipped(child.stat(), skip_stat):
+                        walk(child.path, child_relative)
+                elif child_relative != MANIFEST:
+                    found[child_relative] = child.stat(follow_symlinks=follow_symlinks)
+
+    for entry in (entries if entries is not None else [None]):
+        if entry is None:
+            walk(root, '')
+            continue
+        if not os.path.lexists(os.path.join(root, entry)):
+            continue
+        entry_stat = os.stat(os.path.join(root, entry), follow_symlinks=follow_symlinks)
+        if stat.S_ISDIR(entry_stat.st_mode):
+            _skipped(entry_stat, skip_stat) or walk(os.path.join(root, entry), os.path.normpath(entry))
+        else:
+            found[os.path.normpath(entry)] = entry_stat
+    return found
+
+
+def _skipped(stat_result: os.stat_result, skip_stat: os.stat_result | None) -> bool:
+    return skip_stat is not None and os.path.samestat(stat_result, skip_stat)
+
+
+def _load_manifest(dst: str) -> dict[str, list]:
+    try:
+        with open(os.path.join(dst, MANIFEST), 'r') as file_object:
+            return json.load(file_object)["files"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _write_manifest(dst: str, manifest: dict[str, list]):
+    manifest_path = os.path.join(dst, MANIFEST)
+    os.replace(files._write_temp(manifest_path, json.dumps({"version": 1, "files": manifest}).encode()), manifest_path)
+    files._fsync_directory(os.path.abspath(dst))
+
+
+def sync_tree(
+    src: str,
+    dst: str,
+    entries: list[str] | None = None,
+    delete: bool = False,
+    checksum: bool = False,
+    max_workers: int | None = None,
+    progress: Callable[[CopyStats], None] | None = None
+) -> SyncResult:
+    """
+    Copies only new or changed files from src to dst, judged against the manifest of the last sync stored in dst
+    (size and mtime of the source files, with checksum also their sha256 - then content decides, not mtime).
+    Files missing in dst or with another size there are copied again. delete=True removes files of dst not in src.
+    entries limits the sync to these top level files/dirs of src. The manifest is replaced atomically at the end.
+    Only regular files are synced, named pipes, sockets and devices of src are skipped (like rsync without --specials).
+    """
+    os.makedirs(dst, exist_ok=True)
+    sources, manifest, new_manifest = _scan(src, entries, dst), _load_manifest(dst), {}
+    copier = ParallelCopier(max_workers, preserve_metadata=True, progress=progress)
+    copied, unchanged = [], 0
+    for relative, source_stat in sources.items():
+        if not stat.S_ISREG(source_stat.st_mode):
+            continue
+        target = os.path.join(dst, relative)
+        previous = manifest.get(relative)
+        same_stat = previous is not None and previous[0] == source_stat.st_size and previous[1] == source_stat.st_mtime_ns
+        # without checksum a known digest is kept while size and mtime did not change
+        digest = _hash_file(os.path.join(src, relative)) if checksum else previous[2] if same_stat else None
+        same = previous is not None and previous[0] == source_stat.st_size and previous[2] == digest if checksum else same_stat
+        try:
+            same = same and os.stat(target).st_size == source_stat.st_size
+        except OSError:
+            same = False
+        new_manifest[relative] = [source_stat.st_size, source_stat.st_mtime_ns, digest]
+        if same:
+            unchanged += 1
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        copier.add(os.path.join(src, relative), target)
+        copied.append(relative)
+    stats = copier.run() if copied else None
+    deleted = []
+    if delete:
+        # symlinks of dst are not followed, an extraneous one is unlinked itself (its target is outside of the sync)
+        existing = _scan(dst, entries, follow_symlinks=False)
+        source_directories = {parent for relative in sources for parent in _parents(os.path.dirname(relative))}
+        for relative in existing:
+            if relative not in sources and relative not in source_directories:
+                os.remove(os.path.join(dst, relative))
+                deleted.append(relative)
+        _remove_empty_directories(dst, {os.path.dirname(relative) for relative in sources})
+    entries is not None and new_manifest.update(
+        (relative, value) for relative, value in manifest.items()
+        if relative not in new_manifest and not any(_inside(relative, entry) for entry in entries)
+        and os.path.exists(os.path.join(dst, relative))
+    )
+    _write_manifest(dst, new_manifest)
+    return SyncResult(copied, deleted, unchanged, stats)
+
+
+def _inside(relative: str, entry: str) -> bool:
+    entry = os.path.normpath(entry)
+    return relative == entry or relative.startswith(entry + os.sep)
+
+
+def _remove_empty_directories(dst: str, keep: set[str]):
+    keep = {parent for directory in keep for parent in _parents(directory)}
+    for directory, _, _ in sorted(os.walk(dst), key=lambda item: len(item[0]), reverse=True):
+        relative = os.path.relpath(directory, dst)
+        relative != '.' and relative not in keep and not os.listdir(directory) and os.rmdir(directory)
+
+
+def _parents(relative: str) -> list[str]:
+    parents = []
+    while relative:
+        parents.append(relative)
+        relative = os.path.dirname(relative)
+    return parents
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
+import json
+import os
+import re
+import uuid
+from . import files
+
+DEFAULT_PATTERN = r"\$\{(\w+)\}"
+_compiled: dict[str, dict[str, list[str]]] = {}
+_worker_template: Template | None = None
+
+
+def _compile(text: str, pattern: re.Pattern) -> dict[str, list[str]]:
+    """
+    Splits the text into literals around the placeholders, len(literals) == len(names) + 1;
+    """
+    literals, names, raw, position = [], [], [], 0
+    for found in pattern.finditer(text):
+        literals.append(text[position:found.start()])
+        names.append(found.group(1))
+        raw.append(found.group())
+        position = found.end()
+    literals.append(text[position:])
+    return {"literals": literals, "names": names, "raw": raw}
+
+
+class Template:
+    """
+    Template file compiled once into literal segments and placeholder names, rendered with dicts of variables.
+    Example:
+    template = Template("nginx.conf.tpl", cache_root=".template_cache")
+    template.render_to("/etc/nginx/sites/app.conf", {"HOST": "app.local", "PORT": 8080})
+    template.render_all({f"sites/{host}.conf": {"HOST": host, "PORT": 80} for host in hosts}, max_workers=8)
+    Placeholders are ${NAME} (pattern with one group for the name), compiled templates are kept per content hash
+    in memory and, if cache_root is given, on disk for the next runs. strict=False leaves unknown placeholders as they are.
+    """
+
+    def __init__(self, path: str, pattern: str = DEFAULT_PATTERN, cache_root: str | None = None, strict: bool = True) -> None:
+        self.path = path
+        self.strict = strict
+        with open(path, 'r') as file_object:
+            text = file_object.read()
+        self.key = hashlib.sha256(f"{pattern}\0{text}".encode()).hexdigest()
+        stored = self._load(cache_root) if self.key not in _compiled else None
+        compiled = _compiled.get(self.key) or stored or _compile(text, re.compile(pattern))
+        if cache_root is not None and stored is None and not os.path.isfile(os.path.join(cache_root, f"{self.key}.json")):
+            self._store(cache_root, compiled)
+        _compiled[self.key] = compiled
+        self.literals: list[str] = compiled["literals"]
+        self.names: list[str] = compiled["names"]
+        self._raw: list[str] = compiled["raw"]
+        self.variables = set(self.names)
+
+    def _load(self, cache_root: str | None) -> dict[str, list[str]] | None:
+        if cache_root is None:
+            return None
+        try:
+            with open(os.path.join(cache_root, f"{self.key}.json"), 'r') as file_object:
+                return json.load(file_object)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, cache_root: str, compiled: dict[str, list[str]]):
+        os.makedirs(cache_root, exist_ok=True)
+        temp_path = os.path.join(cache_root, f".{self.key}.{uuid.uuid4().hex}.tmp")
+        with open(temp_path, 'w') as file_object:
+            json.dump(compiled, file_object)
+        os.replace(temp_path, os.path.join(cache_root, f"{self.key}.json"))
+
+    def render(self, variables: dict) -> str:
+        parts = [''] * (2 * len(self.names) + 1)
+        parts[0::2] = self.literals
+        if self.strict:
+            missing = [name for name in self.variables if name not in variables]
+            if missing:
+                raise KeyError(f"Missing template variables for {self.path}: {sorted(missing)}!")
+            parts[1::2] = [str(variables[name]) for name in self.names]
+        else:
+            parts[1::2] = [str(variables[name]) if name in variables else raw for name, raw in zip(self.names, self._raw)]
+        return ''.join(parts)
+
+    def render_to(self, path: str, variables: dict) -> bool:
+        """
+        Renders into path through TxtBuilder.save() (atomic, skipped if unchanged), returns if the file was written;
+        """
+        builder = files.create_file_builder(path, type_='txt', blanked=True)
+        # split on \n only, str.splitlines would also break on \r, \f, \x1c-\x1e, \x85 and \u2028/\u2029
+        builder.base_data = io.StringIO(self.render(variables), newline='\n').readlines()
+        return builder.save()
+
+    def render_all(self, outputs: dict[str, dict], max_workers: int | None = None) -> list[bool]:
+        """
+        Renders and saves every {path: variables} in a process pool, returns if each file was written;
+        """
+        outputs = {os.path.abspath(path): variables for path, variables in outputs.items()}
+        if max_workers == 1 or len(outputs) < 2:
+            return [self.render_to(path, variables) for path, variables in outputs.items()]
+        chunksize = max(1, len(outputs) // (4 * (max_workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+            written = list(executor.map(_render_to, outputs.keys(), outputs.values(), chunksize=chunksize))
+        for path, was_written in zip(outputs, written):
+            was_written and files._parse_cache is not None and files._parse_cache.invalidate(path)
+        return written
+
+
+def _init_worker(template: Template):
+    global _worker_template
+    _worker_template = template
+
+
+def _render_to(path: str, variables: dict) -> bool:
+    return _worker_template.render_to(path, variables)
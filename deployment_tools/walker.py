@@ -0,0 +1,178 @@
+from __future__ import annotations
+import os
+import re
+from typing import Collection, Iterator
+
+GITIGNORE = ".gitignore"
+
+
+class IgnoreRule:
+    """
+    One .gitignore style pattern - "!" negates, a trailing "/" matches only directories, a "/" elsewhere anchors
+    the pattern to base (the directory of the ignore file), "*", "?", "[...]" do not cross "/" and "**" does.
+    """
+
+    def __init__(self, pattern: str, base: str = '') -> None:
+        self.pattern = pattern
+        self.base = base
+        self.negate = pattern.startswith('!')
+        pattern = pattern[1:] if self.negate else pattern
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        anchored = '/' in pattern
+        body = _translate(pattern.lstrip('/'))
+        self._regex = re.compile(body if anchored else f"(?:.*/)?{body}", re.DOTALL)
+
+    def matches(self, relative: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not relative.startswith(self.base + '/'):
+                return False
+            relative = relative[len(self.base) + 1:]
+        return self._regex.fullmatch(relative) is not None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<{self.base + ': ' if self.base else ''}{self.pattern}>"
+
+
+def _translate(pattern: str) -> str:
+    parts, idx = [], 0
+    while idx < len(pattern):
+        char = pattern[idx]
+        if pattern.startswith('**/', idx):
+            parts.append('(?:.*/)?')
+            idx += 3
+            continue
+        if pattern.startswith('**', idx):
+            parts.append('.*')
+            idx += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[' and (end := pattern.find(']', idx + 2)) != -1:
+            content = pattern[idx + 1:end]
+            parts.append(f"[{'^' + content[1:] if content[0] in '!^' else content}]")
+            idx = end
+        elif char == '\\' and idx + 1 < len(pattern):
+            idx += 1
+            parts.append(re.escape(pattern[idx]))
+        else:
+            parts.append(re.escape(char))
+        idx += 1
+    return ''.join(parts)
+
+
+def parse_rules(lines: list[str], base: str = '') -> list[IgnoreRule]:
+    """
+    Rules from the lines of an ignore file, blank lines and # comments are skipped;
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip()
+        line and not line.startswith('#') and rules.append(IgnoreRule(line, base))
+    return rules
+
+
+def is_ignored(rules: list[IgnoreRule], relative: str, is_dir: bool) -> bool:
+    """
+    Last matching rule decides, as in git;
+    """
+    ignored = False
+    for rule in rules:
+        if rule.matches(relative, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def is_within(path: str, ancestor: str) -> bool:
+    """
+    If path is ancestor or inside it, compared by the components of the resolved paths (no prefix matching of names);
+    """
+    parts, ancestor_parts = resolved_parts(path), resolved_parts(ancestor)
+    return parts[:len(ancestor_parts)] == ancestor_parts
+
+
+def resolved_parts(path: str) -> list[str]:
+    return [part for part in os.path.realpath(path).split(os.sep) if part]
+
+
+class Walker:
+    """
+    Walks a directory with os.scandir, yielding (relative path, os.DirEntry) - stat results cached by the entries are reused.
+    Example:
+    Walker("release", exclude=["*.pyc", "__pycache__/", "!keep.pyc"], gitignore=True).files()
+    WorkingDirectory().copy_files("/srv/app", Walker(".", include=["*.py", "config/**"]))
+    exclude - .gitignore style rules, gitignore - also read .gitignore files found while walking (scoped to their directory),
+    include - patterns (same syntax) of files to yield, directories are still walked; excluded directories are not entered.
+    Directories are yielded before their content, relative paths use "/" and are relative to root.
+    """
+
+    def __init__(
+        self,
+        root: str = '.',
+        recursive: bool = True,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        gitignore: bool = False,
+        ignore_dot_files: bool = False,
+        follow_symlinks: bool = False
+    ) -> None:
+        self.root = root
+        self.recursive = recursive
+        self.include = None if include is None else [IgnoreRule(pattern) for pattern in include]
+        self.rules = parse_rules(exclude or [])
+        self.gitignore = gitignore
+        self.ignore_dot_files = ignore_dot_files
+        self.follow_symlinks = follow_symlinks
+
+    def _directory_rules(self, path: str, relative: str, rules: list[IgnoreRule]) -> list[IgnoreRule]:
+        if not self.gitignore:
+            return rules
+        try:
+            with open(os.path.join(path, GITIGNORE), 'r') as file_object:
+                return rules + parse_rules(file_object.readlines(), relative)
+        except OSError:
+            return rules
+
+    def walk(self, prune: Collection[str] = ()) -> Iterator[tuple[str, os.DirEntry]]:
+        """
+        prune - relative paths of directories not to enter (nor yield);
+        """
+        stack = [(self.root, '', self._directory_rules(self.root, '', self.rules))]
+        while stack:
+            path, relative, rules = stack.pop()
+            with os.scandir(path) as entries:
+                children = []
+                for entry in entries:
+                    if self.ignore_dot_files and entry.name[0] == '.':
+                        continue
+                    entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                    is_dir = entry.is_dir(follow_symlinks=self.follow_symlinks)
+                    if rules and is_ignored(rules, entry_relative, is_dir) or is_dir and entry_relative in prune:
+                        continue
+                    if is_dir:
+                        self.recursive and children.append(
+                            (entry.path, entry_relative, self._directory_rules(entry.path, entry_relative, rules))
+                        )
+                        self.include is None and (yield entry_relative, entry)
+                    elif self.include is None or any(rule.matches(entry_relative, False) for rule in self.include):
+                        yield entry_relative, entry
+            stack.extend(reversed(children))
+
+    def __iter__(self) -> Iterator[tuple[str, os.DirEntry]]:
+        return self.walk()
+
+    def files(self) -> list[str]:
+        """
+        Paths (root joined with the relative path) of all files;
+        """
+        return [
+            os.path.normpath(os.path.join(self.root, relative)) for relative, entry in self.walk()
+            if not entry.is_dir(follow_symlinks=self.follow_symlinks)
+        ]
+
+    def names(self) -> list[str]:
+        return [relative for relative, _ in self.walk()]
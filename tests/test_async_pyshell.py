@@ -0,0 +1,50 @@
+from deployment_tools.async_pyshell import AsyncCommand
+from deployment_tools.pyshell import ShellCommandError
+import asyncio
+import pytest
+import time
+
+
+def test_await_and_conditions():
+    async def main():
+        return await AsyncCommand(['echo hello; echo oops >&2'], verbose=False).set_success('hello').set_failure('oops')
+    cmd = asyncio.run(main())
+    assert cmd.output == ['hello', ''] and cmd.error == ['oops', '']
+    assert cmd.is_success() and cmd.is_failure()
+    with pytest.raises(ShellCommandError):
+        cmd.raise_on_failure()
+
+
+def test_async_iteration():
+    async def main():
+        return [line async for line in AsyncCommand(['echo a; echo b'], verbose=False)]
+    assert asyncio.run(main()) == [('stdout', 'a'), ('stdout', 'b')]
+
+
+def test_commands_overlap():
+    async def main():
+        return await asyncio.gather(*[AsyncCommand(['sleep 0.3'], verbose=False) for _ in range(5)])
+    start = time.monotonic()
+    assert len(asyncio.run(main())) == 5
+    assert time.monotonic() - start < 1
+
+
+def test_cancellation_kills_child():
+    async def main():
+        cmd = AsyncCommand(['sleep 10'], verbose=False)
+        task = asyncio.ensure_future(cmd.run())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return cmd
+    start = time.monotonic()
+    cmd = asyncio.run(main())
+    assert cmd._process.returncode is not None and time.monotonic() - start < 5
+
+
+def test_async_fail_fast():
+    async def main():
+        await AsyncCommand(['echo FAILED >&2; sleep 10'], verbose=False, fail_fast=True).set_failure('FAILED')
+    with pytest.raises(ShellCommandError, match='FAILED'):
+        asyncio.run(main())
@@ -0,0 +1,43 @@
+from deployment_tools import BulkEdit, bulk_edit
+from deployment_tools.files import FileTransformationError
+import os
+import pytest
+import toml
+
+
+def bump_version(builder):
+    builder + {'tool': {'version': '2.0'}}
+
+
+def write_projects(tmp_path, count=4):
+    for idx in range(count):
+        (tmp_path / f'project{idx}').mkdir()
+        (tmp_path / f'project{idx}' / 'pyproject.toml').write_text(f'[tool]\nname = "p{idx}"\nversion = "1.0"\n')
+    (tmp_path / 'project0' / 'pyproject.toml').write_text('[tool]\nname = "p0"\nversion = "2.0"\n')
+    (tmp_path / 'project1' / 'pyproject.toml').write_text('[tool\nbroken')
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_bulk_edit_by_glob(tmp_path, max_workers):
+    write_projects(tmp_path)
+    unchanged = tmp_path / 'project0' / 'pyproject.toml'
+    mtime = os.stat(unchanged).st_mtime_ns
+    edit = BulkEdit(str(tmp_path / '**' / 'pyproject.toml'), edit=bump_version, max_workers=max_workers)
+    assert [result.path for result in edit.results] == sorted(str(tmp_path / f'project{idx}' / 'pyproject.toml') for idx in range(4))
+    assert [(result.written, result.ok) for result in edit.results] == [(False, True), (False, False), (True, True), (True, True)]
+    assert os.stat(unchanged).st_mtime_ns == mtime
+    assert toml.load(tmp_path / 'project3' / 'pyproject.toml') == {'tool': {'name': 'p3', 'version': '2.0'}}
+    assert edit.failed()[0].error.startswith('TomlDecodeError')
+    with pytest.raises(FileTransformationError):
+        edit.raise_on_failure()
+
+
+def test_bulk_edit_with_patch(tmp_path):
+    paths = []
+    for env in ('dev', 'prod'):
+        paths.append(str(tmp_path / f'values-{env}.yaml'))
+        (tmp_path / f'values-{env}.yaml').write_text(f'image:\n  tag: "1.0"\nenv: {env}\n')
+    edit = bulk_edit(paths, patch=[{'op': 'replace', 'path': '/image/tag', 'value': '1.1'}], preserve=True)
+    assert edit.written == paths
+    assert (tmp_path / 'values-prod.yaml').read_text() == "image:\n  tag: '1.1'\nenv: prod\n"
+    assert not bulk_edit(paths, patch=[{'op': 'test', 'path': '/image/tag', 'value': '1.1'}], preserve=True).written
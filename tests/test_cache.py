@@ -0,0 +1,72 @@
+from deployment_tools.cache import CommandCache, hash_path
+from deployment_tools.pyshell import Command
+import os
+
+
+def run_build(cache: CommandCache, tmp_path) -> Command:
+    source, built, runs = tmp_path / 'src.txt', tmp_path / 'out.txt', tmp_path / 'runs'
+    return Command(
+        [f'echo run >> {runs}; cp {source} {built}; echo built; echo warn >&2'],
+        verbose=False, cache=cache, inputs=[str(source)], outputs=[str(built)]
+    )
+
+
+def test_hit_replays_and_restores_outputs(tmp_path):
+    cache = CommandCache(str(tmp_path / 'cache'))
+    (tmp_path / 'src.txt').write_text('v1')
+    first = run_build(cache, tmp_path)
+    os.remove(tmp_path / 'out.txt')
+    second = run_build(cache, tmp_path).set_success('built').set_failure('warn')
+    assert not first.cached and second.cached
+    assert (tmp_path / 'runs').read_text() == 'run\n'
+    assert (tmp_path / 'out.txt').read_text() == 'v1'
+    assert second.output == first.output and second.returncode == 0
+    assert second.is_success() and second.is_failure()
+
+
+def test_input_change_and_invalidation(tmp_path):
+    cache = CommandCache(str(tmp_path / 'cache'))
+    (tmp_path / 'src.txt').write_text('v1')
+    first = run_build(cache, tmp_path)
+    (tmp_path / 'src.txt').write_text('v2')
+    second = run_build(cache, tmp_path)
+    assert not second.cached and first.cache_key != second.cache_key
+    cache.invalidate(second.cache_key)
+    assert second.cache_key not in cache and first.cache_key in cache
+    cache.invalidate(args=first.args)
+    assert first.cache_key not in cache
+
+
+def test_lru_eviction(tmp_path):
+    cache = CommandCache(str(tmp_path / 'cache'))
+    (tmp_path / 'src.txt').write_text('v1')
+    first = run_build(cache, tmp_path)
+    cache.max_bytes = cache._size(cache._entry(first.cache_key)) * 3 // 2
+    (tmp_path / 'src.txt').write_text('v2')
+    second = run_build(cache, tmp_path)
+    assert first.cache_key not in cache and second.cache_key in cache
+    assert hash_path(str(tmp_path / 'src.txt')) != hash_path(str(tmp_path / 'missing'))
+
+
+def test_failed_runs_are_not_cached(tmp_path):
+    cache = CommandCache(str(tmp_path / 'cache'))
+    runs = tmp_path / 'runs'
+    for _ in range(2):
+        failed = Command([f'echo run >> {runs}; exit 3'], verbose=False, cache=cache)
+    assert not failed.cached and runs.read_text() == 'run\nrun\n'
+    for _ in range(2):
+        matched = Command([f'echo run >> {runs}; echo FAILED >&2'], verbose=False, cache=cache, autorun=False)
+        matched.set_failure('FAILED').run()
+    assert not matched.cached and matched.cache_key not in cache
+
+
+def test_restored_directory_replaces_stale_files(tmp_path):
+    cache = CommandCache(str(tmp_path / 'cache'))
+    (tmp_path / 'src.txt').write_text('v1')
+    build = [f'mkdir -p {tmp_path / "dist"} && cp {tmp_path / "src.txt"} {tmp_path / "dist" / "app.txt"}']
+    Command(build, verbose=False, cache=cache, inputs=[str(tmp_path / 'src.txt')], outputs=[str(tmp_path / 'dist')])
+    (tmp_path / 'dist' / 'stale.txt').write_text('old')
+    (tmp_path / 'dist' / 'app.txt').write_text('edited')
+    cached = Command(build, verbose=False, cache=cache, inputs=[str(tmp_path / 'src.txt')], outputs=[str(tmp_path / 'dist')])
+    assert cached.cached and os.listdir(tmp_path / 'dist') == ['app.txt']
+    assert (tmp_path / 'dist' / 'app.txt').read_text() == 'v1'
@@ -0,0 +1,87 @@
+from deployment_tools import copier
+from deployment_tools.copier import ParallelCopier
+from deployment_tools.directory import WorkingDirectory
+import errno
+import os
+import stat
+import pytest
+
+
+def make_tree(root, files=50):
+    for idx in range(files):
+        directory = root / f'dir{idx % 5}' / f'sub{idx % 3}'
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f'file{idx}.bin').write_bytes(os.urandom(idx * 1000))
+    (root / 'run.sh').write_text('#!/bin/sh\n')
+    os.chmod(root / 'run.sh', 0o750)
+    os.utime(root / 'run.sh', (1_000_000, 1_000_000))
+
+
+def tree(root):
+    return {
+        os.path.relpath(os.path.join(directory, name), root): open(os.path.join(directory, name), 'rb').read()
+        for directory, _, names in os.walk(root) for name in names
+    }
+
+
+def test_parallel_copy_tree_with_progress(tmp_path):
+    make_tree(tmp_path / 'release')
+    reports = []
+    stats = ParallelCopier(max_workers=4, preserve_metadata=True, progress=reports.append, progress_every=10) \
+        .add(str(tmp_path / 'release'), str(tmp_path / 'copy')).run()
+    assert tree(tmp_path / 'copy') == tree(tmp_path / 'release')
+    assert stats.files == stats.total_files == 51 and stats.bytes == stats.total_bytes
+    assert sum(stats.methods.values()) == 51 and len(reports) == 6
+    copied = os.stat(tmp_path / 'copy' / 'run.sh')
+    assert copied.st_mode & 0o777 == 0o750 and copied.st_mtime == 1_000_000
+
+
+def test_copy_falls_back_when_kernel_copies_are_unsupported(tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, 'cross device')
+
+    monkeypatch.setattr(copier, 'fcntl', None)
+    monkeypatch.setattr(os, 'copy_file_range', unsupported)
+    monkeypatch.setattr(os, 'sendfile', unsupported)
+    monkeypatch.setattr(copier, '_no_copy_file_range', set())
+    monkeypatch.setattr(copier, '_no_sendfile', set())
+    (tmp_path / 'source').write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    assert copier.copy_file(str(tmp_path / 'source'), str(tmp_path / 'target')) == copier.READ_WRITE
+    assert (tmp_path / 'target').read_bytes() == (tmp_path / 'source').read_bytes()
+    assert copier._no_copy_file_range and copier._no_sendfile
+
+
+def test_working_directory_copy_and_cross_device_move(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_tree(tmp_path / 'release', files=10)
+    wd = WorkingDirectory()
+    original = tree(tmp_path / 'release')
+    (tmp_path / 'notes.txt').write_text('notes')
+    assert wd.copy_files('copies', ['release', 'notes.txt'], max_workers=2) == ['copies/release', 'copies/notes.txt']
+    assert (tmp_path / 'copies' / 'notes.txt').read_text() == 'notes'
+    assert tree(tmp_path / 'copies' / 'release') == original
+    with pytest.raises(FileExistsError):
+        wd.copy_file('copies', 'release')
+
+    rename = os.rename
+
+    def cross_device(src, dst):
+        if 'release' in str(src):
+            raise OSError(errno.EXDEV, 'cross device')
+        rename(src, dst)
+
+    monkeypatch.setattr(os, 'rename', cross_device)
+    assert wd.move_files('moved', ['release']) == ['moved/release']
+    assert not os.path.exists(tmp_path / 'release')
+    assert tree(tmp_path / 'moved' / 'release') == original
+    assert os.stat(tmp_path / 'moved' / 'release' / 'run.sh').st_mtime == 1_000_000
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='named pipes are POSIX only')
+def test_named_pipes_are_recreated_not_opened(tmp_path):
+    make_tree(tmp_path / 'release', files=5)
+    os.mkfifo(tmp_path / 'release' / 'control.fifo', 0o640)
+    stats = copier.copy_tree(str(tmp_path / 'release'), str(tmp_path / 'copy'))
+    copied = os.stat(tmp_path / 'copy' / 'control.fifo')
+    assert stat.S_ISFIFO(copied.st_mode) and copied.st_mode & 0o777 == 0o640
+    assert stats.methods[copier.MKFIFO] == 1 and stats.files == 7
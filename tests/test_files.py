@@ -1,4 +1,5 @@
 from deployment_tools.files import create_file_builder
+from deployment_tools import files, backends, preserve
 import pytest
 import json
 import toml
@@ -182,3 +183,351 @@ class TestCaseDictType():
         self.remove_and_check(self.TEST_YAML)
         self.remove_and_check(self.TEST_TOML)
         self.remove_and_check(self.TEST_TXT)
+
+
+@pytest.fixture
+def parse_cache():
+    yield files.enable_parse_cache(max_entries=2)
+    files.disable_parse_cache()
+
+
+def test_parse_cache_hits_and_copies(tmp_path, parse_cache, monkeypatch):
+    config = str(tmp_path / 'config.json')
+    with open(config, 'w') as data:
+        json.dump({'nested': {'key': 'value'}}, data)
+    loads = []
+    load = files.JsonBuilder._load
+    monkeypatch.setattr(files.JsonBuilder, '_load', lambda self, file_object: loads.append(1) or load(self, file_object))
+    first = create_file_builder(config)
+    first['nested']['key'] = 'changed'
+    assert create_file_builder(config)['nested']['key'] == 'value'
+    assert len(loads) == 1
+    first.save()
+    assert create_file_builder(config)['nested']['key'] == 'changed'
+    assert len(loads) == 2
+
+
+def test_parse_cache_validation_and_eviction(tmp_path, parse_cache):
+    paths = [str(tmp_path / f'{idx}.txt') for idx in range(3)]
+    for file_path in paths:
+        with open(file_path, 'w') as data:
+            data.write('line\n')
+        create_file_builder(file_path)
+    assert len(parse_cache) == 2
+    with open(paths[2], 'a') as data:
+        data.write('more\n')
+    assert create_file_builder(paths[2]).base_data == ['line\n', 'more\n']
+
+
+def test_save_skips_unchanged_content(tmp_path):
+    config = str(tmp_path / 'config.yml')
+    builder = create_file_builder(config)
+    builder + {'key': 'value'}
+    assert builder.save()
+    mtime = os.stat(config).st_mtime_ns
+    assert not create_file_builder(config).save()
+    assert os.stat(config).st_mtime_ns == mtime
+    assert [name for name in os.listdir(tmp_path)] == ['config.yml']
+
+
+def test_save_all_commits_together(tmp_path):
+    first, second = create_file_builder(str(tmp_path / 'a.json')), create_file_builder(str(tmp_path / 'b.toml'))
+    first + {'a': 1}
+    second + {'b': 2}
+    assert files.save_all(first, second) == [True, True]
+    broken = create_file_builder(str(tmp_path / 'b.toml'))
+    broken.replace_all_data(['not', 'a', 'dict'])
+    first + {'a': 2}
+    with pytest.raises(TypeError):
+        files.save_all(first, broken)
+    with open(tmp_path / 'a.json') as data:
+        assert json.load(data) == {'a': 1}
+    assert files.save_all(first, create_file_builder(str(tmp_path / 'b.toml'))) == [True, False]
+    assert sorted(os.listdir(tmp_path)) == ['a.json', 'b.toml']
+
+
+def test_safe_yaml_rejects_python_tags(tmp_path):
+    config = tmp_path / 'unsafe.yml'
+    config.write_text("value: !!python/tuple [1, 2]\n")
+    assert create_file_builder(str(config)).base_data == {'value': (1, 2)}
+    with pytest.raises(yaml.YAMLError):
+        create_file_builder(str(config), safe=True)
+    config.write_text("value: [1, 2]\n")
+    assert create_file_builder(str(config), safe=True).base_data == {'value': [1, 2]}
+
+
+def test_backend_selection_and_fallback(tmp_path):
+    def rejecting(text, safe):
+        raise ValueError("not supported")
+
+    selected = backends.selected_backend(backends.JSON)
+    config = tmp_path / 'config.json'
+    config.write_text('{"a": 1}')
+    try:
+        backends.register_backend(backends.JSON, 'rejecting', rejecting)
+        assert backends.selected_backend(backends.JSON) == 'rejecting'
+        assert create_file_builder(str(config)).base_data == {'a': 1}
+        with pytest.raises(ValueError):
+            backends.use_backend(backends.JSON, 'missing')
+    finally:
+        backends.use_backend(backends.JSON, selected)
+        del backends._LOADERS[backends.JSON]['rejecting']
+    documents = {backends.JSON: '{"a": 1}', backends.TOML: 'a = 1', backends.YAML: 'a: 1'}
+    for format_, text in documents.items():
+        selected = backends.selected_backend(format_)
+        for name in backends.available_backends(format_):
+            backends.use_backend(format_, name)
+            assert backends.load(format_, text) == {'a': 1}
+        backends.use_backend(format_, selected)
+
+
+def test_streaming_txt_matches_loaded_builder(tmp_path):
+    content = ''.join(f'line {idx} host{idx % 3}\n' for idx in range(50)) + 'last line'
+    results = []
+    for streaming in (False, True):
+        hosts = tmp_path / f'hosts_{streaming}.txt'
+        hosts.write_text(content)
+        builder = create_file_builder(str(hosts), streaming=streaming)
+        builder + {'line 7 ': 'seven'}
+        builder.replace_string_in_lines('host1', 'HOST1')
+        builder - 'host2'
+        builder - 0
+        builder + ['appended host2', 'appended host0']
+        builder.replace_line('appended host0', 'replaced appended')
+        builder - 'HOST1'
+        builder + 'tail'
+        assert builder.save()
+        results.append(hosts.read_text())
+    assert results[0] == results[1]
+    assert 'seven\n' in results[1] and results[1].endswith('replaced appended\ntail\n')
+
+
+def test_streaming_txt_skips_unchanged_and_clears_operations(tmp_path):
+    hosts = tmp_path / 'hosts.txt'
+    hosts.write_text('a\nb\n')
+    builder = create_file_builder(str(hosts), streaming=True)
+    builder.replace_line('missing', 'x')
+    assert not builder.save()
+    assert os.listdir(tmp_path) == ['hosts.txt']
+    builder + 'c'
+    assert builder.save() and not builder.save()
+    assert hosts.read_text() == 'a\nb\nc\n'
+    builder.replace_all_data(['new'])
+    assert builder.save()
+    assert hosts.read_text() == 'new\n'
+    with pytest.raises(ValueError):
+        builder - -1
+
+
+def test_replace_many_single_pass(tmp_path):
+    env = tmp_path / 'app.env'
+    env.write_text('HOST=${HOST}\nURL=${PROTO}://${HOST}:${PORT}\n${HOST_NAME}\nplain\n')
+    for streaming in (False, True):
+        builder = create_file_builder(str(env), streaming=streaming)
+        counts = builder.replace_many({'${HOST}': 'db', '${HOST_NAME}': 'db-1', '${PORT}': '5432', '${PROTO}': 'pg'})
+        assert counts == (None if streaming else {'${HOST}': 2, '${HOST_NAME}': 1, '${PORT}': 1, '${PROTO}': 1})
+        builder.save()
+        assert env.read_text() == 'HOST=db\nURL=pg://db:5432\ndb-1\nplain\n'
+        env.write_text('HOST=${HOST}\nURL=${PROTO}://${HOST}:${PORT}\n${HOST_NAME}\nplain\n')
+    with pytest.raises(ValueError):
+        create_file_builder(str(env)).replace_many({'': 'x'})
+
+
+def test_replace_lines_many_first_pattern_wins(tmp_path):
+    hosts = tmp_path / 'hosts'
+    for streaming in (False, True):
+        hosts.write_text('127.0.0.1 localhost\n10.0.0.1 db cache\n10.0.0.2 web\n')
+        builder = create_file_builder(str(hosts), type_='txt', streaming=streaming)
+        if not streaming:
+            assert builder.replace_lines_many({'cache': '10.0.0.9 cache', 'db': '10.0.0.8 db', 'nope': ''}) == \
+                {'cache': 1, 'db': 0, 'nope': 0}
+        else:
+            builder + {'cache': '10.0.0.9 cache', 'db': '10.0.0.8 db', 'nope': ''}
+        builder.save()
+        assert hosts.read_text() == '127.0.0.1 localhost\n10.0.0.9 cache\n10.0.0.2 web\n'
+
+
+def test_replace_lines_many_same_as_replace_line_in_order(tmp_path):
+    hosts = tmp_path / 'hosts'
+    replace_lines = {'b': 'B first', 'ab': 'AB', 'first': 'chained', 'zz': 'never'}
+    for streaming in (False, True):
+        hosts.write_text('xab\nab\nzab\nplain\n')
+        builder = create_file_builder(str(hosts), type_='txt', streaming=streaming)
+        assert builder + {} is builder
+        counts = builder.replace_lines_many(replace_lines)
+        assert counts == (None if streaming else {'b': 3, 'ab': 0, 'first': 3, 'zz': 0})
+        builder.save()
+        assert hosts.read_text() == 'chained\nchained\nchained\nplain\n'
+    hosts.write_text('xab\nab\nzab\nplain\n')
+    builder = create_file_builder(str(hosts), type_='txt')
+    for pattern, new_line in replace_lines.items():
+        builder.replace_line(pattern, new_line)
+    assert builder.base_data == ['chained', 'chained', 'chained', 'plain\n']
+
+
+def test_merge_keeps_semantics_without_sharing(tmp_path):
+    builder = create_file_builder(str(tmp_path / 'values.json'))
+    builder + {'app': {'replicas': 1, 'ports': [80], 'env': {}}, 'name': 'app'}
+    overlay = {'app': {'ports': [443], 'env': {'A': {'value': 1}}}, 'extra': {'nested': {'x': 1}}}
+    builder + overlay
+    assert builder.base_data == {
+        'app': {'replicas': 1, 'ports': [443], 'env': {'A': {'value': 1}}}, 'name': 'app', 'extra': {'nested': {'x': 1}}
+    }
+    builder['app']['ports'].append(8080)
+    builder['extra']['nested']['y'] = 2
+    assert overlay == {'app': {'ports': [443], 'env': {'A': {'value': 1}}}, 'extra': {'nested': {'x': 1}}}
+    overlay['app']['env']['A']['value'] = 2
+    assert builder['app']['env']['A'] == {'value': 1}
+    with pytest.raises(TypeError):
+        builder + ['list']
+
+
+def test_merge_all_matches_sequential_adds(tmp_path):
+    overlays = [
+        {'region': {'zone': 'a', 'limits': {'cpu': 1}}, 'tags': ['base']},
+        {'region': {'limits': {'memory': '1Gi'}}, 'debug': True},
+        {'region': {'limits': {'cpu': 2}, 'zone': {'primary': 'b'}}, 'tags': ['host']},
+        {'debug': {'level': 3}},
+    ]
+    original = json.dumps(overlays)
+    sequential = create_file_builder(str(tmp_path / 'a.json'))
+    sequential + {'name': 'svc', 'region': {'zone': 'x'}}
+    merged = create_file_builder(str(tmp_path / 'b.json'))
+    merged + {'name': 'svc', 'region': {'zone': 'x'}}
+    for overlay in overlays:
+        sequential + overlay
+    merged.merge_all(overlays)
+    assert merged.base_data == sequential.base_data
+    merged['region']['limits']['cpu'] = 5
+    assert json.dumps(overlays) == original
+    blanked = create_file_builder(str(tmp_path / 'c.json'), blanked=True).merge_all([['a'], 'b'])
+    assert blanked.base_data == ['a', 'b']
+
+
+YAML_WITH_COMMENTS = """\
+# deployment values
+name: app  # the service name
+image:
+  repository: registry.local/app
+  tag: "1.0"   # bumped by CI
+replicas: 2
+servers:
+- host: a
+  port: 80
+notes: |
+  keep
+  this
+"""
+
+
+def test_preserving_yaml_edits_only_changed_entries(tmp_path):
+    values = tmp_path / 'values.yml'
+    values.write_text(YAML_WITH_COMMENTS)
+    builder = create_file_builder(str(values), preserve=True)
+    builder['image']['tag'] = '1.1'
+    builder - 'replicas'
+    builder + {'image': {'pullPolicy': 'Always'}, 'resources': {'cpu': 1}}
+    builder['servers'][0]['port'] = 443
+    assert builder.save()
+    text = values.read_text()
+    assert text == YAML_WITH_COMMENTS.replace('"1.0"', "'1.1'").replace('replicas: 2\n', '').replace(
+        '  tag: \'1.1\'   # bumped by CI\n', '  tag: \'1.1\'   # bumped by CI\n  pullPolicy: Always\n'
+    ).replace('- host: a\n  port: 80\n', '- host: a\n  port: 443\n') + 'resources:\n  cpu: 1\n'
+    assert yaml.safe_load(text) == builder.base_data
+    builder['name'] = 'renamed'
+    assert builder.save()
+    assert values.read_text().startswith('# deployment values\nname: renamed  # the service name\n')
+    assert not create_file_builder(str(values), preserve=True).save()
+
+
+def test_preserving_yaml_falls_back_to_full_dump(tmp_path):
+    values = tmp_path / 'values.yaml'
+    values.write_text('base: &base\n  a: 1\n# comment\nother: *base\n')
+    builder = create_file_builder(str(values), preserve=True, safe=True)
+    builder['other'] = {'a': 2}
+    assert builder.save()
+    assert yaml.safe_load(values.read_text()) == {'base': {'a': 1}, 'other': {'a': 2}}
+    assert '# comment' not in values.read_text()
+    builder['base']['a'] = 3
+    builder.save()
+    assert values.read_text() == 'base:\n  a: 3\nother:\n  a: 2\n'
+
+
+def test_preserving_yaml_loads_saved_text_only_when_edited_again(tmp_path, monkeypatch):
+    values = tmp_path / 'values.yml'
+    values.write_text(YAML_WITH_COMMENTS)
+    loads = []
+    load = preserve.YamlDocument.load
+    monkeypatch.setattr(preserve.YamlDocument, 'load', lambda document: loads.append(document) or load(document))
+    builder = create_file_builder(str(values), preserve=True)
+    for replicas in range(3, 6):
+        builder['replicas'] = replicas
+        assert builder.save()
+    assert len(loads) == 3
+    assert values.read_text() == YAML_WITH_COMMENTS.replace('replicas: 2', 'replicas: 5')
+
+
+def test_toml_save_keeps_inline_tables(tmp_path, parse_cache):
+    config = tmp_path / 'config.toml'
+    config.write_text('server = {host = "a", port = 80}\nworkers = [{name = "w1"}]\n[tool]\nname = "app"\n')
+    for _ in range(2):
+        builder = create_file_builder(str(config))
+        builder['tool']['name'] = 'renamed'
+        builder + {'extra': {'flag': True}}
+        builder.save()
+    text = config.read_text()
+    assert text.startswith('server = { host = "a", port = 80 }\n')
+    assert toml.loads(text) == {
+        'server': {'host': 'a', 'port': 80}, 'workers': [{'name': 'w1'}], 'tool': {'name': 'renamed'}, 'extra': {'flag': True}
+    }
+
+
+def test_preserving_toml(tmp_path):
+    config = tmp_path / 'pyproject.toml'
+    config.write_text('# project\n[tool]\nname = "app"  # name\nversion = "1.0"\n')
+    builder = create_file_builder(str(config), preserve=True)
+    builder['tool']['version'] = '1.1'
+    builder + {'extra': {'flag': True}}
+    assert builder.save()
+    assert toml.loads(config.read_text()) == {'tool': {'name': 'app', 'version': '1.1'}, 'extra': {'flag': True}}
+    pytest.importorskip('tomlkit')
+    assert config.read_text().startswith('# project\n[tool]\nname = "app"  # name\nversion = "1.1"\n')
+
+
+def test_save_uses_current_umask_and_keeps_mode(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        builder = create_file_builder(str(tmp_path / 'new.json'))
+        builder + {'a': 1}
+        builder.save()
+    finally:
+        os.umask(previous)
+    assert os.stat(tmp_path / 'new.json').st_mode & 0o777 == 0o640
+    os.chmod(tmp_path / 'new.json', 0o600)
+    builder = create_file_builder(str(tmp_path / 'new.json'))
+    builder['a'] = 2
+    assert builder.save() and os.stat(tmp_path / 'new.json').st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ['new.json']
+
+
+def test_save_writes_through_symlinks(tmp_path):
+    (tmp_path / 'real.json').write_text('{"a": 1}')
+    os.symlink(tmp_path / 'real.json', tmp_path / 'link.json')
+    builder = create_file_builder(str(tmp_path / 'link.json'))
+    builder['a'] = 2
+    assert builder.save()
+    assert os.path.islink(tmp_path / 'link.json') and json.loads((tmp_path / 'real.json').read_text()) == {'a': 2}
+    builder['a'] = 3
+    assert files.save_all(builder) == [True]
+    assert os.path.islink(tmp_path / 'link.json') and json.loads((tmp_path / 'real.json').read_text()) == {'a': 3}
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid') or os.getuid() != 0, reason="changing the owner needs root")
+def test_save_keeps_owner(tmp_path):
+    (tmp_path / 'owned.json').write_text('{"a": 1}')
+    os.chown(tmp_path / 'owned.json', 1234, 4321)
+    builder = create_file_builder(str(tmp_path / 'owned.json'))
+    builder['a'] = 2
+    assert builder.save()
+    stat_result = os.stat(tmp_path / 'owned.json')
+    assert (stat_result.st_uid, stat_result.st_gid) == (1234, 4321)
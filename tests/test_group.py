@@ -0,0 +1,39 @@
+from deployment_tools.group import CommandGroup, run_parallel
+from deployment_tools.pyshell import Command, ShellCommandError
+import pytest
+import time
+
+
+def test_runs_concurrently():
+    start = time.monotonic()
+    group = run_parallel([['sleep 0.3; echo done']] * 4, max_workers=4)
+    assert time.monotonic() - start < 1
+    assert all(cmd.output == ['done', ''] for cmd in group.commands)
+    assert not group.failed()
+
+
+def test_logs_are_kept_per_command():
+    group = CommandGroup([['echo first'], ['echo second']], max_workers=2)
+    assert group.logs[0][0] == '\tfirst' and group.logs[1][0] == '\tsecond'
+
+
+def test_aggregated_failure():
+    group = run_parallel([
+        ['echo ok'],
+        ['asdadawe'],
+        Command(['echo ok'], autorun=False).set_success('missing'),
+    ])
+    assert len(group.failed()) == 2
+    with pytest.raises(ShellCommandError, match='2 of 3') as error:
+        group.raise_on_failure()
+    assert 'asdadawe' in str(error.value) and 'missing' in str(error.value)
+
+
+def test_quiet_group_restores_loggers(capsys):
+    lines = []
+    cmd = Command(['echo ok'], autorun=False, verbose=False, logger=lines.append).set_success('missing')
+    group = CommandGroup([['echo quiet'], cmd], verbose=False)
+    assert capsys.readouterr().out == '' and cmd.logger == lines.append
+    with pytest.raises(ShellCommandError):
+        cmd.raise_on_failure()
+    assert 'SCRIPT INTERRUPTED!!!' in lines and 'SCRIPT INTERRUPTED!!!' not in group.logs[1]
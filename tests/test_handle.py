@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from deployment_tools import handle as handle_module
+from deployment_tools.handle import DirectoryHandle
+from deployment_tools.cache import CommandCache
+from deployment_tools.pyshell import Command
+import asyncio
+import os
+import pytest
+
+
+def deploy(root, name):
+    with DirectoryHandle(str(root / name), create=True) as target:
+        target['config.json'] = {'target': name}
+        with target / 'static' as static:
+            static['index.txt'] = [f'{name}\n']
+        command = target.command(['cat config.json && ls'], verbose=False)
+        return target['config.json'], command.output
+
+
+def test_handles_in_threads(tmp_path):
+    cwd = os.getcwd()
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda name: deploy(tmp_path, name), [f'target{idx}' for idx in range(8)]))
+    assert os.getcwd() == cwd
+    for idx, (config, output) in enumerate(results):
+        assert config == {'target': f'target{idx}'} and 'static' in output
+        assert (tmp_path / f'target{idx}' / 'static' / 'index.txt').read_text() == f'target{idx}\n'
+
+
+def test_handle_file_operations(tmp_path):
+    with DirectoryHandle(str(tmp_path)) as handle:
+        handle.makedirs('a/b')
+        handle['a/b/data.json'] = {'key': 1}
+        assert handle.isdir('a/b') and handle.isfile('a/b/data.json') and not handle.exists('missing')
+        assert handle.read_text('a/b/data.json').startswith('{')
+        handle.rename('a/b/data.json', 'data.json')
+        assert sorted(handle.get_all_files_or_dirs()) == ['a', 'data.json']
+        handle.copy_files('release', ['a', 'data.json'])
+        assert handle.isdir('release/a/b') and handle['release/data.json'] == {'key': 1}
+        assert handle.move_files('moved', ['a', 'data.json']) == [os.path.join(handle.path, 'moved', name) for name in ('a', 'data.json')]
+        handle.remove('release')
+        assert sorted(handle.get_all_files_or_dirs()) == ['moved']
+    with pytest.raises(ValueError):
+        handle.stat('moved')
+
+
+def test_handle_async_command_and_cache_cwd(tmp_path):
+    with DirectoryHandle(str(tmp_path / 'app'), create=True) as handle:
+        handle['input.txt'] = ['one\n']
+        command = asyncio.run(handle.async_command(['cat input.txt'], verbose=False).run())
+        assert command.output[0] == 'one'
+    assert Command(['pwd'], cwd=str(tmp_path), verbose=False).output[0] == os.path.realpath(tmp_path)
+    cache = CommandCache(str(tmp_path / 'cache'))
+    first = Command(['cat input.txt > out.txt'], cwd=str(tmp_path / 'app'), cache=cache, inputs=['input.txt'], outputs=['out.txt'])
+    os.remove(tmp_path / 'app' / 'out.txt')
+    second = Command(['cat input.txt > out.txt'], cwd=str(tmp_path / 'app'), cache=cache, inputs=['input.txt'], outputs=['out.txt'])
+    assert not first.cached and second.cached and (tmp_path / 'app' / 'out.txt').read_text().startswith('one')
+
+
+def test_handle_remove_without_rmtree_dir_fd(tmp_path, monkeypatch):
+    monkeypatch.setattr(handle_module, '_RMTREE_DIR_FD', False)
+    with DirectoryHandle(str(tmp_path)) as handle:
+        handle.makedirs('a/b')
+        handle['a/b/data.json'] = {'key': 1}
+        handle.remove('a')
+        assert not handle.exists('a')
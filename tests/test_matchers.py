@@ -0,0 +1,50 @@
+from deployment_tools.matchers import Matcher, MatchResult, ALL
+from deployment_tools.output import OutputLines
+from deployment_tools.pyshell import Command, ShellCommandError
+import pytest
+import re
+
+OUTPUT = OutputLines(b'starting\nwarning: disk\nerror: failed at step 3\ndone\n')
+
+
+def test_any_reports_conditions_and_lines():
+    result = Matcher('warning', 'missing').regex(r'step \d+').search(OUTPUT)
+    assert result.matched
+    assert result.lines == {'warning': [1], 'missing': [], r'/step \d+/': [2]}
+
+
+def test_all_and_line_anchored():
+    assert Matcher('starting', mode=ALL).on_line(-2, 'done').search(OUTPUT)
+    assert not Matcher('starting', 'missing', mode=ALL).search(OUTPUT)
+    assert not Matcher().on_line(0, 'done').search(OUTPUT)
+
+
+def test_bytes_and_list_scans_agree():
+    matcher = Matcher('error', 'done', 'g\nd')
+    assert matcher.search(OUTPUT).lines == matcher.search(list(OUTPUT)).lines == \
+        {'error': [2], 'done': [3], 'g\nd': []}
+
+
+def test_streaming_matcher_fail_fast():
+    cmd = Command(
+        ['echo ok; echo "E42 boom" >&2; sleep 10'], verbose=False, fail_fast=True, autorun=False
+    ).set_failure(Matcher('FATAL').regex(r'^E\d+'))
+    with pytest.raises(ShellCommandError, match='E42 boom'):
+        cmd.run()
+    assert cmd.failure_matches().lines == {'FATAL': [], r'/^E\d+/': [0]}
+
+
+def test_command_conditions():
+    cmd = Command(['echo one; echo two'], verbose=False).set_success(Matcher('two', mode=ALL).on_line(0, 'one'))
+    assert cmd.is_success() and cmd.success_matches().lines == {'two': [1], 'one (on line 0)': [0]}
+
+
+def test_regex_flags_and_groups_survive_the_alternation():
+    output = OutputLines(b'ERROR: disk\nabb\nwarning\n')
+    matcher = Matcher('warning').regex('error', flags=re.I).regex(r'(?i)disk', r'(b)\1', r'(?P<letter>a)(?P=letter)?b')
+    expected = {'warning': [2], '/error/': [0], '/(?i)disk/': [0], r'/(b)\1/': [1], '/(?P<letter>a)(?P=letter)?b/': [1]}
+    assert matcher.search(output).lines == matcher.search(list(output)).lines == expected
+    state = matcher.start()
+    for number, line in enumerate(output):
+        state.feed(number, line)
+    assert MatchResult(matcher, state.hits).lines == expected
@@ -0,0 +1,40 @@
+from deployment_tools.metrics import CommandMetrics, TraceRecorder, recorder
+from deployment_tools.pyshell import Command
+import json
+from sys import platform
+
+
+def test_metrics_collected():
+    cmd = Command(['printf "abc"; printf "de" >&2; exit 3'], verbose=False)
+    metrics = cmd.metrics
+    assert cmd.returncode == 3 and metrics.returncode == 3
+    assert metrics.stdout_bytes == 3 and metrics.stderr_bytes == 2
+    assert metrics.wall > 0
+    if platform != 'win32':
+        assert metrics.user_cpu is not None and metrics.max_rss > 0
+
+
+def test_streamed_metrics():
+    cmd = Command(['echo abc'], verbose=False, stream=True)
+    assert cmd.metrics.stdout_bytes == 4 and cmd.returncode == 0
+
+
+def test_exports(tmp_path):
+    recorder.clear()
+    Command(['true'], verbose=False)
+    Command(['echo x'], verbose=False, stream=True)
+    recorder.to_jsonl(str(tmp_path / 'run.jsonl'))
+    recorder.to_chrome_trace(str(tmp_path / 'trace.json'))
+    lines = (tmp_path / 'run.jsonl').read_text().splitlines()
+    assert [json.loads(line)['args'] for line in lines] == [['true'], ['echo x']]
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert [event['ph'] for event in events] == ['X', 'X'] and events[1]['name'] == 'echo x'
+
+
+def test_recorder_keeps_last_records():
+    bounded = TraceRecorder(max_records=2)
+    for idx in range(5):
+        bounded.record(CommandMetrics([str(idx)], 0))
+    assert [metrics.args for metrics in bounded.records] == [['3'], ['4']]
+    bounded.clear()
+    assert not bounded.records and bounded.records.maxlen == 2
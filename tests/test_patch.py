@@ -0,0 +1,92 @@
+from deployment_tools import create_file_builder, JsonPatchError
+from deployment_tools import patch
+from deployment_tools.patch import diff, apply_patch
+import json
+import pytest
+
+STAGING = {
+    'name': 'app',
+    'image': {'tag': '1.0', 'registry': 'local'},
+    'hosts': ['a', 'b', 'c', 'd'],
+    'a/b': {'~key': 1},
+    'ports': [{'port': 80}, {'port': 443}],
+}
+PRODUCTION = {
+    'name': 'app',
+    'image': {'tag': '1.1', 'registry': 'local', 'pull': 'Always'},
+    'hosts': ['a', 'x', 'c', 'd', 'e'],
+    'a/b': {},
+    'ports': [{'port': 8443}],
+    'replicas': 3,
+}
+
+
+def test_diff_and_apply_roundtrip():
+    operations = diff(STAGING, PRODUCTION)
+    assert {'op': 'replace', 'path': '/image/tag', 'value': '1.1'} in operations
+    assert {'op': 'remove', 'path': '/a~1b/~0key'} in operations
+    assert {'op': 'replace', 'path': '/hosts/1', 'value': 'x'} in operations
+    assert not [operation for operation in operations if operation['path'].startswith('/name')]
+    document = json.loads(json.dumps(STAGING))
+    assert apply_patch(document, json.loads(json.dumps(operations))) == PRODUCTION
+    assert diff(PRODUCTION, PRODUCTION) == []
+    assert apply_patch({'a': 1}, diff({'a': 1}, [1, 2])) == [1, 2]
+
+
+def test_apply_patch_operations_and_rollback():
+    document = {'a': {'b': [1, 2]}, 'c': 3}
+    apply_patch(document, [
+        {'op': 'add', 'path': '/a/b/-', 'value': 3},
+        {'op': 'move', 'from': '/c', 'path': '/a/c'},
+        {'op': 'copy', 'from': '/a/b', 'path': '/d'},
+        {'op': 'test', 'path': '/d', 'value': [1, 2, 3]},
+    ])
+    assert document == {'a': {'b': [1, 2, 3], 'c': 3}, 'd': [1, 2, 3]}
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [
+            {'op': 'remove', 'path': '/a/b/0'},
+            {'op': 'replace', 'path': '/d', 'value': 1},
+            {'op': 'add', 'path': '/a/b/1', 'value': 'x'},
+            {'op': 'test', 'path': '/d', 'value': 2},
+        ])
+    assert document == {'a': {'b': [1, 2, 3], 'c': 3}, 'd': [1, 2, 3]}
+    for broken in ({'op': 'remove', 'path': '/missing'}, {'op': 'add', 'path': '/a/b/9', 'value': 1},
+                   {'op': 'move', 'from': '/a', 'path': '/a/x'}, {'op': 'nope', 'path': ''}):
+        with pytest.raises(JsonPatchError):
+            apply_patch(document, [broken])
+
+
+def test_builder_diff_and_apply_patch(tmp_path):
+    staging, production = create_file_builder(str(tmp_path / 'staging.json')), create_file_builder(str(tmp_path / 'prod.yml'))
+    staging + STAGING
+    production + PRODUCTION
+    operations = staging.diff(production)
+    assert operations == diff(STAGING, PRODUCTION)
+    staging.apply_patch(operations)
+    assert staging.base_data == PRODUCTION
+    staging['image']['tag'] = '2.0'
+    assert production['image']['tag'] == '1.1'
+    numbered = create_file_builder(str(tmp_path / 'numbers.yml'))
+    numbered + {1: 'one'}
+    assert numbered.apply_patch([{'op': 'replace', 'path': '/1', 'value': 'uno'}]).base_data == {1: 'uno'}
+
+
+def test_diff_compares_types_in_lists_and_dicts():
+    assert diff([1, 2], [True, 2]) == [{'op': 'replace', 'path': '/0', 'value': True}]
+    assert diff({'a': [1.0]}, {'a': [1]}) == [{'op': 'replace', 'path': '/a/0', 'value': 1}]
+    assert diff({'a': 1}, {'a': True}) == [{'op': 'replace', 'path': '/a', 'value': True}]
+    assert diff([0, [1]], [0, [1]]) == []
+    with pytest.raises(JsonPatchError):
+        apply_patch({'a': 1}, [{'op': 'test', 'path': '/a', 'value': True}])
+
+
+def test_diff_walks_equal_subtrees_once(monkeypatch):
+    old = new = None
+    for depth in range(50):
+        old = {'child': old, 'items': list(range(10)), 'depth': depth}
+        new = {'child': new if depth else 'changed', 'items': list(range(10)), 'depth': depth}
+    walked = []
+    same_types = patch._same_types
+    monkeypatch.setattr(patch, '_same_types', lambda old, new: walked.append(old) or same_types(old, new))
+    assert diff(old, new) == [{'op': 'replace', 'path': '/child' * 50, 'value': 'changed'}]
+    assert len(walked) <= 50 * 13
@@ -0,0 +1,44 @@
+from deployment_tools.pipeline import Pipeline, Step, OK, FAILED, SKIPPED
+from deployment_tools.pyshell import ShellCommandError
+import pytest
+import time
+
+
+def test_independent_steps_run_in_parallel():
+    start = time.monotonic()
+    pipeline = Pipeline(max_workers=3)\
+        .add('a', ['sleep 0.3'])\
+        .add('b', ['sleep 0.3'])\
+        .add('c', ['sleep 0.1'], depends_on=['a', 'b'])\
+        .run()
+    assert time.monotonic() - start < 0.8
+    assert pipeline.status == {'a': OK, 'b': OK, 'c': OK}
+    path, total = pipeline.critical_path()
+    assert path[-1] == 'c' and len(path) == 2 and total >= 0.4
+    assert 'critical path' in pipeline.report()
+
+
+def test_failure_skips_downstream():
+    edited = []
+    pipeline = Pipeline([
+        Step('broken', ['asdadawe']),
+        Step('after', ['echo after'], depends_on=['broken']),
+        Step('last', depends_on=['after'], edits=[lambda: edited.append(True)]),
+        Step('other', edits=[lambda: edited.append(False)]),
+    ]).run()
+    assert pipeline.status == {'broken': FAILED, 'after': SKIPPED, 'last': SKIPPED, 'other': OK}
+    assert edited == [False]
+    with pytest.raises(ShellCommandError, match='skipped steps: after, last'):
+        pipeline.raise_on_failure()
+
+
+def test_invalid_graph():
+    with pytest.raises(ValueError):
+        Pipeline().add('a', depends_on=['missing']).run()
+    with pytest.raises(ValueError):
+        Pipeline().add('a', depends_on=['b']).add('b', depends_on=['a']).run()
+
+
+def test_repeated_dependency_is_not_a_cycle():
+    pipeline = Pipeline().add('a', ['true'], verbose=False).add('b', ['true'], depends_on=['a', 'a'], verbose=False).run()
+    assert pipeline.status == {'a': OK, 'b': OK}
@@ -1,5 +1,6 @@
 from deployment_tools.pyshell import Command, ShellCommandError
 import pytest
+import time
 from sys import platform
 
 
@@ -36,3 +37,52 @@ def test_not_success():
 def test_err_not_failure():
     cmd = Command(['asdasf']).set_failure('d;lfjasl;pkfjasol;f')
     assert not cmd.is_failure()
+
+
+def test_stream_keeps_tail():
+    cmd = Command(['for i in 1 2 3 4 5; do echo line$i; done'], verbose=False, stream=True, buffer_size=3)
+    assert cmd.output == ['line4', 'line5', ''] and cmd.error == ['']
+
+
+def test_stream_keeps_matched_lines():
+    cmd = Command(
+        ['for i in 1 2 3 4 5; do echo line$i; done'], verbose=False, stream=True, buffer_size=2, autorun=False
+    ).set_success('line1').set_failure('line')
+    lines = list(cmd.iter_lines())
+    assert lines[0] == ('stdout', 'line1')
+    assert cmd.is_success() and not cmd.is_failure()
+    assert cmd.set_success('line5', on_line=-2).is_success()
+    assert not cmd.set_success('line2', on_line=1).is_success()
+
+
+def test_fail_fast_terminates_on_failure():
+    cmd = Command(['echo FAILED >&2; sleep 10'], verbose=False, fail_fast=True, autorun=False).set_failure('FAILED')
+    with pytest.raises(ShellCommandError, match='FAILED'):
+        cmd.run()
+    assert cmd._process.returncode is not None
+
+
+def test_fail_fast_without_failure_condition_stops_on_stderr():
+    start = time.monotonic()
+    with pytest.raises(ShellCommandError, match='warning'):
+        Command(['echo out; echo warning >&2; sleep 10'], verbose=False, fail_fast=True)
+    assert time.monotonic() - start < 5
+    assert Command(['echo out'], verbose=False, fail_fast=True).output == ['out', '']
+
+
+def test_timeouts():
+    with pytest.raises(ShellCommandError, match='timed out'):
+        Command(['sleep 10'], verbose=False, timeout=0.2)
+    with pytest.raises(ShellCommandError, match='no output'):
+        Command(['echo start; sleep 10'], verbose=False, idle_timeout=0.2)
+
+
+def test_raw_output_lazy_lines():
+    cmd = Command(['printf "caf\\303\\251\\nsecond\\tline\\n"'], verbose=False, encoding='utf-8')
+    assert cmd.output.raw == 'café\nsecond\tline\n'.encode()
+    assert cmd.output == ['café', 'second\tline', '']
+    assert bytes(cmd.output.line_view(1)) == b'second\tline'
+    assert cmd.output[-2] == 'second\tline' and len(cmd.output) == 3
+    assert cmd.output.find_lines('line') == [1]
+    assert cmd.output.find_lines('') == [0, 1, 2] and cmd.output.find_lines(b'') == [0, 1, 2]
+    assert cmd.set_success('café').is_success() and cmd.set_success('\tline', on_line=1).is_success()
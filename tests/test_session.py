@@ -0,0 +1,28 @@
+from deployment_tools.session import ShellSession
+from deployment_tools.pyshell import Command, ShellCommandError
+import pytest
+
+
+def test_results_match_command():
+    with ShellSession(verbose=False) as session:
+        for args in (['echo a; echo b >&2'], ['printf "no newline"'], ['asdadawe'], ['exit 4']):
+            result, expected = session.run(args, isolate=True), Command(args, verbose=False)
+            assert (result.output, result.is_failure(), result.returncode) == \
+                (expected.output, expected.is_failure(), expected.returncode)
+
+
+def test_state_is_kept_unless_isolated(tmp_path):
+    with ShellSession(verbose=False) as session:
+        session.run(f'cd {tmp_path}')
+        session.run('export DT_VALUE=kept')
+        session.run('cd / && export DT_VALUE=lost', isolate=True)
+        cmd = session.run('pwd; echo $DT_VALUE').set_success(str(tmp_path))
+        assert cmd.output == [str(tmp_path), 'kept', ''] and cmd.is_success()
+
+
+def test_syntax_error_and_exit():
+    with ShellSession(verbose=False) as session:
+        assert session.run('if').is_failure()
+        assert session.run('echo alive').output == ['alive', '']
+        with pytest.raises(ShellCommandError):
+            session.run('exit 1')
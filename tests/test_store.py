@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+from deployment_tools import store as store_module
+from deployment_tools.copier import copy_tree
+from deployment_tools.directory import WorkingDirectory
+from deployment_tools.store import HASH_CACHE, ContentStore
+from deployment_tools.sync import sync_tree
+import json
+import os
+import time
+
+
+def make_build(root):
+    for idx in range(10):
+        directory = root / f'pkg{idx % 2}'
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f'module{idx}.py').write_text(f'VALUE = {idx % 5}\n')
+    (root / 'run.sh').write_text('#!/bin/sh\n')
+    os.chmod(root / 'run.sh', 0o755)
+
+
+def test_checkout_links_releases(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, '_RACY_NS', 0)
+    build, releases = tmp_path / 'build', tmp_path / 'releases'
+    make_build(build)
+    store = ContentStore(str(tmp_path / 'store'))
+    first = store.checkout(str(build), str(releases / '1'))
+    # modules with the same content share one blob
+    assert first.linked == 11 and first.added == 6 and first.copied == 0
+    assert os.stat(releases / '1' / 'run.sh').st_mode & 0o111
+    hashed = []
+    monkeypatch.setattr(store_module, '_hash_file', lambda path: hashed.append(path) or 'x')
+    second = ContentStore(str(tmp_path / 'store')).checkout(str(build), str(releases / '2'))
+    assert hashed == [] and second.added == 0 and second.linked == 11
+    assert os.path.samestat(os.stat(releases / '1' / 'pkg0' / 'module0.py'), os.stat(releases / '2' / 'pkg1' / 'module5.py'))
+    assert ContentStore(str(tmp_path / 'store')).checkout(str(build), str(releases / '2')).unchanged == 11
+
+
+def test_gc_drops_unreferenced_blobs(tmp_path):
+    build, releases = tmp_path / 'build', tmp_path / 'releases'
+    make_build(build)
+    store = ContentStore(str(tmp_path / 'store'))
+    store.checkout(str(build), str(releases / '1'))
+    (build / 'pkg0' / 'module0.py').write_text('VALUE = "new"\n')
+    store.checkout(str(build), str(releases / '2'))
+    assert store.gc() == []
+    WorkingDirectory.remove(str(releases / '1'))
+    removed = WorkingDirectory.collect_garbage(store)
+    assert len(removed) == 0
+    os.remove(releases / '2' / 'pkg0' / 'module0.py')
+    os.rename(releases / '2', releases / '3')
+    assert len(store.gc()) == 1
+
+
+def test_transfer_with_store(tmp_path):
+    make_build(tmp_path / 'build')
+    wd = WorkingDirectory()
+    wd.go_to(str(tmp_path / 'build'))
+    try:
+        store = wd.content_store(str(tmp_path / 'store'))
+        wd.transfer_and_copy_files('release', store=store)
+        assert sorted(wd.get_all_files_or_dirs()) == ['pkg0', 'pkg1', 'run.sh']
+        assert os.stat('run.sh').st_nlink == 2
+    finally:
+        wd.back()
+
+
+def test_concurrent_add_keeps_one_blob(tmp_path):
+    sources = []
+    for idx in range(32):
+        (tmp_path / f'same{idx}.txt').write_text('same content\n')
+        sources.append(str(tmp_path / f'same{idx}.txt'))
+    store = ContentStore(str(tmp_path / 'store'))
+    with ThreadPoolExecutor(16) as executor:
+        results = list(executor.map(store.add, sources))
+    assert sum(added for _, added in results) == 1 and len({blob for blob, _ in results}) == 1
+    assert not [name for name in os.listdir(os.path.dirname(results[0][0])) if name.endswith('.tmp')]
+
+
+def test_sync_into_release_keeps_other_releases(tmp_path):
+    build, releases = tmp_path / 'build', tmp_path / 'releases'
+    make_build(build)
+    store = ContentStore(str(tmp_path / 'store'))
+    store.checkout(str(build), str(releases / '1'))
+    store.checkout(str(build), str(releases / '2'))
+    (build / 'run.sh').write_text('#!/bin/sh\necho changed\n')
+    sync_tree(str(build), str(releases / '2'))
+    assert (releases / '2' / 'run.sh').read_text().endswith('changed\n')
+    assert (releases / '1' / 'run.sh').read_text() == '#!/bin/sh\n'
+    (build / 'pkg0' / 'module0.py').write_text('VALUE = "copied"\n')
+    copy_tree(str(build / 'pkg0'), str(releases / '1' / 'pkg0'))
+    assert (releases / '1' / 'pkg0' / 'module0.py').read_text() == 'VALUE = "copied"\n'
+    assert (releases / '2' / 'pkg0' / 'module0.py').read_text() == 'VALUE = 0\n'
+
+
+def test_hash_cache_drops_unseen_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, '_RACY_NS', 0)
+    make_build(tmp_path / 'build1')
+    make_build(tmp_path / 'build2')
+    ContentStore(str(tmp_path / 'store')).checkout(str(tmp_path / 'build1'), str(tmp_path / 'release1'))
+    ContentStore(str(tmp_path / 'store')).checkout(str(tmp_path / 'build2'), str(tmp_path / 'release2'))
+    with open(tmp_path / 'store' / HASH_CACHE) as file_object:
+        assert len(json.load(file_object)) == 11
+
+
+def test_checkout_and_sync_skip_named_pipes(tmp_path):
+    make_build(tmp_path / 'build')
+    os.mkfifo(tmp_path / 'build' / 'control.fifo')
+    assert ContentStore(str(tmp_path / 'store')).checkout(str(tmp_path / 'build'), str(tmp_path / 'release')).linked == 11
+    assert 'control.fifo' not in sync_tree(str(tmp_path / 'build'), str(tmp_path / 'synced')).copied
+    assert not os.path.lexists(tmp_path / 'release' / 'control.fifo') and not os.path.lexists(tmp_path / 'synced' / 'control.fifo')
+
+
+def test_hash_cache_checks_ctime_and_skips_racy_files(tmp_path, monkeypatch):
+    config = tmp_path / 'config.txt'
+    config.write_text('version 1\n')
+    store = ContentStore(str(tmp_path / 'store'))
+    first = store.digest(str(config))
+    assert store._hashes == {}
+    monkeypatch.setattr(store_module, '_RACY_NS', 0)
+    assert store.digest(str(config)) == first and len(store._hashes) == 1
+    times = os.stat(config)
+    # same size and mtime, only ctime tells the change (after the coarse kernel timestamp tick)
+    time.sleep(0.05)
+    config.write_text('version 2\n')
+    os.utime(config, ns=(times.st_atime_ns, times.st_mtime_ns))
+    assert store.digest(str(config)) != first
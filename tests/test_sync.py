@@ -0,0 +1,79 @@
+from deployment_tools.directory import WorkingDirectory
+from deployment_tools.sync import MANIFEST, sync_tree
+import os
+
+
+def make_release(root):
+    for idx in range(20):
+        directory = root / f'pkg{idx % 4}'
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f'module{idx}.py').write_text(f'VALUE = {idx}\n')
+    (root / 'README').write_text('release')
+
+
+def test_sync_copies_only_changes(tmp_path):
+    src, dst = tmp_path / 'build', tmp_path / 'release'
+    make_release(src)
+    first = sync_tree(str(src), str(dst))
+    assert len(first.copied) == 21 and first.unchanged == 0 and os.path.isfile(dst / MANIFEST)
+    assert sync_tree(str(src), str(dst)).copied == []
+    (src / 'pkg1' / 'module1.py').write_text('VALUE = "changed"\n')
+    (src / 'pkg9').mkdir()
+    (src / 'pkg9' / 'new.py').write_text('')
+    os.remove(dst / 'README')
+    second = sync_tree(str(src), str(dst))
+    assert sorted(second.copied) == ['README', os.path.join('pkg1', 'module1.py'), os.path.join('pkg9', 'new.py')]
+    assert second.unchanged == 19 and second.stats.files == 3
+    assert (dst / 'pkg1' / 'module1.py').read_text() == 'VALUE = "changed"\n'
+
+
+def test_sync_checksum_and_delete(tmp_path):
+    src, dst = tmp_path / 'build', tmp_path / 'release'
+    make_release(src)
+    sync_tree(str(src), str(dst), checksum=True)
+    stat = os.stat(src / 'README')
+    (src / 'README').write_text('RELEASE')
+    os.utime(src / 'README', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert sync_tree(str(src), str(dst)).copied == []
+    assert sync_tree(str(src), str(dst), checksum=True).copied == ['README']
+    (dst / 'extra').mkdir()
+    (dst / 'extra' / 'stale.txt').write_text('stale')
+    os.remove(src / 'pkg3' / 'module3.py')
+    result = sync_tree(str(src), str(dst), delete=True)
+    assert sorted(result.deleted) == [os.path.join('extra', 'stale.txt'), os.path.join('pkg3', 'module3.py')]
+    assert not os.path.exists(dst / 'extra') and os.path.isdir(dst / 'pkg3')
+
+
+def test_transfer_and_copy_files_with_sync(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_release(tmp_path / 'app')
+    wd = WorkingDirectory()
+    wd.transfer_and_copy_files('deploy', ['app'], sync=True)
+    assert os.path.basename(wd.cwd) == 'deploy'
+    wd.back()
+    assert sorted(os.listdir(tmp_path / 'deploy')) == [MANIFEST, 'app']
+    assert wd.sync('.', 'deploy', ['app']).unchanged == 21
+
+
+def test_sync_skips_destination_inside_source(tmp_path):
+    make_release(tmp_path)
+    for _ in range(3):
+        result = sync_tree(str(tmp_path), str(tmp_path / 'deploy'))
+    assert not os.path.exists(tmp_path / 'deploy' / 'deploy') and result.copied == [] and result.unchanged == 21
+    assert sync_tree(str(tmp_path), str(tmp_path / 'deploy'), entries=['deploy', 'README']).copied == []
+
+
+def test_delete_unlinks_symlinked_directory_without_following_it(tmp_path):
+    src, dst, shared = tmp_path / 'build', tmp_path / 'release', tmp_path / 'shared'
+    make_release(src)
+    sync_tree(str(src), str(dst))
+    shared.mkdir()
+    (shared / 'precious').write_text('keep me')
+    os.symlink(shared, dst / 'storage')
+    os.symlink(shared, dst / 'pkg0' / 'storage')
+    result = sync_tree(str(src), str(dst), delete=True)
+    assert sorted(result.deleted) == [os.path.join('pkg0', 'storage'), 'storage']
+    assert (shared / 'precious').read_text() == 'keep me' and not os.path.lexists(dst / 'storage')
+    os.symlink(shared, dst / 'storage')
+    assert sync_tree(str(src), str(dst), entries=['storage'], delete=True).deleted == ['storage']
+    assert (shared / 'precious').read_text() == 'keep me'
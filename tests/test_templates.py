@@ -0,0 +1,50 @@
+from deployment_tools import Template, create_file_builder
+from deployment_tools import templates
+import json
+import os
+import pytest
+
+
+def write_template(tmp_path, text='server ${HOST}:${PORT};\n# ${HOST} ${UNKNOWN_SUFFIX}\n'):
+    path = tmp_path / 'site.conf.tpl'
+    path.write_text(text)
+    return str(path)
+
+
+def test_render_compiled_template(tmp_path):
+    template = Template(write_template(tmp_path), strict=False)
+    assert template.names == ['HOST', 'PORT', 'HOST', 'UNKNOWN_SUFFIX']
+    assert template.render({'HOST': 'app', 'PORT': 80}) == 'server app:80;\n# app ${UNKNOWN_SUFFIX}\n'
+    with pytest.raises(KeyError):
+        Template(write_template(tmp_path)).render({'HOST': 'app'})
+    assert Template(write_template(tmp_path, '<<name>>!'), pattern=r"<<(\w+)>>").render({'name': 'x'}) == 'x!'
+
+
+def test_compiled_templates_are_cached_by_content(tmp_path):
+    cache_root = str(tmp_path / 'cache')
+    template = Template(write_template(tmp_path), cache_root=cache_root)
+    assert os.listdir(cache_root) == [f'{template.key}.json']
+    templates._compiled.clear()
+    with open(os.path.join(cache_root, f'{template.key}.json'), 'w') as cached:
+        json.dump({'literals': ['from cache ', ''], 'names': ['HOST'], 'raw': ['${HOST}']}, cached)
+    assert Template(write_template(tmp_path), cache_root=cache_root).render({'HOST': 'a'}) == 'from cache a'
+    changed = Template(write_template(tmp_path, 'other ${HOST}\n'), cache_root=cache_root)
+    assert changed.render({'HOST': 'a'}) == 'other a\n'
+    assert len(os.listdir(cache_root)) == 2
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_render_all_saves_through_builders(tmp_path, max_workers):
+    template = Template(write_template(tmp_path, 'server ${HOST}:${PORT};'))
+    outputs = {str(tmp_path / f'{host}.conf'): {'HOST': host, 'PORT': 80} for host in ('a', 'b', 'c')}
+    assert template.render_all(outputs, max_workers=max_workers) == [True, True, True]
+    assert create_file_builder(str(tmp_path / 'b.conf')).base_data == ['server b:80;\n']
+    outputs[str(tmp_path / 'c.conf')]['PORT'] = 443
+    assert template.render_all(outputs, max_workers=max_workers) == [False, False, True]
+
+
+def test_render_to_splits_only_on_new_lines(tmp_path):
+    (tmp_path / 'raw.tpl').write_text('a=${A}\nsection\x0cend\n')
+    Template(str(tmp_path / 'raw.tpl')).render_to(str(tmp_path / 'raw.txt'), {'A': 'x y\rz'})
+    with open(tmp_path / 'raw.txt', newline='') as file_object:
+        assert file_object.read() == 'a=x y\rz\nsection\x0cend\n'
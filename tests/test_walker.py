@@ -0,0 +1,63 @@
+from deployment_tools.directory import WorkingDirectory
+from deployment_tools.walker import IgnoreRule, Walker, is_within
+import os
+
+
+def make_tree(root):
+    for relative in ['app/main.py', 'app/main.pyc', 'app/__pycache__/main.pyc', 'app/keep.pyc', 'docs/index.md',
+                     'build/out.bin', 'lib/build/util.py', '.env', 'README']:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+
+
+def test_ignore_rules():
+    assert IgnoreRule('*.pyc').matches('a/b/c.pyc', False)
+    assert not IgnoreRule('/build').matches('lib/build', True)
+    assert IgnoreRule('build/').matches('lib/build', True) and not IgnoreRule('build/').matches('build', False)
+    assert IgnoreRule('docs/**/*.md').matches('docs/index.md', False) and IgnoreRule('docs/**/*.md').matches('docs/a/b.md', False)
+    assert IgnoreRule('file[0-9].txt').matches('file1.txt', False) and not IgnoreRule('file[!0-9].txt').matches('file1.txt', False)
+    assert IgnoreRule('*.md', 'docs').matches('docs/index.md', False) and not IgnoreRule('*.md', 'docs').matches('index.md', False)
+
+
+def test_walker_rules(tmp_path):
+    make_tree(tmp_path)
+    walker = Walker(str(tmp_path), exclude=['*.pyc', '__pycache__/', '!keep.pyc', '/build'])
+    assert sorted(walker.names()) == [
+        '.env', 'README', 'app', 'app/keep.pyc', 'app/main.py', 'docs', 'docs/index.md', 'lib', 'lib/build', 'lib/build/util.py'
+    ]
+    assert sorted(Walker(str(tmp_path), include=['*.py', 'docs/**'], ignore_dot_files=True).names()) == [
+        'app/main.py', 'docs/index.md', 'lib/build/util.py'
+    ]
+    assert sorted(Walker(str(tmp_path), recursive=False, ignore_dot_files=True).names()) == ['README', 'app', 'build', 'docs', 'lib']
+    (tmp_path / '.gitignore').write_text('# artifacts\nbuild/\n')
+    (tmp_path / 'app' / '.gitignore').write_text('*.pyc\n')
+    files = Walker(str(tmp_path), gitignore=True, ignore_dot_files=True).files()
+    assert sorted(os.path.relpath(path, tmp_path) for path in files) == [
+        'README', os.path.join('app', 'main.py'), os.path.join('docs', 'index.md')
+    ]
+
+
+def test_is_within_components(tmp_path):
+    (tmp_path / 'app').mkdir()
+    os.symlink(tmp_path / 'app', tmp_path / 'current')
+    assert is_within(str(tmp_path / 'app' / 'new'), str(tmp_path / 'app'))
+    assert not is_within(str(tmp_path / 'app-backup'), str(tmp_path / 'app'))
+    assert is_within(str(tmp_path / 'current' / 'new'), str(tmp_path / 'app'))
+
+
+def test_copy_and_move_with_walker(tmp_path):
+    make_tree(tmp_path / 'src')
+    wd = WorkingDirectory()
+    wd.go_to(str(tmp_path / 'src'))
+    try:
+        # sibling destination sharing the prefix of an entry is not "inside" it
+        assert wd.copy_files('app-copy', ['app']) == [os.path.join('app-copy', 'app')]
+        copied = wd.copy_files('release', wd.walk(exclude=['*.pyc', '__pycache__/', 'app-copy/']))
+        assert len(copied) == 6 and os.path.isfile(os.path.join('release', 'lib', 'build', 'util.py'))
+        # the destination inside the walked tree is not walked again
+        assert len(wd.copy_files('release', wd.walk(include=['*.py']))) == 3
+        moved = wd.move_files(str(tmp_path / 'moved'), wd.walk('docs'))
+        assert moved == [os.path.join(str(tmp_path / 'moved'), 'index.md')] and not os.path.exists(os.path.join('docs', 'index.md'))
+    finally:
+        wd.back()